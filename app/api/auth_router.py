@@ -11,8 +11,10 @@ from slowapi.util import get_remote_address
 
 from ..rag_engine.db.session import get_db
 from ..rag_engine.local_cache.sqlite_session import get_local_db
-from ..rag_engine.db.models import User, AuditLog
+from ..rag_engine.db.models import User
 from ..services.auth_service import AuthService
+from ..services.token_validator import InvalidToken, token_validator
+from ..services.analytics_sink import analytics_sink
 from ..utils.logger import get_logger
 
 from fastapi import APIRouter, Depends
@@ -69,17 +71,18 @@ class LogoutRequest(BaseModel):
 
 # Dependency
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db=Depends(get_db),
-    local_db=Depends(get_local_db)
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
-    token = credentials.credentials
+    """The principal JWTAuthMiddleware attached to the request; validated here
+    only for routes the middleware lets through unauthenticated."""
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
     try:
-        auth_service = AuthService(db, local_db)
-        user_data = auth_service.verify_token(token)
-        if not user_data:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
-        return user_data
+        return token_validator.validate(credentials.credentials)
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e))
     except Exception:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
 
@@ -96,13 +99,14 @@ async def login(user_login: UserLogin, request: Request, db=Depends(get_db), loc
         token_data = auth_service.create_access_token(
             user_id=str(user.id),
             email=user.email,
-            remember_me=user_login.remember_me
+            remember_me=user_login.remember_me,
+            name=user.name
         )
 
         user.last_login = datetime.utcnow()
         db.commit()
 
-        audit_log = AuditLog(
+        analytics_sink.record_audit(
             user_id=user.id,
             event_type="login",
             event_details={
@@ -111,8 +115,6 @@ async def login(user_login: UserLogin, request: Request, db=Depends(get_db), loc
                 "remember_me": user_login.remember_me
             }
         )
-        db.add(audit_log)
-        db.commit()
 
         logger.info(f"Successful login for user: {user.email}")
 
@@ -140,9 +142,9 @@ async def register(user_register: UserRegister, request: Request, db=Depends(get
         auth_service = AuthService(db, local_db)
         user = auth_service.create_user(user_register.email, user_register.password, user_register.name)
 
-        token_data = auth_service.create_access_token(user_id=str(user.id), email=user.email)
+        token_data = auth_service.create_access_token(user_id=str(user.id), email=user.email, name=user.name)
 
-        audit_log = AuditLog(
+        analytics_sink.record_audit(
             user_id=user.id,
             event_type="register",
             event_details={
@@ -150,8 +152,6 @@ async def register(user_register: UserRegister, request: Request, db=Depends(get
                 "ip_address": request.headers.get("x-forwarded-for", request.client.host)
             }
         )
-        db.add(audit_log)
-        db.commit()
 
         logger.info(f"New user registered: {user.email}")
 
@@ -174,7 +174,7 @@ async def logout(current_user=Depends(get_current_user), credentials=Depends(sec
         auth_service = AuthService(db, local_db)
         auth_service.invalidate_token(token)
 
-        audit_log = AuditLog(
+        analytics_sink.record_audit(
             user_id=UUID(current_user["user_id"]),
             event_type="logout",
             event_details={
@@ -182,8 +182,6 @@ async def logout(current_user=Depends(get_current_user), credentials=Depends(sec
                 "user_agent": request.headers.get("user-agent", "unknown")
             }
         )
-        db.add(audit_log)
-        db.commit()
 
         logger.info(f"User logged out: {current_user['email']}")
         return {"message": "Successfully logged out"}
@@ -224,7 +222,7 @@ async def change_password(request: Request, password_change: PasswordChange, cur
         if not success:
             raise HTTPException(status_code=400, detail="Current password is incorrect")
 
-        audit_log = AuditLog(
+        analytics_sink.record_audit(
             user_id=UUID(current_user["user_id"]),
             event_type="password_change",
             event_details={
@@ -232,8 +230,6 @@ async def change_password(request: Request, password_change: PasswordChange, cur
                 "timestamp": datetime.utcnow().isoformat()
             }
         )
-        db.add(audit_log)
-        db.commit()
 
         logger.info(f"Password changed for user: {current_user['email']}")
         return {"message": "Password changed successfully"}
@@ -242,12 +238,14 @@ async def change_password(request: Request, password_change: PasswordChange, cur
         raise HTTPException(status_code=500, detail="Failed to change password")
 
 @router.post("/verify-token")
-async def verify_token(current_user=Depends(get_current_user)):
+async def verify_token(current_user=Depends(get_current_user), db=Depends(get_db), local_db=Depends(get_local_db)):
+    # Tokens issued before the name claim was added need the users lookup
+    name = current_user.get("name") or AuthService(db, local_db).get_user_name(current_user["user_id"])
     return {
         "valid": True,
         "user_id": current_user["user_id"],
         "email": current_user["email"],
-        "name": current_user["name"]
+        "name": name
     }
 
 @router.post("/refresh-token")
@@ -256,7 +254,8 @@ async def refresh_token(current_user=Depends(get_current_user), db=Depends(get_d
         auth_service = AuthService(db, local_db)
         token_data = auth_service.create_access_token(
             user_id=current_user["user_id"],
-            email=current_user["email"]
+            email=current_user["email"],
+            name=current_user.get("name")
         )
         return {
             "access_token": token_data["access_token"],
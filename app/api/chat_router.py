@@ -7,29 +7,39 @@ and conversation management. This replaces the blink_router from the original pl
 and adapts it for RAG-based chat functionality.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status, UploadFile, File
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from uuid import UUID, uuid4
 from enum import Enum
 import asyncio
-import time
 import os
 import hashlib
+import shutil
 
 # Import dependencies
-from ..rag_engine.db.session import get_db
+from sqlalchemy import select
+
+from ..rag_engine.db.session import get_db, get_async_db
 from ..rag_engine.local_cache.sqlite_session import get_local_db
-from ..rag_engine.db.models import Conversation, Message, DocumentMetadata, QueryLog
+from ..rag_engine.db.models import Conversation, Message, DocumentMetadata
 from ..services.chat_service import ChatService
+from ..services.user_service import increment_usage
+from ..services.analytics_sink import analytics_sink
+from ..services.upload_progress import upload_progress
 from ..api.auth_router import get_current_user
 from ..utils.logger import get_logger
+from ..utils.pagination import NEXT_CURSOR_HEADER, InvalidCursor, after_cursor, split_page
+from ..utils import tracing
 from ..config.constants import ALLOWED_DOC_TYPES
 
 router = APIRouter()
 logger = get_logger()
 
+UPLOAD_TEMP_DIR = os.getenv("UPLOAD_TEMP_DIR", "temp_uploads")
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
 # Enums
 class FormatPreference(str, Enum):
     auto = "auto"
@@ -128,22 +138,38 @@ async def create_conversation(
 
 @router.get("/conversations", response_model=List[ConversationResponse])
 async def get_conversations(
+    response: Response,
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db)
 ):
-    """Get user's conversations"""
+    """Get user's conversations, most recently updated first.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` for the next
+    page; ``offset`` is still honoured when no cursor is given.
+    """
     try:
         user_id = UUID(current_user["user_id"])
         
-        conversations = db.query(Conversation)\
-            .filter(Conversation.user_id == user_id)\
-            .filter(Conversation.is_deleted == False)\
-            .order_by(Conversation.updated_at.desc())\
-            .offset(offset)\
-            .limit(limit)\
-            .all()
+        query = select(Conversation)\
+            .where(Conversation.user_id == user_id)\
+            .where(Conversation.is_deleted == False)\
+            .order_by(Conversation.updated_at.desc(), Conversation.id.desc())
+        if cursor:
+            query = query.where(after_cursor(
+                [Conversation.updated_at, Conversation.id], cursor, [datetime, UUID], descending=True
+            ))
+        else:
+            query = query.offset(offset)
+        
+        result = await db.execute(query.limit(limit + 1))
+        conversations, next_cursor = split_page(
+            result.scalars().all(), limit, lambda conv: (conv.updated_at, conv.id)
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return [
             ConversationResponse(
@@ -158,6 +184,8 @@ async def get_conversations(
             for conv in conversations
         ]
         
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
     except Exception as e:
         logger.error(f"Get conversations error: {str(e)}")
         raise HTTPException(
@@ -169,78 +197,74 @@ async def get_conversations(
 async def send_message(
     conversation_id: str,
     message: ChatMessage,
+    background_tasks: BackgroundTasks,
+    response: Response,
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db),
     local_db = Depends(get_local_db)
 ):
-    """Send a message and get AI response"""
+    """Send a message and get AI response.
+
+    The turn is written in one transaction after the response is generated;
+    the S3 copy is written after the response is sent and the QueryLog row
+    goes through the analytics write-behind buffer.
+    """
     try:
-        start_time = time.time()
-        chat_service = ChatService(db, local_db)
-        
-        # Verify conversation belongs to user
-        conv_id = UUID(conversation_id)
-        user_id = UUID(current_user["user_id"])
-        
-        conversation = db.query(Conversation)\
-            .filter(Conversation.id == conv_id)\
-            .filter(Conversation.user_id == user_id)\
-            .first()
-        
-        if not conversation:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Conversation not found"
+        # Per-stage timings (embed, chroma, rag_chain, web, db, ...) for this turn
+        with tracing.trace("chat_turn") as turn_trace:
+            received_at = datetime.utcnow()
+            chat_service = ChatService(db, local_db)
+        
+            # Verify conversation belongs to user
+            conv_id = UUID(conversation_id)
+            user_id = UUID(current_user["user_id"])
+        
+            conversation = db.query(Conversation.id)\
+                .filter(Conversation.id == conv_id)\
+                .filter(Conversation.user_id == user_id)\
+                .first()
+        
+            if not conversation:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Conversation not found"
+                )
+            # End the read-only transaction so no connection is held during generation
+            db.rollback()
+        
+            # Process message and generate response
+            response_data = await chat_service.process_message(
+                user_id=user_id,
+                conversation_id=conv_id,
+                message_content=message.content,
+                format_preference=message.format_preference
             )
         
-        # Save user message
-        user_msg = chat_service.save_message(
-            conversation_id=conv_id,
-            role="user",
-            content=message.content
-        )
-        
-        # Process message and generate response
-        response_data = await chat_service.process_message(
-            user_id=user_id,
-            conversation_id=conv_id,
-            message_content=message.content,
-            format_preference=message.format_preference
-        )
-        
-        # Save assistant message
-        assistant_msg = chat_service.save_message(
-            conversation_id=conv_id,
-            role="assistant",
-            content=response_data["content"],
-            sources=response_data["sources"],
-            response_time=response_data["response_time"]
-        )
-        
-        # Update conversation
-        conversation.message_count += 2  # user + assistant messages
-        conversation.updated_at = datetime.utcnow()
-        db.commit()
+            # Both messages and the conversation counter in one commit
+            turn = chat_service.record_turn(user_id, conv_id, message.content, response_data, received_at=received_at)
+        assistant_msg = turn["assistant"]
         
-        # Log query for analytics
-        query_log = QueryLog(
+        # Side effects that the client does not wait for
+        background_tasks.add_task(chat_service.archive_turn, user_id, conv_id, turn)
+        analytics_sink.record_query(
             user_id=user_id,
             conversation_id=conv_id,
             question=message.content,
             retrieved_doc_ids=response_data.get("doc_ids", []),
             used_tags=response_data.get("tags", []),
             source=response_data["source_type"],
-            latency_ms=int(response_data["response_time"] * 1000)
+            latency_ms=int(response_data["response_time"] * 1000),
+            stage_timings=turn_trace.timings()
         )
-        db.add(query_log)
-        db.commit()
+        if tracing.SERVER_TIMING_ENABLED:
+            response.headers["Server-Timing"] = turn_trace.server_timing()
         
         logger.info(f"Processed message for conversation {conversation_id}")
         
         return ChatResponse(
-            id=str(assistant_msg.id),
+            id=str(assistant_msg["id"]),
             content=response_data["content"],
-            timestamp=assistant_msg.timestamp,
+            timestamp=assistant_msg["timestamp"],
             sources=response_data["sources"],
             response_time=response_data["response_time"],
             format_used=response_data["format_used"],
@@ -259,21 +283,24 @@ async def send_message(
 @router.get("/conversations/{conversation_id}/messages")
 async def get_conversation_messages(
     conversation_id: str,
+    response: Response,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_async_db)
 ):
-    """Get messages from a conversation"""
+    """Get messages from a conversation, oldest first (cursor paging as in get_conversations)"""
     try:
         conv_id = UUID(conversation_id)
         user_id = UUID(current_user["user_id"])
         
         # Verify conversation belongs to user
-        conversation = db.query(Conversation)\
-            .filter(Conversation.id == conv_id)\
-            .filter(Conversation.user_id == user_id)\
-            .first()
+        conversation = await db.scalar(
+            select(Conversation.id)
+            .where(Conversation.id == conv_id)
+            .where(Conversation.user_id == user_id)
+        )
         
         if not conversation:
             raise HTTPException(
@@ -281,12 +308,18 @@ async def get_conversation_messages(
                 detail="Conversation not found"
             )
         
-        messages = db.query(Message)\
-            .filter(Message.conversation_id == conv_id)\
-            .order_by(Message.timestamp.asc())\
-            .offset(offset)\
-            .limit(limit)\
-            .all()
+        query = select(Message)\
+            .where(Message.conversation_id == conv_id)\
+            .order_by(Message.timestamp.asc(), Message.id.asc())
+        if cursor:
+            query = query.where(after_cursor([Message.timestamp, Message.id], cursor, [datetime, UUID]))
+        else:
+            query = query.offset(offset)
+        
+        result = await db.execute(query.limit(limit + 1))
+        messages, next_cursor = split_page(result.scalars().all(), limit, lambda msg: (msg.timestamp, msg.id))
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return [
             {
@@ -302,6 +335,8 @@ async def get_conversation_messages(
         
     except HTTPException:
         raise
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
     except Exception as e:
         logger.error(f"Get messages error: {str(e)}")
         raise HTTPException(
@@ -309,14 +344,32 @@ async def get_conversation_messages(
             detail="Failed to retrieve messages"
         )
 
+async def _receive_upload(file: UploadFile, local_path: str, upload_id: str) -> str:
+    """Copy the upload to ``local_path`` in chunks, returning its MD5; never holds the whole file in memory."""
+    hasher = hashlib.md5()
+    with open(local_path, "wb") as out:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+            upload_progress.add_bytes(upload_id, "received_bytes", len(chunk))
+    return hasher.hexdigest()
+
 @router.post("/upload")
 async def upload_document(
     file: UploadFile = File(...),
     tags: List[str] = [],
+    upload_id: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Upload and process a document"""
+    """Upload and process a document
+
+    Pass your own ``upload_id`` to follow progress at /uploads/{upload_id} while the request runs.
+    """
+    upload_dir = None
     try:
         if not file.filename:
             raise HTTPException(
@@ -333,9 +386,14 @@ async def upload_document(
                 detail=f"File type {file_ext} not supported. Allowed: {ALLOWED_DOC_TYPES}"
             )
         
-        # Read file content
-        content = await file.read()
-        content_hash = hashlib.md5(content).hexdigest()
+        upload_id = upload_id or uuid4().hex
+        upload_progress.begin(upload_id, current_user["user_id"], file.filename, file.size)
+
+        # One directory per upload: the loader ingests the whole directory
+        upload_dir = os.path.join(UPLOAD_TEMP_DIR, uuid4().hex)
+        os.makedirs(upload_dir)
+        local_path = os.path.join(upload_dir, os.path.basename(file.filename))
+        content_hash = await _receive_upload(file, local_path, upload_id)
         
         chat_service = ChatService(db)
         
@@ -355,15 +413,17 @@ async def upload_document(
         doc_metadata = await chat_service.upload_document(
             user_id=UUID(current_user["user_id"]),
             filename=file.filename,
-            content=content,
+            local_path=local_path,
             content_hash=content_hash,
-            tags=tags
+            tags=tags,
+            upload_id=upload_id
         )
         
         logger.info(f"Document uploaded: {file.filename} by user {current_user['email']}")
         
         return {
             "id": doc_metadata.id,
+            "upload_id": upload_id,
             "filename": file.filename,
             "status": "uploaded",
             "content_hash": content_hash,
@@ -371,14 +431,32 @@ async def upload_document(
             "message": "Document uploaded and processed successfully"
         }
         
-    except HTTPException:
+    except HTTPException as e:
+        if upload_id:
+            upload_progress.update(upload_id, status="failed", error=e.detail)
         raise
     except Exception as e:
         logger.error(f"Upload document error: {str(e)}")
+        if upload_id:
+            upload_progress.update(upload_id, status="failed", error="Failed to upload document")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to upload document"
         )
+    finally:
+        if upload_dir:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+
+@router.get("/uploads/{upload_id}")
+async def get_upload_progress(
+    upload_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Progress of an upload: receive, ingest and S3 copy (this server process only)"""
+    progress = upload_progress.get(upload_id, current_user["user_id"])
+    if progress is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    return progress
 
 @router.get("/documents/{document_id}")
 async def get_document_by_id(
@@ -500,8 +578,10 @@ async def delete_conversation(
                 detail="Conversation not found"
             )
         
-        # Soft delete
-        conversation.is_deleted = True
+        # Soft delete; the conversation leaves the usage rollup of the day it was created
+        if not conversation.is_deleted:
+            conversation.is_deleted = True
+            increment_usage(db, user_id, day=conversation.created_at, conversation_count=-1)
         db.commit()
         
         logger.info(f"Deleted conversation {conversation_id} for user {current_user['email']}")
@@ -519,21 +599,28 @@ async def delete_conversation(
 
 @router.get("/documents")
 async def get_user_documents(
+    response: Response,
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Get user's uploaded documents"""
+    """Get user's uploaded documents (cursor paging as in get_conversations)"""
     try:
         user_id = UUID(current_user["user_id"])
         
-        documents = db.query(DocumentMetadata)\
+        query = db.query(DocumentMetadata)\
             .filter(DocumentMetadata.owner_user_id == user_id)\
-            .order_by(DocumentMetadata.id.desc())\
-            .offset(offset)\
-            .limit(limit)\
-            .all()
+            .order_by(DocumentMetadata.id.desc())
+        if cursor:
+            query = query.filter(after_cursor([DocumentMetadata.id], cursor, [str], descending=True))
+        else:
+            query = query.offset(offset)
+        
+        documents, next_cursor = split_page(query.limit(limit + 1).all(), limit, lambda doc: (doc.id,))
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return [
             {
@@ -548,6 +635,8 @@ async def get_user_documents(
             for doc in documents
         ]
         
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
     except Exception as e:
         logger.error(f"Get documents error: {str(e)}")
         raise HTTPException(
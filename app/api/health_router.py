@@ -5,20 +5,22 @@ Location: app/api/health_router.py
 Provides system health checks, status monitoring, and diagnostic endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
-import psutil
+from datetime import datetime
+import asyncio
 import time
-import os
 
 # Import dependencies
-from ..rag_engine.db.session import get_db
-from ..rag_engine.local_cache.sqlite_session import get_local_db
-from ..rag_engine.chroma.chroma_client import ChromaClient
-from ..rag_engine.aws.s3_config import get_s3_client
+from ..rag_engine.db.session import get_pool_status
+from ..rag_engine import resources
+from ..services.analytics_sink import analytics_sink
+from ..services.s3_writer import s3_writer
+from ..services.health_monitor import health_monitor
 from ..utils.logger import get_logger
+from ..utils.tracing import stage_stats
 
 router = APIRouter()
 logger = get_logger()
@@ -36,6 +38,7 @@ class SystemHealth(BaseModel):
     timestamp: datetime
     uptime: float
     system_info: Dict[str, Any]
+    sampled_at: Optional[datetime] = None
 
 class DatabaseHealth(BaseModel):
     postgresql: Dict[str, Any]
@@ -47,6 +50,12 @@ class ServiceHealth(BaseModel):
     llm: Dict[str, Any]
     web_search: Dict[str, Any]
 
+class ReadinessStatus(BaseModel):
+    ready: bool
+    components: Dict[str, Dict[str, Any]]
+    timestamp: datetime
+    uptime: float
+
 # Track service start time
 SERVICE_START_TIME = time.time()
 
@@ -54,104 +63,6 @@ def get_uptime() -> float:
     """Get service uptime in seconds"""
     return time.time() - SERVICE_START_TIME
 
-def check_database_health(db) -> Dict[str, Any]:
-    """Check PostgreSQL database health"""
-    try:
-        # Simple query to test connection
-        result = db.execute("SELECT 1").fetchone()
-        return {
-            "status": "healthy",
-            "response_time": "< 100ms",
-            "last_check": datetime.utcnow().isoformat(),
-            "connection": "active"
-        }
-    except Exception as e:
-        logger.error(f"PostgreSQL health check failed: {str(e)}")
-        return {
-            "status": "unhealthy",
-            "error": str(e),
-            "last_check": datetime.utcnow().isoformat(),
-            "connection": "failed"
-        }
-
-def check_sqlite_health(local_db) -> Dict[str, Any]:
-    """Check SQLite local cache health"""
-    try:
-        # Simple query to test connection
-        cursor = local_db.execute("SELECT 1")
-        cursor.fetchone()
-        return {
-            "status": "healthy",
-            "response_time": "< 50ms",
-            "last_check": datetime.utcnow().isoformat(),
-            "connection": "active"
-        }
-    except Exception as e:
-        logger.error(f"SQLite health check failed: {str(e)}")
-        return {
-            "status": "unhealthy",
-            "error": str(e),
-            "last_check": datetime.utcnow().isoformat(),
-            "connection": "failed"
-        }
-
-def check_vectorstore_health() -> Dict[str, Any]:
-    """Check ChromaDB vectorstore health"""
-    try:
-        chroma_client = ChromaClient(persist_directory="app/data/chroma")
-        collection = chroma_client._collection
-        count = collection.count()
-        return {
-            "status": "healthy",
-            "document_count": count,
-            "last_check": datetime.utcnow().isoformat(),
-            "connection": "active"
-        }
-    except Exception as e:
-        logger.error(f"Vectorstore health check failed: {str(e)}")
-        return {
-            "status": "unhealthy",
-            "error": str(e),
-            "last_check": datetime.utcnow().isoformat(),
-            "connection": "failed"
-        }
-
-def check_s3_health() -> Dict[str, Any]:
-    """Check S3 service health"""
-    try:
-        s3_client = get_s3_client()
-        # Try to list buckets as a health check
-        response = s3_client.list_buckets()
-        return {
-            "status": "healthy",
-            "bucket_count": len(response.get('Buckets', [])),
-            "last_check": datetime.utcnow().isoformat(),
-            "connection": "active"
-        }
-    except Exception as e:
-        logger.error(f"S3 health check failed: {str(e)}")
-        return {
-            "status": "unhealthy",
-            "error": str(e),
-            "last_check": datetime.utcnow().isoformat(),
-            "connection": "failed"
-        }
-
-def get_system_info() -> Dict[str, Any]:
-    """Get system resource information"""
-    try:
-        return {
-            "cpu_percent": psutil.cpu_percent(interval=1),
-            "memory_percent": psutil.virtual_memory().percent,
-            "disk_percent": psutil.disk_usage('/').percent,
-            "load_average": os.getloadavg() if hasattr(os, 'getloadavg') else None,
-            "process_count": len(psutil.pids()),
-            "boot_time": datetime.fromtimestamp(psutil.boot_time()).isoformat()
-        }
-    except Exception as e:
-        logger.error(f"System info collection failed: {str(e)}")
-        return {"error": str(e)}
-
 @router.get("/", response_model=HealthStatus)
 @router.get("/status", response_model=HealthStatus)
 async def health_check():
@@ -162,61 +73,90 @@ async def health_check():
         uptime=get_uptime()
     )
 
+@router.get("/live", response_model=HealthStatus)
+async def liveness_check():
+    """Liveness probe: the process is up and serving; says nothing about dependencies"""
+    return HealthStatus(
+        status="alive",
+        timestamp=datetime.utcnow(),
+        uptime=get_uptime()
+    )
+
+@router.get("/ready", response_model=ReadinessStatus)
+async def readiness_check():
+    """Readiness probe: 200 once the required components are warm, 503 until then"""
+    state = resources.readiness()
+    body = ReadinessStatus(
+        ready=state["ready"],
+        components=state["components"],
+        timestamp=datetime.utcnow(),
+        uptime=get_uptime()
+    )
+    if not body.ready:
+        return JSONResponse(status_code=503, content=body.model_dump(mode="json"))
+    return body
+
+@router.get("/pool")
+async def pool_status():
+    """Database connection pool usage and settings"""
+    return {
+        "pools": get_pool_status(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.get("/analytics")
+async def analytics_sink_status():
+    """Write-behind analytics buffer: queued, written, dropped and failed rows"""
+    return {
+        "analytics": analytics_sink.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.get("/s3-writer")
+async def s3_writer_status():
+    """Write-behind S3 queue: spooled, in-flight, uploaded, retried, dropped and dead uploads"""
+    return {
+        "s3_writer": await asyncio.to_thread(s3_writer.stats),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@router.get("/stages")
+async def stage_latency():
+    """p50/p90/p99 per stage (ms) over the most recent traced chat turns in this process"""
+    return {
+        "stages": stage_stats.percentiles(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 @router.get("/detailed", response_model=SystemHealth)
-async def detailed_health_check(
-    db = Depends(get_db),
-    local_db = Depends(get_local_db)
-):
-    """Detailed system health check"""
-    try:
-        # Check all components
-        postgresql_health = check_database_health(db)
-        sqlite_health = check_sqlite_health(local_db)
-        vectorstore_health = check_vectorstore_health()
-        s3_health = check_s3_health()
-        system_info = get_system_info()
-
-        components = {
-            "postgresql": postgresql_health,
-            "sqlite": sqlite_health,
-            "vectorstore": vectorstore_health,
-            "s3": s3_health
-        }
-
-        # Determine overall status
-        component_statuses = [comp["status"] for comp in components.values()]
-        overall_status = "healthy" if all(status == "healthy" for status in component_statuses) else "degraded"
-
-        return SystemHealth(
-            overall_status=overall_status,
-            components=components,
-            timestamp=datetime.utcnow(),
-            uptime=get_uptime(),
-            system_info=system_info
-        )
-
-    except Exception as e:
-        logger.error(f"Detailed health check failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Health check failed")
+async def detailed_health_check():
+    """Detailed system health, answered from the latest background sample"""
+    snapshot = health_monitor.snapshot()
+    return SystemHealth(
+        overall_status=snapshot["overall_status"],
+        components=snapshot["components"],
+        timestamp=datetime.utcnow(),
+        uptime=get_uptime(),
+        system_info=snapshot["system_info"],
+        sampled_at=snapshot["sampled_at"]
+    )
 
 @router.get("/database", response_model=DatabaseHealth)
-async def database_health_check(
-    db = Depends(get_db),
-    local_db = Depends(get_local_db)
-):
-    """Database-specific health checks"""
+async def database_health_check():
+    """Database-specific health, from the latest background sample"""
+    components = health_monitor.snapshot()["components"]
     return DatabaseHealth(
-        postgresql=check_database_health(db),
-        sqlite=check_sqlite_health(local_db),
-        vectorstore=check_vectorstore_health()
+        postgresql=components["postgresql"],
+        sqlite=components["sqlite"],
+        vectorstore=components["vectorstore"]
     )
 
 @router.get("/services", response_model=ServiceHealth)
 async def services_health_check():
-    """External services health checks"""
+    """External services health, from the latest background sample"""
+    components = health_monitor.snapshot()["components"]
     return ServiceHealth(
-        s3=check_s3_health(),
-        llm={"status": "healthy", "last_check": datetime.utcnow().isoformat()},
-        web_search={"status": "healthy", "last_check": datetime.utcnow().isoformat()}
+        s3=components["s3"],
+        llm=components["llm"],
+        web_search=components["web_search"]
     )
-
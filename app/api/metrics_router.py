@@ -0,0 +1,73 @@
+"""
+Metrics Router for RAGBot API
+Location: app/api/metrics_router.py
+
+Serves /metrics in the Prometheus text format. Values that are cheap to read
+at scrape time (connection pools, analytics queue, component state) are
+collected here instead of being tracked on every request.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..rag_engine import resources
+from ..rag_engine.db.session import get_pool_status
+from ..services.analytics_sink import analytics_sink
+from ..services.s3_writer import s3_writer
+from ..utils.metrics import register_collector, render_latest
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _pool_samples():
+    status = get_pool_status()
+    max_overflow = status["settings"]["max_overflow"]
+    for engine_name in ("sync", "async"):
+        pool = status.get(engine_name)
+        if pool is None:
+            continue
+        labels = {"engine": engine_name}
+        for key in ("size", "checkedout", "checkedin", "overflow"):
+            if key in pool:
+                yield (f"ragbot_db_pool_{key}", "gauge", f"Connection pool {key}", labels, pool[key])
+        if "size" in pool:
+            yield ("ragbot_db_pool_capacity", "gauge", "Connections the pool may open (size + max_overflow)",
+                   labels, pool["size"] + max_overflow)
+
+
+def _analytics_samples():
+    stats = analytics_sink.stats()
+    yield ("ragbot_analytics_queue_depth", "gauge", "Rows waiting in the analytics write-behind buffer", {}, stats["queued"])
+    for outcome in ("written", "dropped", "failed"):
+        for table, count in stats[outcome].items():
+            yield (f"ragbot_analytics_rows_{outcome}_total", "counter", f"Analytics rows {outcome}",
+                   {"table": table}, count)
+
+
+def _s3_writer_samples():
+    stats = s3_writer.stats()
+    yield ("ragbot_s3_writer_pending", "gauge", "Uploads spooled for the S3 writer", {}, stats["pending"])
+    yield ("ragbot_s3_writer_in_flight", "gauge", "S3 uploads in progress", {}, stats["in_flight"])
+    for outcome in ("uploaded", "retried", "dropped", "dead"):
+        for kind, count in stats[outcome].items():
+            yield (f"ragbot_s3_writer_{outcome}_total", "counter", f"S3 writer uploads {outcome}",
+                   {"kind": kind}, count)
+
+
+def _resource_samples():
+    for name, status in resources.readiness()["components"].items():
+        yield ("ragbot_component_warm", "gauge", "1 once a heavy component is loaded", {"component": name},
+               1 if status.get("state") == "warm" else 0)
+
+
+register_collector(_pool_samples)
+register_collector(_analytics_samples)
+register_collector(_s3_writer_samples)
+register_collector(_resource_samples)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_latest(), media_type=PROMETHEUS_CONTENT_TYPE)
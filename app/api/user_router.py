@@ -5,7 +5,7 @@ Location: app/api/user_router.py
 Handles user profile management, preferences, settings, and usage statistics.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from pydantic import BaseModel, EmailStr
 from typing import Optional, Dict, List, Any
 from datetime import datetime, timedelta
@@ -16,8 +16,10 @@ from enum import Enum
 from ..rag_engine.db.session import get_db
 from ..rag_engine.db.models import User, UserPreferences, UserSettings, UsageStat, AuditLog
 from ..services.user_service import UserService
+from ..services.analytics_sink import analytics_sink
 from ..api.auth_router import get_current_user
 from ..utils.logger import get_logger
+from ..utils.pagination import NEXT_CURSOR_HEADER, InvalidCursor, after_cursor, split_page
 
 router = APIRouter()
 logger = get_logger()
@@ -116,7 +118,7 @@ async def update_user_profile(
         db.commit()
         
         # Log profile update
-        audit_log = AuditLog(
+        analytics_sink.record_audit(
             user_id=user_id,
             event_type="profile_update",
             event_details={
@@ -126,8 +128,6 @@ async def update_user_profile(
                 ]
             }
         )
-        db.add(audit_log)
-        db.commit()
         
         logger.info(f"Profile updated for user: {user.email}")
         
@@ -213,13 +213,11 @@ async def update_user_preferences(
         db.commit()
         
         # Log preferences update
-        audit_log = AuditLog(
+        analytics_sink.record_audit(
             user_id=user_id,
             event_type="preferences_update",
             event_details=preferences.dict()
         )
-        db.add(audit_log)
-        db.commit()
         
         logger.info(f"Preferences updated for user: {current_user['email']}")
         
@@ -281,13 +279,11 @@ async def update_user_settings(
         db.commit()
         
         # Log settings update
-        audit_log = AuditLog(
+        analytics_sink.record_audit(
             user_id=user_id,
             event_type="settings_update",
             event_details={"updated_settings": list(settings_update.settings.keys())}
         )
-        db.add(audit_log)
-        db.commit()
         
         logger.info(f"Settings updated for user: {current_user['email']}")
         
@@ -363,13 +359,11 @@ async def update_conversation_style(
         db.commit()
         
         # Log style update
-        audit_log = AuditLog(
+        analytics_sink.record_audit(
             user_id=user_id,
             event_type="conversation_style_update",
             event_details=style_update.conversation_style
         )
-        db.add(audit_log)
-        db.commit()
         
         logger.info(f"Conversation style updated for user: {user.email}")
         
@@ -435,13 +429,11 @@ async def update_search_bias_mode(
         db.commit()
         
         # Log bias mode update
-        audit_log = AuditLog(
+        analytics_sink.record_audit(
             user_id=user_id,
             event_type="search_bias_mode_update",
             event_details={"new_mode": bias_mode.value}
         )
-        db.add(audit_log)
-        db.commit()
         
         logger.info(f"Search bias mode updated to '{bias_mode}' for user: {user.email}")
         
@@ -477,7 +469,7 @@ async def delete_user_account(
         db.commit()
         
         # Log account deletion
-        audit_log = AuditLog(
+        analytics_sink.record_audit(
             user_id=user_id,
             event_type="account_deletion_request",
             event_details={
@@ -486,8 +478,6 @@ async def delete_user_account(
                 "deletion_timestamp": datetime.utcnow().isoformat()
             }
         )
-        db.add(audit_log)
-        db.commit()
         
         logger.warning(f"Account deleted for user: {user.email}")
         
@@ -507,15 +497,20 @@ async def delete_user_account(
 
 @router.get("/audit-logs")
 async def get_user_audit_logs(
+    response: Response,
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
     event_type: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
-    """Get user's audit logs"""
+    """Get user's audit logs, newest first.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` for the next page.
+    """
     try:
         user_id = UUID(current_user["user_id"])
         
@@ -528,10 +523,17 @@ async def get_user_audit_logs(
         if end_date:
             query = query.filter(AuditLog.timestamp <= end_date)
         
-        logs = query.order_by(AuditLog.timestamp.desc())\
-                  .offset(offset)\
-                  .limit(limit)\
-                  .all()
+        query = query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
+        if cursor:
+            query = query.filter(after_cursor(
+                [AuditLog.timestamp, AuditLog.id], cursor, [datetime, UUID], descending=True
+            ))
+        else:
+            query = query.offset(offset)
+        
+        logs, next_cursor = split_page(query.limit(limit + 1).all(), limit, lambda log: (log.timestamp, log.id))
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return [
             {
@@ -543,6 +545,8 @@ async def get_user_audit_logs(
             for log in logs
         ]
         
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
     except Exception as e:
         logger.error(f"Get audit logs error: {str(e)}")
         raise HTTPException(
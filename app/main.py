@@ -3,6 +3,7 @@ from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import traceback
 import time
@@ -14,15 +15,21 @@ from .api.auth_router import router as auth_router
 from .api.chat_router import router as chat_router
 from .api.user_router import router as user_router
 from .api.health_router import router as health_router
+from .api.metrics_router import router as metrics_router
 
 # Import utilities
 from .utils.logger import get_logger
-from .rag_engine.db.session import get_db
-from .rag_engine.aws.s3_config import get_s3_client
-from .rag_engine.chroma.chroma_client import ChromaClient
+from .rag_engine import resources
+from .rag_engine.db.session import dispose_async_engine
+from .services.analytics_sink import analytics_sink
+from .services.health_monitor import health_monitor
+from .services.auth_store import auth_store
+from .services.s3_writer import s3_writer
 
 from fastapi.middleware import Middleware
 from app.middleware.jwt_middleware import JWTAuthMiddleware
+from app.middleware.metrics_middleware import MetricsMiddleware
+from app.middleware.logging_middleware import RequestLoggingMiddleware
 from app.api import admin_router   # make sure __init__.py exists in app/api
 # ...
 
@@ -33,16 +40,8 @@ load_dotenv()
 # Initialize logger
 logger = get_logger()
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Startup and shutdown events"""
-    logger.info("Starting RAGBot FastAPI application")
-    try:
-        db = next(get_db())
-        logger.info("Database connection successful")
-    except Exception as e:
-        logger.error(f"Database connection failed: {e}")
-
+def check_s3_connection():
+    from .rag_engine.aws.s3_config import get_s3_client
     try:
         s3_client = get_s3_client()
         s3_client.list_buckets()  # Simple health check
@@ -50,16 +49,35 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"S3 connection failed: {e}")
 
-    try:
-        chroma_client = ChromaClient(persist_directory=os.getenv("CHROMA_PERSIST_DIR", "app/data/chroma"))
-        collection = chroma_client.get_doc_collection()
-        collection.count()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup and shutdown events.
 
-        logger.info("Vectorstore available")
-    except Exception as e:
-        logger.error(f"Vectorstore init failed: {e}")
+    Heavy components (embedder, Chroma, LLM, DB) are loaded in the background
+    so the server starts accepting requests, and liveness probes, right away.
+    /api/v1/health/ready reports when they are warm (see resources.READY_REQUIRES
+    for PRELOAD_RESOURCES=false).
+    """
+    logger.info("Starting RAGBot FastAPI application")
+    analytics_sink.start()
+    s3_writer.start()
+    background = []
+    if resources.PRELOAD_RESOURCES:
+        background.append(asyncio.create_task(resources.warm_up()))
+    background.append(asyncio.create_task(asyncio.to_thread(check_s3_connection)))
+    health_monitor.start()
+    auth_store.start_purger()
 
     yield
+
+    auth_store.stop_purger()
+    await health_monitor.stop()
+    for task in background:
+        task.cancel()
+    # Drain buffered analytics and due S3 uploads before the pools go away
+    await asyncio.to_thread(analytics_sink.stop)
+    await asyncio.to_thread(s3_writer.stop)
+    await dispose_async_engine()
     logger.info("Shutting down RAGBot FastAPI application")
 
 middleware = [
@@ -75,7 +93,6 @@ app = FastAPI(
     lifespan=lifespan,
     middleware=middleware
 )
-app.include_router(auth_router)
 
 
 
@@ -88,15 +105,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request count, latency and in-flight gauge per route template, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Request logging
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    logger.info(f"Request: {request.method} {request.url}")
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    logger.info(f"Response: {response.status_code} - {process_time:.3f}s")
-    return response
+app.add_middleware(RequestLoggingMiddleware)
 
 # Exception handlers
 @app.exception_handler(Exception)
@@ -131,11 +144,12 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     )
 
 # Include routers
-app.include_router(auth_router, prefix="/api/v1/auth", tags=["Authentication"])
+app.include_router(auth_router)  # the router carries its /api/v1/auth prefix and tags
 app.include_router(chat_router, prefix="/api/v1/chat", tags=["Chat"])
 app.include_router(user_router, prefix="/api/v1/user", tags=["User Management"])
 app.include_router(health_router, prefix="/api/v1/health", tags=["Health"])
 app.include_router(admin_router.router, prefix="/api/v1/admin", tags=["Admin"]) 
+app.include_router(metrics_router, tags=["Metrics"])
 
 # Root endpoint
 @app.get("/")
@@ -1,88 +1,73 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.requests import Request
-import jwt
-from jwt import ExpiredSignatureError, InvalidTokenError
-from fastapi import HTTPException
-import os
-import sqlite3
-from dotenv import load_dotenv
+"""
+JWT authentication middleware for RAGBot
+Location: app/middleware/jwt_middleware.py
 
-load_dotenv()
-JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "fallback-secret-key")
+Plain ASGI middleware: unlike BaseHTTPMiddleware it does not run the app in
+a separate task or re-wrap the response body stream, so it adds almost
+nothing per request and leaves streaming responses alone. Excluded paths are
+matched with one precompiled regex.
+"""
 
-class JWTAuthMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
-        self.secret = JWT_SECRET_KEY
+import re
 
-    async def dispatch(self, request: Request, call_next):
-        # Allow these paths without authentication
-        excluded_paths = [
-            "/api/v1/auth",
-            "/docs", 
-            "/redoc",
-            "/openapi.json", 
-            "/",
-            "/api/info",
-            "/api/v1/health"  # Add health endpoint
-        ]
-        
-        # Check if path should be excluded
-        for excluded_path in excluded_paths:
-            if request.url.path.startswith(excluded_path):
-                return await call_next(request)
+from starlette.responses import JSONResponse
 
-        # Get authorization header
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return JSONResponse(
-                status_code=401, 
-                content={"detail": "Missing or invalid token"}
-            )
+from app.services.token_validator import InvalidToken, token_validator
 
-        token = auth_header.split(" ")[1]
+# Path prefixes served without authentication; each matches itself and its subpaths only
+EXCLUDED_PREFIXES = (
+    "/api/v1/auth",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/api/info",
+    "/api/v1/health",
+    "/metrics",
+)
 
-        try:
-            # Decode JWT token
-            payload = jwt.decode(token, self.secret, algorithms=["HS256"])
-            
-            # Verify token exists in database and is valid
-            conn = sqlite3.connect("app/local/auth_cache.db")
-            cursor = conn.execute(
-                "SELECT is_valid FROM token_cache WHERE token = ?", 
-                (token,)
-            )
-            result = cursor.fetchone()
-            conn.close()
-            
-            if not result or not result[0]:
-                return JSONResponse(
-                    status_code=401, 
-                    content={"detail": "Token has been invalidated"}
-                )
-            
-            # Add user info to request state
-            request.state.user_id = payload["user_id"]
-            request.state.user_email = payload["email"]
-            request.state.user_role = payload.get("role", "user")
 
+def compile_exclusions(prefixes=EXCLUDED_PREFIXES) -> "re.Pattern":
+    """``/`` matches only the root; other entries match themselves and anything below them."""
+    alternatives = "|".join(re.escape(prefix.rstrip("/")) for prefix in prefixes)
+    return re.compile(rf"^(?:/|(?:{alternatives})(?:/.*)?)$")
+
+
+class JWTAuthMiddleware:
+    def __init__(self, app, validator=None, excluded: "re.Pattern" = None):
+        self.app = app
+        self.validator = validator or token_validator
+        self.excluded = excluded or compile_exclusions()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.excluded.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        authorization = b""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value
+                break
+        if not authorization.startswith(b"Bearer "):
+            await JSONResponse(status_code=401, content={"detail": "Missing or invalid token"})(scope, receive, send)
+            return
+
+        try:
+            # Signature, expiry and revocation, answered from the TTL cache when possible
+            principal = self.validator.validate(authorization[7:].decode("latin-1").strip())
+        except InvalidToken as e:
+            await JSONResponse(status_code=401, content={"detail": str(e)})(scope, receive, send)
+            return
+        except Exception:
+            await JSONResponse(status_code=401, content={"detail": "Token validation failed"})(scope, receive, send)
+            return
 
-            
-        except ExpiredSignatureError:
-            return JSONResponse(
-                status_code=401, 
-                content={"detail": "Token expired"}
-            )
-        except InvalidTokenError:
-            return JSONResponse(
-                status_code=401, 
-                content={"detail": "Invalid token"}
-            )
-        except Exception as e:
-            return JSONResponse(
-                status_code=401, 
-                content={"detail": "Token validation failed"}
-            )
+        # request.state reads scope["state"]; get_current_user and require_role reuse the principal
+        state = scope.setdefault("state", {})
+        state["principal"] = principal
+        state["user"] = principal
+        state["user_id"] = principal["user_id"]
+        state["user_email"] = principal["email"]
+        state["user_role"] = principal["role"]
 
-        return await call_next(request)
\ No newline at end of file
+        await self.app(scope, receive, send)
@@ -0,0 +1,37 @@
+"""
+Request logging middleware for RAGBot
+Location: app/middleware/logging_middleware.py
+
+Logs one line per request and one per response, as the old
+@app.middleware("http") hook did, but as plain ASGI so the response
+stream is passed through untouched.
+"""
+
+import time
+
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class RequestLoggingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        query = scope.get("query_string", b"")
+        target = scope["path"] + ("?" + query.decode("latin-1") if query else "")
+        logger.info(f"Request: {scope['method']} {target}")
+
+        async def send_logged(message):
+            if message["type"] == "http.response.start":
+                # Logged when headers go out: for streaming responses that is time to first byte
+                logger.info(f"Response: {message['status']} - {time.perf_counter() - start_time:.3f}s")
+            await send(message)
+
+        await self.app(scope, receive, send_logged)
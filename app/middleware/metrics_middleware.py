@@ -0,0 +1,43 @@
+"""
+Request metrics middleware for RAGBot
+Location: app/middleware/metrics_middleware.py
+
+Plain ASGI middleware (no BaseHTTPMiddleware task/stream overhead) that
+records latency, count and in-flight requests per route template, e.g.
+/api/v1/chat/conversations/{conversation_id}/messages, so that path
+parameters do not multiply label sets.
+"""
+
+import time
+
+from app.utils.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            labels = (scope["method"], route, str(status_code))
+            HTTP_REQUESTS.labels(*labels).inc()
+            HTTP_LATENCY.labels(*labels).observe(time.perf_counter() - start)
@@ -1,24 +1,25 @@
 from typing import List
 from uuid import uuid4
 from app.rag_engine.chroma.vector_schema import DocumentEmbedding
-from langchain_huggingface import HuggingFaceEmbeddings
+from app.rag_engine.resources import get_embeddings_model
+from app.utils.metrics import EMBEDDING_BATCH_SIZE
 
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
-
-def embed_documents(docs, user_id: str = "user_id_placeholder") -> List[DocumentEmbedding]:
+def embed_documents(docs, user_id: str = "user_id_placeholder", visibility: str = "private") -> List[DocumentEmbedding]:
+    embedding_model = get_embeddings_model()
     embeddings = []
-    for doc in docs:
-        embedding = embedding_model.embed_query(doc.page_content)
-        
+    # One batched call: the model encodes the whole batch instead of one forward pass per chunk
+    vectors = embedding_model.embed_documents([doc.page_content for doc in docs]) if docs else []
+    EMBEDDING_BATCH_SIZE.labels("documents").observe(len(vectors))
+    for doc, embedding in zip(docs, vectors):
         # Create metadata ensuring all values are ChromaDB compatible (str, int, float, bool)
         metadata = {
             "source": doc.metadata.get("source", "unknown"),
-            "doc_id": str(uuid4()),
+            "doc_id": doc.metadata.get("doc_id") or str(uuid4()),
             "user_id": user_id,
             "hash": doc.metadata.get("hash", ""),
             "filename": doc.metadata.get("source", "unknown"),
             "doc_type": "text",
-            "visibility": "private",
+            "visibility": visibility,
             "page_number": doc.metadata.get("page", 0),
             "chunk_id": str(uuid4()),
             # Convert any lists to empty strings
@@ -3,7 +3,8 @@ import traceback
 import hashlib
 
 from langchain_community.document_loaders import TextLoader, PyPDFLoader, UnstructuredWordDocumentLoader
-from app.rag_engine.chroma.chroma_client import ChromaClient
+from app.rag_engine.chroma.chroma_client import summarize_chunks
+from app.rag_engine.resources import get_chroma_client
 from app.rag_engine.Ingest.document_embedder import embed_documents
 
 
@@ -16,10 +17,15 @@ def get_file_hash(filepath):
     return hasher.hexdigest()
 
 
-def load_documents(data_dir="data", known_hashes: set = None):
+def load_documents(data_dir="data", known_hashes: set = None, user_id: str = None):
+    """Load, embed and index every supported file in ``data_dir``.
+
+    Files uploaded by a user are indexed as private chunks in that user's
+    collection; without ``user_id`` they are treated as the public corpus.
+    """
     docs = []
     supported = [".txt", ".pdf", ".docx"]
-    chroma_client = ChromaClient(persist_directory="app/data/chroma")
+    chroma_client = get_chroma_client()
 
     known_hashes = known_hashes or set()
 
@@ -58,16 +64,24 @@ def load_documents(data_dir="data", known_hashes: set = None):
 
             file_docs = loader.load()
             
-            # Add source metadata and hash to each document
+            # Add source metadata and hash to each document; the hash doubles
+            # as doc_id so chunks line up with DocumentMetadata.id
             for doc in file_docs:
                 doc.metadata["source"] = filename
                 doc.metadata["hash"] = file_hash
+                doc.metadata["doc_id"] = file_hash
             
             # Use the existing embed_documents function
-            document_embeddings = embed_documents(file_docs, user_id="user_id_placeholder")
+            document_embeddings = embed_documents(
+                file_docs,
+                user_id=user_id or "",
+                visibility="private" if user_id else "public"
+            )
             
-            # Add all embeddings to ChromaDB at once
+            # Add all embeddings to ChromaDB at once, plus the document's summary vector
             chroma_client.add_docs(document_embeddings)
+            if document_embeddings:
+                chroma_client.add_document_summaries([summarize_chunks(document_embeddings)])
                 
             docs.extend(file_docs)
             known_hashes.add(file_hash)
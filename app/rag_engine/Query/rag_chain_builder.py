@@ -1,9 +1,10 @@
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.prompts import PromptTemplate
 
-def build_rag_chain(vectordb, llm, embeddings_model=None):
+def build_rag_chain(vectordb, llm, embeddings_model=None, user_id=None):
     """
-    Build RAG chain with provided vectordb, llm, and optional embeddings model
+    Build RAG chain with provided vectordb, llm, and optional embeddings model.
+    When user_id is given, retrieval is limited to that user's documents plus public ones.
     """
     def format_context(docs_result):
         if not docs_result or 'documents' not in docs_result or not docs_result['documents']:
@@ -27,12 +28,11 @@ def build_rag_chain(vectordb, llm, embeddings_model=None):
             query_embedding = embeddings_model.embed_query(query)
         else:
             # Fallback: only if embeddings_model not provided
-            from langchain_huggingface import HuggingFaceEmbeddings
-            temp_embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
-            query_embedding = temp_embeddings.embed_query(query)
+            from app.rag_engine.resources import get_embeddings_model
+            query_embedding = get_embeddings_model().embed_query(query)
         
         # Query the vectorstore with actual embedding
-        docs_result = vectordb.get_doc_collection().query(query_embeddings=[query_embedding],n_results=4)
+        docs_result = vectordb.query_docs(query_embedding, n_results=4, user_id=user_id)
 
         
         return {
@@ -0,0 +1,124 @@
+"""
+Process-wide S3 clients for RAGBot.
+Builds one boto3 client per (endpoint, region, credentials) and checks each bucket once.
+Location: app/rag_engine/aws/s3_client.py
+"""
+
+import os
+import threading
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# botocore's default is 10; the S3 writer and upload_file transfers run more than that concurrently
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", 32))
+# Multipart settings for upload_file/download_file; parts move in parallel over the pooled connections
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", 16 * 2 ** 20))
+S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", 16 * 2 ** 20))
+S3_TRANSFER_CONCURRENCY = int(os.getenv("S3_TRANSFER_CONCURRENCY", 10))
+
+_lock = threading.Lock()
+_clients = {}
+_resources = {}
+_checked_buckets = set()
+
+
+def client_config(region):
+    return Config(
+        retries={"max_attempts": int(os.getenv("AWS_MAX_RETRIES", 5)), "mode": "standard"},
+        region_name=region,
+        max_pool_connections=S3_MAX_POOL_CONNECTIONS
+    )
+
+
+_transfer_config = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+    max_concurrency=S3_TRANSFER_CONCURRENCY,
+    use_threads=True
+)
+
+
+def transfer_config():
+    return _transfer_config
+
+
+def _cache_key(access_key_id, secret_access_key, session_token, region, endpoint_url):
+    return (endpoint_url, region, access_key_id, secret_access_key, session_token)
+
+
+def _session(access_key_id, secret_access_key, session_token, region):
+    return boto3.Session(
+        aws_access_key_id=access_key_id,
+        aws_secret_access_key=secret_access_key,
+        aws_session_token=session_token,
+        region_name=region
+    )
+
+
+def get_client(access_key_id, secret_access_key, session_token, region, endpoint_url=None):
+    """Shared S3 client for these settings. boto3 clients are thread-safe."""
+    key = _cache_key(access_key_id, secret_access_key, session_token, region, endpoint_url)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                session = _session(access_key_id, secret_access_key, session_token, region)
+                client = session.client("s3", endpoint_url=endpoint_url, config=client_config(region))
+                _clients[key] = client
+                logger.debug(f"S3 client created for region {region}, endpoint {endpoint_url or 'default'}")
+    return client
+
+
+def get_resource(access_key_id, secret_access_key, session_token, region, endpoint_url=None):
+    """Shared S3 resource for these settings; use from one thread at a time."""
+    key = _cache_key(access_key_id, secret_access_key, session_token, region, endpoint_url)
+    resource = _resources.get(key)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(key)
+            if resource is None:
+                session = _session(access_key_id, secret_access_key, session_token, region)
+                resource = session.resource("s3", endpoint_url=endpoint_url, config=client_config(region))
+                _resources[key] = resource
+    return resource
+
+
+def ensure_bucket(client, bucket, region, create=False):
+    """head_bucket once per client and bucket; with create=True, create a missing bucket.
+
+    Only success is remembered, so a failed check is retried on the next call.
+    """
+    key = (id(client), bucket)
+    if key in _checked_buckets:
+        return
+    try:
+        client.head_bucket(Bucket=bucket)
+        logger.info(f"Validated access to S3 bucket: {bucket}")
+    except ClientError as e:
+        if not create or e.response["Error"]["Code"] not in ("404", "NoSuchBucket"):
+            raise
+        params = {"Bucket": bucket}
+        if region != "us-east-1":  # us-east-1 rejects an explicit LocationConstraint
+            params["CreateBucketConfiguration"] = {"LocationConstraint": region}
+        try:
+            client.create_bucket(**params)
+            logger.info(f"Created S3 bucket: {bucket}")
+        except ClientError as create_error:
+            if create_error.response["Error"]["Code"] not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+                raise
+    _checked_buckets.add(key)
+
+
+def clear():
+    """Forget cached clients and bucket checks (e.g. after rotating credentials in-process)."""
+    with _lock:
+        _clients.clear()
+        _resources.clear()
+        _checked_buckets.clear()
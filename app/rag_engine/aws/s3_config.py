@@ -1,8 +1,7 @@
 import os
-from botocore.config import Config
 from botocore.exceptions import ClientError
-import boto3
 import logging
+from app.rag_engine.aws import s3_client as client_cache
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -21,14 +20,8 @@ class S3Config:
         self.bucket = bucket_name or os.getenv("S3_BUCKET", "ragbot-conversations")  # Allow override
         self.endpoint_url = os.getenv("AWS_ENDPOINT_URL")  # Support custom endpoints (e.g., LocalStack, MinIO)
         
-        # Configure retry behavior
-        self.retry_config = Config(
-            retries={
-                "max_attempts": int(os.getenv("AWS_MAX_RETRIES", 5)),
-                "mode": "standard"  # Options: legacy, standard, adaptive
-            },
-            region_name=self.region
-        )
+        # Retry behavior and connection pool size
+        self.retry_config = client_cache.client_config(self.region)
         
         # Validate configuration
         self.validate()
@@ -47,50 +40,30 @@ class S3Config:
             logger.error(error_msg)
             raise ValueError(error_msg)
         
-        # Verify bucket exists and is accessible
+        # Verify bucket exists and is accessible (once per process)
         try:
-            client = self.get_client()
-            client.head_bucket(Bucket=self.bucket)
-            logger.info(f"Successfully validated access to bucket: {self.bucket}")
+            client_cache.ensure_bucket(self.get_client(), self.bucket, self.region)
         except ClientError as e:
             error_code = e.response["Error"]["Code"]
             logger.error(f"Failed to validate bucket {self.bucket}: {error_code} - {str(e)}")
             raise ValueError(f"Cannot access S3 bucket {self.bucket}: {str(e)}")
 
     def get_client(self):
-        """Create and return an S3 client with the configured settings."""
+        """Return the shared S3 client for these settings."""
         try:
-            session = boto3.Session(
-                aws_access_key_id=self.access_key_id,
-                aws_secret_access_key=self.secret_access_key,
-                aws_session_token=self.session_token,
-                region_name=self.region
+            return client_cache.get_client(
+                self.access_key_id, self.secret_access_key, self.session_token, self.region, self.endpoint_url
             )
-            client = session.client(
-                "s3",
-                endpoint_url=self.endpoint_url,
-                config=self.retry_config
-            )
-            return client
         except Exception as e:
             logger.error(f"Failed to create S3 client: {str(e)}")
             raise RuntimeError(f"Failed to initialize S3 client: {str(e)}")
 
     def get_resource(self):
-        """Create and return an S3 resource with the configured settings."""
+        """Return the shared S3 resource for these settings."""
         try:
-            session = boto3.Session(
-                aws_access_key_id=self.access_key_id,
-                aws_secret_access_key=self.secret_access_key,
-                aws_session_token=self.session_token,
-                region_name=self.region
-            )
-            resource = session.resource(
-                "s3",
-                endpoint_url=self.endpoint_url,
-                config=self.retry_config
+            return client_cache.get_resource(
+                self.access_key_id, self.secret_access_key, self.session_token, self.region, self.endpoint_url
             )
-            return resource
         except Exception as e:
             logger.error(f"Failed to create S3 resource: {str(e)}")
             raise RuntimeError(f"Failed to initialize S3 resource: {str(e)}")
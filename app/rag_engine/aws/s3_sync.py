@@ -0,0 +1,205 @@
+"""
+Directory sync to S3 for RAGBot.
+Mirrors a local directory (e.g. the data/ corpus) under an S3 prefix with one paginated
+listing and parallel uploads of only the files that changed.
+Location: app/rag_engine/aws/s3_sync.py
+
+A local manifest records, per file, the size, mtime and MD5 it had when last
+synced, and the ETag of the object that holds it. A file whose size and
+mtime are unchanged is not re-hashed. Objects are uploaded with their MD5 in
+the x-amz-meta-md5 header, because the ETag of a multipart upload is not the
+content MD5.
+
+    python -m app.rag_engine.aws.s3_sync data corpus/ --delete
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from botocore.exceptions import ClientError
+from app.rag_engine.aws.s3_client import transfer_config
+from app.rag_engine.aws.s3_utils import S3Utils
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+S3_SYNC_WORKERS = int(os.getenv("S3_SYNC_WORKERS", 16))
+S3_SYNC_MANIFEST_DIR = os.getenv("S3_SYNC_MANIFEST_DIR", "app/local/s3_sync")
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1024 * 1024
+
+
+def file_md5(path):
+    hasher = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def manifest_path_for(bucket, prefix, local_dir):
+    """One manifest per (bucket, prefix, directory), kept outside the synced directory."""
+    scope = f"{bucket}\0{prefix}\0{os.path.abspath(local_dir)}"
+    return os.path.join(S3_SYNC_MANIFEST_DIR, hashlib.sha1(scope.encode()).hexdigest()[:16] + ".json")
+
+
+def load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(path, files):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "files": files}, f)
+    os.replace(tmp, path)
+
+
+def scan_local(local_dir):
+    """rel_path (with / separators) -> os.stat_result for every regular file."""
+    files = {}
+    for root, dirs, names in os.walk(local_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            if name.startswith("."):
+                continue
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, local_dir).replace(os.sep, "/")
+            files[rel] = os.stat(path)
+    return files
+
+
+class DirectorySync:
+    def __init__(self, local_dir, prefix, s3_utils=None, workers=S3_SYNC_WORKERS, manifest_path=None):
+        self.local_dir = local_dir
+        self.prefix = prefix if not prefix or prefix.endswith("/") else prefix + "/"
+        self.s3_utils = s3_utils or S3Utils()
+        self.workers = workers
+        self.manifest_path = manifest_path or manifest_path_for(self.s3_utils.bucket, self.prefix, local_dir)
+
+    def _local_md5(self, rel, stat, entry):
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry["md5"], False
+        return file_md5(os.path.join(self.local_dir, rel)), True
+
+    def _remote_md5(self, key, remote):
+        etag = remote["ETag"].strip('"')
+        if "-" not in etag:
+            return etag  # single-part upload: the ETag is the MD5
+        try:
+            head = self.s3_utils.s3_client.head_object(Bucket=self.s3_utils.bucket, Key=key)
+        except ClientError:
+            return None
+        return head.get("Metadata", {}).get("md5")
+
+    def _sync_file(self, rel, stat, entry, remote, dry_run):
+        """Returns (action, manifest entry, hashed)."""
+        key = self.prefix + rel
+        md5, hashed = self._local_md5(rel, stat, entry)
+        new_entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "md5": md5, "etag": None}
+
+        if remote is not None and remote["Size"] == stat.st_size:
+            etag = remote["ETag"].strip('"')
+            if entry and entry.get("md5") == md5:
+                if entry.get("etag") == etag:
+                    return "skipped", {**new_entry, "etag": etag}, hashed
+                if entry.get("etag") is None and entry.get("uploaded"):
+                    # Our own upload from a previous run; adopt the ETag S3 assigned it
+                    return "skipped", {**new_entry, "etag": etag}, hashed
+            if self._remote_md5(key, remote) == md5:
+                return "skipped", {**new_entry, "etag": etag}, hashed
+
+        if dry_run:
+            return "would_upload", entry, hashed
+        self.s3_utils.s3_client.upload_file(
+            os.path.join(self.local_dir, rel), self.s3_utils.bucket, key,
+            ExtraArgs={"Metadata": {"md5": md5}}, Config=transfer_config()
+        )
+        # The ETag is read from the next listing rather than costing a HEAD per upload
+        return "uploaded", {**new_entry, "uploaded": True}, hashed
+
+    def _delete_remote(self, keys):
+        client = self.s3_utils.s3_client
+        for i in range(0, len(keys), 1000):
+            client.delete_objects(
+                Bucket=self.s3_utils.bucket,
+                Delete={"Objects": [{"Key": key} for key in keys[i:i + 1000]], "Quiet": True}
+            )
+
+    def run(self, delete=False, dry_run=False):
+        if self.s3_utils.disable_s3:
+            logger.debug(f"Sync of {self.local_dir} skipped due to DISABLE_S3=true")
+            return {"disabled": True}
+        start = time.perf_counter()
+        manifest = load_manifest(self.manifest_path)
+        local = scan_local(self.local_dir)
+        remote = {obj["Key"]: obj for obj in self.s3_utils.list_objects(self.prefix)}
+
+        report = {"files": len(local), "remote_objects": len(remote), "uploaded": 0, "skipped": 0,
+                  "would_upload": 0, "deleted": 0, "failed": 0, "hashed": 0, "bytes_uploaded": 0}
+        new_manifest = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="s3-sync") as pool:
+            futures = {
+                pool.submit(self._sync_file, rel, stat, manifest.get(rel), remote.get(self.prefix + rel), dry_run): rel
+                for rel, stat in local.items()
+            }
+            for future in as_completed(futures):
+                rel = futures[future]
+                try:
+                    action, entry, hashed = future.result()
+                except Exception as e:
+                    logger.error(f"Sync of {rel} failed: {e}")
+                    report["failed"] += 1
+                    continue
+                report[action] += 1
+                report["hashed"] += int(hashed)
+                if action == "uploaded":
+                    report["bytes_uploaded"] += local[rel].st_size
+                if entry:
+                    new_manifest[rel] = entry
+
+        stale = sorted(key for key in remote if key[len(self.prefix):] not in local)
+        if delete and stale:
+            if dry_run:
+                report["would_delete"] = len(stale)
+            else:
+                self._delete_remote(stale)
+                report["deleted"] = len(stale)
+        if not dry_run:
+            save_manifest(self.manifest_path, new_manifest)
+
+        report["seconds"] = round(time.perf_counter() - start, 3)
+        logger.info(f"Synced {self.local_dir} -> s3://{self.s3_utils.bucket}/{self.prefix}: {report}")
+        return report
+
+
+def sync_directory(local_dir, prefix, delete=False, dry_run=False, workers=S3_SYNC_WORKERS, s3_utils=None):
+    return DirectorySync(local_dir, prefix, s3_utils=s3_utils, workers=workers).run(delete=delete, dry_run=dry_run)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync a local directory to an S3 prefix")
+    parser.add_argument("local_dir")
+    parser.add_argument("prefix")
+    parser.add_argument("--delete", action="store_true", help="Delete remote objects with no local file")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--workers", type=int, default=S3_SYNC_WORKERS)
+    args = parser.parse_args(argv)
+    report = sync_directory(args.local_dir, args.prefix, delete=args.delete, dry_run=args.dry_run, workers=args.workers)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
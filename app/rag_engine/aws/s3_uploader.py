@@ -7,11 +7,23 @@ Location: app/rag_engine/aws/s3_uploader.py
 import os
 import json
 from botocore.exceptions import ClientError
+from app.rag_engine.aws.s3_client import transfer_config
 from app.rag_engine.aws.s3_utils import S3Utils
 from app.utils.logger import get_logger
+from app.utils.tracing import traced
 
 logger = get_logger(__name__)
 
+
+def document_key(user_id, doc_id, filename):
+    """Key for an uploaded document, keeping the extension of ``filename`` (.pdf, .docx, ...)."""
+    return f"users/{user_id}/uploads/{doc_id}{os.path.splitext(filename)[1].lower()}"
+
+
+def message_key(user_id, conv_id, message_id):
+    return f"users/{user_id}/messages/{conv_id}/{message_id}.json"
+
+
 class S3Uploader:
     """Handles S3 uploads and downloads for RAGBot documents and conversations."""
 
@@ -21,34 +33,37 @@ class S3Uploader:
         if self.disable_s3:
             logger.info("S3 uploads disabled via DISABLE_S3 environment variable")
 
+    @traced("s3")
     def upload_document(self, user_id, doc_id, file_path):
         """Upload a document to S3."""
         if self.disable_s3:
             logger.debug(f"S3 upload skipped for document {doc_id} due to DISABLE_S3")
             return None
-        key = f"users/{user_id}/uploads/{doc_id}.pdf"
+        key = document_key(user_id, doc_id, file_path)
         try:
-            self.s3_utils.s3_client.upload_file(file_path, self.s3_utils.bucket, key)
+            self.s3_utils.s3_client.upload_file(file_path, self.s3_utils.bucket, key, Config=transfer_config())
             logger.info(f"Uploaded document {doc_id} to s3://{self.s3_utils.bucket}/{key}")
             return key
         except ClientError as e:
             logger.error(f"Failed to upload document {doc_id}: {str(e)}")
             raise
 
+    @traced("s3")
     def download_document(self, user_id, doc_id, local_path):
         """Download a document from S3."""
         if self.disable_s3:
             logger.debug(f"S3 download skipped for document {doc_id} due to DISABLE_S3")
             return None
-        key = f"users/{user_id}/uploads/{doc_id}.pdf"
+        key = document_key(user_id, doc_id, local_path)
         try:
-            self.s3_utils.s3_client.download_file(self.s3_utils.bucket, key, local_path)
+            self.s3_utils.s3_client.download_file(self.s3_utils.bucket, key, local_path, Config=transfer_config())
             logger.info(f"Downloaded document {doc_id} from s3://{self.s3_utils.bucket}/{key} to {local_path}")
             return local_path
         except ClientError as e:
             logger.error(f"Failed to download document {doc_id}: {str(e)}")
             raise
 
+    @traced("s3")
     def upload_metadata(self, doc_id, metadata):
         """Upload document metadata to S3 as JSON."""
         if self.disable_s3:
@@ -68,6 +83,7 @@ class S3Uploader:
             logger.error(f"Failed to upload metadata {doc_id}: {str(e)}")
             raise
 
+    @traced("s3")
     def upload_conversation(self, user_id, conv_id, data):
         """Upload conversation data to S3 as JSON."""
         if self.disable_s3:
@@ -87,12 +103,13 @@ class S3Uploader:
             logger.error(f"Failed to upload conversation {conv_id}: {str(e)}")
             raise
 
+    @traced("s3")
     def upload_message(self, user_id, conv_id, message_id, data):
         """Upload message data to S3 as JSON."""
         if self.disable_s3:
             logger.debug(f"S3 upload skipped for message {message_id} due to DISABLE_S3")
             return None
-        key = f"users/{user_id}/messages/{conv_id}/{message_id}.json"
+        key = message_key(user_id, conv_id, message_id)
         try:
             self.s3_utils.s3_client.put_object(
                 Bucket=self.s3_utils.bucket,
@@ -1,9 +1,8 @@
 import os
-import boto3
-from botocore.config import Config
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 import hashlib
+from app.rag_engine.aws import s3_client as client_cache
 from app.utils.logger import get_logger
 
 load_dotenv()
@@ -18,31 +17,28 @@ class S3Utils:
         self.bucket = bucket_name or os.getenv("S3_BUCKET", "ragbot-conversations")
         self.endpoint_url = os.getenv("AWS_ENDPOINT_URL")
         self.disable_s3 = os.getenv("DISABLE_S3", "false").lower() == "true"
-        self.retry_config = Config(
-            retries={"max_attempts": int(os.getenv("AWS_MAX_RETRIES", 5)), "mode": "standard"},
-            region_name=self.region
-        )
-        self.s3_client = self._create_client()
         if not self.disable_s3:
-            self._validate()
-            self.init_bucket()
+            self._validate_env()
+        # The client is shared per process and the bucket is checked on first use, so
+        # constructing S3Utils (once per S3Uploader) costs no network round trips
+        self._client = self._create_client()
 
     def _create_client(self):
         try:
-            session = boto3.Session(
-                aws_access_key_id=self.access_key_id,
-                aws_secret_access_key=self.secret_access_key,
-                aws_session_token=self.session_token,
-                region_name=self.region
+            return client_cache.get_client(
+                self.access_key_id, self.secret_access_key, self.session_token, self.region, self.endpoint_url
             )
-            client = session.client("s3", endpoint_url=self.endpoint_url, config=self.retry_config)
-            logger.debug(f"S3 client created for region {self.region}, bucket {self.bucket}")
-            return client
         except Exception as e:
             logger.error(f"Failed to create S3 client: {str(e)}")
             raise RuntimeError(f"Failed to initialize S3 client: {str(e)}")
 
-    def _validate(self):
+    @property
+    def s3_client(self):
+        if not self.disable_s3:
+            self.init_bucket()
+        return self._client
+
+    def _validate_env(self):
         required_vars = {
             "AWS_ACCESS_KEY_ID": self.access_key_id,
             "AWS_SECRET_ACCESS_KEY": self.secret_access_key,
@@ -54,44 +50,37 @@ class S3Utils:
             error_msg = f"Missing required environment variables: {', '.join(missing)}"
             logger.error(error_msg)
             raise ValueError(error_msg)
-        try:
-            self.s3_client.head_bucket(Bucket=self.bucket)
-            logger.info(f"Validated access to S3 bucket: {self.bucket}")
-        except ClientError as e:
-            error_code = e.response["Error"]["Code"]
-            logger.error(f"Failed to validate bucket {self.bucket}: {error_code} - {str(e)}")
-            raise ValueError(f"Cannot access S3 bucket {self.bucket}: {str(e)}")
 
     def init_bucket(self):
+        """Check (and if missing, create) the bucket; a no-op after the first success in this process."""
         if self.disable_s3:
             logger.debug("Bucket initialization skipped due to DISABLE_S3=true")
             return
         try:
-            self.s3_client.create_bucket(
-                Bucket=self.bucket,
-                CreateBucketConfiguration={"LocationConstraint": self.region}
-            )
-            logger.info(f"Created S3 bucket: {self.bucket}")
+            client_cache.ensure_bucket(self._client, self.bucket, self.region, create=True)
         except ClientError as e:
             error_code = e.response["Error"]["Code"]
-            if error_code not in ["BucketAlreadyOwnedByYou", "BucketAlreadyExists"]:
-                logger.error(f"Failed to create bucket {self.bucket}: {str(e)}")
-                raise
-            logger.debug(f"Bucket {self.bucket} already exists")
+            logger.error(f"Failed to validate bucket {self.bucket}: {error_code} - {str(e)}")
+            raise ValueError(f"Cannot access S3 bucket {self.bucket}: {str(e)}")
 
-    def list_keys(self, prefix=""):
+    def list_objects(self, prefix=""):
+        """Every object under ``prefix`` (Key, Size, ETag, LastModified), following pagination."""
         if self.disable_s3:
-            logger.debug(f"List keys skipped due to DISABLE_S3=true, prefix: {prefix}")
+            logger.debug(f"List objects skipped due to DISABLE_S3=true, prefix: {prefix}")
             return []
         try:
-            response = self.s3_client.list_objects_v2(Bucket=self.bucket, Prefix=prefix)
-            keys = [obj["Key"] for obj in response.get("Contents", [])]
-            logger.debug(f"Listed {len(keys)} keys with prefix '{prefix}' in bucket {self.bucket}")
-            return keys
+            objects = []
+            for page in self.s3_client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix):
+                objects.extend(page.get("Contents", []))
+            logger.debug(f"Listed {len(objects)} objects with prefix '{prefix}' in bucket {self.bucket}")
+            return objects
         except ClientError as e:
             logger.error(f"Failed to list keys with prefix '{prefix}': {str(e)}")
             raise
 
+    def list_keys(self, prefix=""):
+        return [obj["Key"] for obj in self.list_objects(prefix)]
+
     def check_exists(self, key):
         if self.disable_s3:
             logger.debug(f"Check exists skipped for key {key} due to DISABLE_S3=true")
@@ -122,7 +111,7 @@ class S3Utils:
         try:
             hasher = hashlib.md5()
             with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
                     hasher.update(chunk)
             file_hash = hasher.hexdigest()
             logger.debug(f"Calculated MD5 hash for {file_path}: {file_hash}")
@@ -136,13 +125,22 @@ class S3Utils:
             logger.debug(f"Upload skipped for key {key} due to DISABLE_S3=true")
             return False
         try:
-            if self.check_exists(key):
-                s3_hash = self.s3_client.head_object(Bucket=self.bucket, Key=key).get("ETag", "").strip('"')
-                local_hash = self.get_file_hash(file_path)
+            local_hash = self.get_file_hash(file_path)
+            try:
+                head = self.s3_client.head_object(Bucket=self.bucket, Key=key)
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+                    raise
+                head = None
+            if head is not None:
+                # Multipart ETags are not content MD5s; prefer the hash stored at upload
+                etag = head.get("ETag", "").strip('"')
+                s3_hash = head.get("Metadata", {}).get("md5") or (etag if "-" not in etag else None)
                 if s3_hash == local_hash:
                     logger.debug(f"No changes detected for key {key}, skipping upload")
                     return False
-            self.s3_client.upload_file(file_path, self.bucket, key)
+            self.s3_client.upload_file(file_path, self.bucket, key, ExtraArgs={"Metadata": {"md5": local_hash}},
+                                       Config=client_cache.transfer_config())
             logger.info(f"Uploaded file to s3://{self.bucket}/{key}")
             return True
         except ClientError as e:
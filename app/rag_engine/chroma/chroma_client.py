@@ -1,30 +1,240 @@
 import chromadb
 import uuid
+import hashlib
+import json
 import logging
+import math
+import os
+import threading
+import time
 from typing import List, Dict, Optional
 from pathlib import Path
-from app.rag_engine.chroma.vector_schema import DocumentEmbedding, ConversationContext
+from app.rag_engine.chroma.vector_schema import DocumentEmbedding, ConversationContext, HNSWConfig
+from app.utils.metrics import CHROMA_QUERY_LATENCY, record_cache
+from app.utils.tracing import span
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DOC_COLLECTION = "document_embeddings"
+CONV_COLLECTION = "conversation_context"
+SUMMARY_COLLECTION = "document_summaries"
+PUBLIC_VISIBILITY = "public"
+# Owner recorded on chunks ingested before uploads carried a real user id
+LEGACY_USER_ID = "user_id_placeholder"
+
+# Coarse stage of retrieval: how many documents to shortlist before searching
+# their chunks. 0 searches every chunk directly.
+COARSE_TOP_DOCUMENTS = int(os.getenv("CHROMA_COARSE_TOP_DOCUMENTS", 8))
+# Chunk collections whose every document has a summary, kept next to chroma.sqlite3
+SUMMARY_COVERAGE_FILE = "summary_coverage.json"
+
+
+def tenant_collection_name(base_name: str, user_id: str) -> str:
+    """Name of the per-user shard of ``base_name``.
+
+    Chroma collection names are limited to 63 characters, so UUIDs are
+    reduced to their hex form and any other id is hashed.
+    """
+    try:
+        key = uuid.UUID(str(user_id)).hex
+    except ValueError:
+        key = hashlib.sha1(str(user_id).encode("utf-8")).hexdigest()[:32]
+    return f"{base_name}__{key}"
+
+
+def is_owned(metadata: Dict) -> bool:
+    user_id = metadata.get("user_id")
+    return bool(user_id) and user_id != LEGACY_USER_ID
+
+
+def is_shared(metadata: Dict) -> bool:
+    """Public documents, and documents without an owner, live in the shared collection."""
+    return metadata.get("visibility") == PUBLIC_VISIBILITY or not is_owned(metadata)
+
+
+def summarize_chunks(chunks: List[DocumentEmbedding]) -> DocumentEmbedding:
+    """One summary vector per document: the normalised mean of its chunk embeddings."""
+    dim = len(chunks[0].vector)
+    mean = [sum(c.vector[i] for c in chunks) / len(chunks) for i in range(dim)]
+    norm = math.sqrt(sum(v * v for v in mean)) or 1.0
+    first = chunks[0].metadata
+    return DocumentEmbedding(
+        id=first["doc_id"],
+        vector=[v / norm for v in mean],
+        content=first.get("filename") or first.get("source", ""),
+        metadata={
+            "doc_id": first["doc_id"],
+            "user_id": first.get("user_id", ""),
+            "visibility": first.get("visibility", ""),
+            "source": first.get("source", ""),
+            "filename": first.get("filename", ""),
+            "chunk_count": len(chunks),
+            "tags": "",
+            "keywords": "",
+            "conversation_ids": ""
+        }
+    )
+
+
+def merge_query_results(results: List[Dict], n_results: int) -> Dict:
+    """Merge several single-query Chroma results into one, ordered by distance."""
+    rows = []
+    for result in results:
+        if not result or not result.get("ids") or not result["ids"][0]:
+            continue
+        rows.extend(zip(
+            result["ids"][0],
+            result["documents"][0],
+            result["metadatas"][0],
+            result["distances"][0]
+        ))
+    rows.sort(key=lambda row: row[3])
+    rows = rows[:n_results]
+    return {
+        "ids": [[r[0] for r in rows]],
+        "documents": [[r[1] for r in rows]],
+        "metadatas": [[r[2] for r in rows]],
+        "distances": [[r[3] for r in rows]]
+    }
+
+
 class ChromaClient:
-    def __init__(self, persist_directory: str = "app/data/chroma"):
+    """Chroma access layer.
+
+    Documents are sharded by owner: private chunks go to a per-user
+    collection (``document_embeddings__<user>``) and public ones to the
+    shared ``document_embeddings`` collection. Queries that carry a
+    ``user_id`` search the user's shard plus the public documents and
+    merge the results, so search cost follows the size of the user's
+    corpus rather than everyone's.
+
+    HNSW parameters are configured per base collection (and inherited by its
+    per-user shards) through ``index_configs`` or the ``CHROMA_DOCS_HNSW_*`` /
+    ``CHROMA_CONV_HNSW_*`` / ``CHROMA_SUMMARY_HNSW_*`` environment variables.
+
+    Each document also gets one summary vector in ``document_summaries``
+    (sharded the same way). Retrieval is coarse-to-fine: the summaries pick
+    the top documents, then only their chunks are searched via a ``doc_id``
+    filter. That is only done once every chunk collection the query touches
+    is recorded as fully summarised (``summary_coverage.json``): collections
+    created empty are, and ``build_missing_summaries`` marks the rest.
+    Until then retrieval searches the chunks directly, so documents indexed
+    before summaries existed are never filtered out.
+    """
+
+    def __init__(self, persist_directory: str = "app/data/chroma", index_configs: Optional[Dict[str, HNSWConfig]] = None):
         self.client = chromadb.PersistentClient(path=persist_directory)
-        self.doc_collection = self.client.get_or_create_collection(
-            name="document_embeddings",
-            metadata={"hnsw:space": "cosine"}
-        )
-        self.conv_collection = self.client.get_or_create_collection(
-            name="conversation_context",
-            metadata={"hnsw:space": "cosine"}
+        self._coverage_path = os.path.join(persist_directory, SUMMARY_COVERAGE_FILE)
+        self._coverage = set()
+        self._coverage_mtime = None
+        self._coverage_lock = threading.Lock()
+        self.index_configs = {
+            DOC_COLLECTION: HNSWConfig.from_env("CHROMA_DOCS"),
+            CONV_COLLECTION: HNSWConfig.from_env("CHROMA_CONV"),
+            SUMMARY_COLLECTION: HNSWConfig.from_env("CHROMA_SUMMARY")
+        }
+        self.index_configs.update(index_configs or {})
+        self._open_shared_collections()
+        self._tenant_collections = {}
+
+    def _open_shared_collections(self):
+        self.doc_collection = self._get_or_create(DOC_COLLECTION, DOC_COLLECTION)
+        self.conv_collection = self._get_or_create(CONV_COLLECTION, CONV_COLLECTION)
+        self.summary_collection = self._get_or_create(SUMMARY_COLLECTION, SUMMARY_COLLECTION)
+
+    def _shared(self, base_name: str):
+        return {
+            DOC_COLLECTION: self.doc_collection,
+            CONV_COLLECTION: self.conv_collection,
+            SUMMARY_COLLECTION: self.summary_collection
+        }[base_name]
+
+    def _get_or_create(self, name: str, base_name: str):
+        collection = self.client.get_or_create_collection(
+            name=name,
+            metadata=self.index_configs[base_name].to_metadata()
         )
+        if base_name == DOC_COLLECTION and not self.summaries_complete(name) and collection.count() == 0:
+            # Nothing to backfill: every document ingested from now on gets its summary
+            self._set_summaries_complete([name], True)
+        return collection
 
-    def get_doc_collection(self):
-        return self.doc_collection
+    def _load_coverage(self) -> set:
+        try:
+            mtime = os.stat(self._coverage_path).st_mtime_ns
+        except FileNotFoundError:
+            return set()
+        if mtime != self._coverage_mtime:
+            try:
+                with open(self._coverage_path, encoding="utf-8") as f:
+                    self._coverage = set(json.load(f).get("complete", []))
+            except (OSError, ValueError):
+                self._coverage = set()
+            self._coverage_mtime = mtime
+        return self._coverage
 
-    def get_conv_collection(self):
-        return self.conv_collection
+    def summaries_complete(self, name: str) -> bool:
+        """Whether every document in chunk collection ``name`` has a summary vector."""
+        return name in self._load_coverage()
+
+    def _set_summaries_complete(self, names: List[str], complete: bool):
+        with self._coverage_lock:
+            coverage = set(self._load_coverage())
+            if complete:
+                coverage.update(names)
+            else:
+                coverage.difference_update(names)
+            tmp = self._coverage_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"complete": sorted(coverage)}, f)
+            os.replace(tmp, self._coverage_path)
+            self._coverage, self._coverage_mtime = coverage, os.stat(self._coverage_path).st_mtime_ns
+
+    def _summaries_cover(self, user_id: Optional[str]) -> bool:
+        if not self.summaries_complete(DOC_COLLECTION):
+            return False
+        if user_id is None:
+            return True
+        tenant = self._get_tenant_collection(DOC_COLLECTION, user_id, create=False)
+        return tenant is None or self.summaries_complete(tenant.name)
+
+    def get_doc_collection(self, user_id: Optional[str] = None):
+        if user_id is None:
+            return self.doc_collection
+        return self._get_tenant_collection(DOC_COLLECTION, user_id)
+
+    def get_conv_collection(self, user_id: Optional[str] = None):
+        if user_id is None:
+            return self.conv_collection
+        return self._get_tenant_collection(CONV_COLLECTION, user_id)
+
+    def _get_tenant_collection(self, base_name: str, user_id: str, create: bool = True):
+        name = tenant_collection_name(base_name, user_id)
+        collection = self._tenant_collections.get(name)
+        record_cache("chroma_tenant_collection", collection is not None)
+        if collection is not None:
+            return collection
+        if create:
+            collection = self._get_or_create(name, base_name)
+        else:
+            try:
+                collection = self.client.get_collection(name=name)
+            except Exception:
+                # Users without private documents have no shard yet.
+                return None
+        self._tenant_collections[name] = collection
+        return collection
+
+    def _route(self, base_name: str, metadata: Dict):
+        if base_name == CONV_COLLECTION:
+            # Conversation context is never public
+            shared = not metadata.get("user_id")
+        else:
+            shared = is_shared(metadata)
+        if shared:
+            return self._shared(base_name)
+        return self._get_tenant_collection(base_name, metadata["user_id"])
 
     def _validate_document_embeddings(self, embeddings: List[DocumentEmbedding]):
         for emb in embeddings:
@@ -36,40 +246,47 @@ class ChromaClient:
             if not isinstance(ctx, ConversationContext):
                 raise ValueError(f"Invalid type: Expected ConversationContext, got {type(ctx)}")
 
+    def _add_grouped(self, base_name: str, items, upsert: bool = False):
+        groups = {}
+        for item in items:
+            collection = self._route(base_name, item.metadata)
+            groups.setdefault(collection.name, (collection, []))[1].append(item)
+
+        for collection, group in groups.values():
+            write = collection.upsert if upsert else collection.add
+            write(
+                ids=[e.id for e in group],
+                embeddings=[e.vector for e in group],
+                metadatas=[e.metadata for e in group],
+                documents=[e.content for e in group]
+            )
+
     def add_docs(self, embeddings: List[DocumentEmbedding]):
         self._validate_document_embeddings(embeddings)
-        ids = [e.id for e in embeddings]
-        vectors = [e.vector for e in embeddings]
-        metadatas = [e.metadata for e in embeddings]
-        contents = [e.content for e in embeddings]
-
-        self.doc_collection.add(
-            ids=ids,
-            embeddings=vectors,
-            metadatas=metadatas,
-            documents=contents
-        )
+        self._add_grouped(DOC_COLLECTION, embeddings)
         logger.info(f"✅ Added {len(embeddings)} documents to vectorstore.")
 
+    def add_document_summaries(self, summaries: List[DocumentEmbedding]):
+        """Store (or replace) per-document summary vectors, keyed by doc_id."""
+        self._validate_document_embeddings(summaries)
+        try:
+            self._add_grouped(SUMMARY_COLLECTION, summaries, upsert=True)
+        except Exception:
+            # Their chunks are indexed; until a backfill, search those collections flat
+            chunk_collections = {self._route(DOC_COLLECTION, s.metadata).name for s in summaries}
+            self._set_summaries_complete(sorted(chunk_collections), False)
+            raise
+        logger.info(f"✅ Indexed {len(summaries)} document summaries.")
+
     def add_conversation_context(self, contexts: List[ConversationContext]):
         self._validate_conversation_contexts(contexts)
-        ids = [c.id for c in contexts]
-        vectors = [c.vector for c in contexts]
-        metadatas = [c.metadata for c in contexts]
-        contents = [c.content for c in contexts]
-
-        self.conv_collection.add(
-            ids=ids,
-            embeddings=vectors,
-            metadatas=metadatas,
-            documents=contents
-        )
+        self._add_grouped(CONV_COLLECTION, contexts)
         logger.info(f"✅ Added {len(contexts)} conversation contexts.")
 
     def update_doc(self, embedding: DocumentEmbedding):
         if not isinstance(embedding, DocumentEmbedding):
             raise ValueError("Expected a DocumentEmbedding instance.")
-        self.doc_collection.update(
+        self._route(DOC_COLLECTION, embedding.metadata).update(
             ids=[embedding.id],
             embeddings=[embedding.vector],
             metadatas=[embedding.metadata],
@@ -80,7 +297,7 @@ class ChromaClient:
     def update_conversation_context(self, context: ConversationContext):
         if not isinstance(context, ConversationContext):
             raise ValueError("Expected a ConversationContext instance.")
-        self.conv_collection.update(
+        self._route(CONV_COLLECTION, context.metadata).update(
             ids=[context.id],
             embeddings=[context.vector],
             metadatas=[context.metadata],
@@ -88,42 +305,244 @@ class ChromaClient:
         )
         logger.info(f"🔁 Updated conversation context: {context.id}")
 
-    def query_docs(self, query_vector: List[float], n_results: int = 5, where: Optional[Dict] = None):
-        return self.doc_collection.query(
+    def _query_partitioned(self, base_name: str, query_vector: List[float], n_results: int,
+                           where: Optional[Dict], user_id: Optional[str]):
+        """Without ``user_id`` only the shared collection is searched. With it,
+        the user's shard and the public entries are searched and merged."""
+        shared = self._shared(base_name)
+        if user_id is None:
+            return shared.query(
+                query_embeddings=[query_vector],
+                n_results=n_results,
+                where=where
+            )
+
+        public_filter = {"visibility": PUBLIC_VISIBILITY}
+        shared_where = {"$and": [where, public_filter]} if where else public_filter
+        results = [shared.query(
             query_embeddings=[query_vector],
             n_results=n_results,
-            where=where
-        )
+            where=shared_where
+        )]
 
-    def query_conversation_context(self, query_vector: List[float], n_results: int = 5, where: Optional[Dict] = None):
-        return self.conv_collection.query(
+        tenant = self._get_tenant_collection(base_name, user_id, create=False)
+        if tenant is not None:
+            results.append(tenant.query(
+                query_embeddings=[query_vector],
+                n_results=n_results,
+                where=where
+            ))
+        return merge_query_results(results, n_results)
+
+    def query_documents(self, query_vector: List[float], n_results: int = 8,
+                        user_id: Optional[str] = None) -> List[str]:
+        """Coarse stage: ids of the documents whose summaries best match the query."""
+        result = self._query_partitioned(SUMMARY_COLLECTION, query_vector, n_results, None, user_id)
+        return [meta["doc_id"] for meta in result["metadatas"][0] if meta.get("doc_id")]
+
+    def query_docs(self, query_vector: List[float], n_results: int = 5, where: Optional[Dict] = None,
+                   user_id: Optional[str] = None, top_documents: Optional[int] = None):
+        """Query document chunks.
+
+        Unless ``top_documents`` is 0, the document summaries are searched
+        first and the chunk search is restricted to the best ``top_documents``
+        documents. Every chunk is searched instead when the collections
+        involved are not fully summarised, or when no summaries match.
+        """
+        top_documents = COARSE_TOP_DOCUMENTS if top_documents is None else top_documents
+        if top_documents > 0 and self._summaries_cover(user_id):
+            with span("chroma.documents"):
+                doc_ids = self.query_documents(query_vector, n_results=top_documents, user_id=user_id)
+            if doc_ids:
+                doc_filter = {"doc_id": {"$in": doc_ids}}
+                where = {"$and": [where, doc_filter]} if where else doc_filter
+        start = time.perf_counter()
+        with span("chroma.chunks"):
+            results = self._query_partitioned(DOC_COLLECTION, query_vector, n_results, where, user_id)
+        CHROMA_QUERY_LATENCY.observe(time.perf_counter() - start)
+        return results
+
+    def query_conversation_context(self, query_vector: List[float], n_results: int = 5, where: Optional[Dict] = None,
+                                   user_id: Optional[str] = None):
+        collection = self.conv_collection
+        if user_id is not None:
+            collection = self._get_tenant_collection(CONV_COLLECTION, user_id, create=False)
+            if collection is None:
+                return merge_query_results([], n_results)
+        return collection.query(
             query_embeddings=[query_vector],
             n_results=n_results,
             where=where
         )
 
-    def delete_docs(self, ids: List[str]):
-        self.doc_collection.delete(ids=ids)
+    def delete_docs(self, ids: List[str], user_id: Optional[str] = None):
+        self.get_doc_collection(user_id).delete(ids=ids)
         logger.info(f"🗑️ Deleted {len(ids)} document embeddings.")
 
-    def delete_conversation_context(self, ids: List[str]):
-        self.conv_collection.delete(ids=ids)
+    def delete_document(self, doc_id: str, user_id: Optional[str] = None):
+        """Remove every chunk of a document together with its summary.
+
+        With ``user_id`` only that user's copy is removed; doc_id is the file
+        hash, so the same id may also name a public document in the shared
+        collections.
+        """
+        if user_id is None:
+            chunks, summaries = self.doc_collection, self.summary_collection
+        else:
+            chunks = self._get_tenant_collection(DOC_COLLECTION, user_id, create=False)
+            summaries = self._get_tenant_collection(SUMMARY_COLLECTION, user_id, create=False)
+        if chunks is not None:
+            chunks.delete(where={"doc_id": doc_id})
+        if summaries is not None:
+            summaries.delete(ids=[doc_id])
+        logger.info(f"🗑️ Deleted document {doc_id} from vectorstore.")
+
+    def build_missing_summaries(self, batch_size: int = 1000) -> int:
+        """Backfill summaries for chunks indexed before summaries existed.
+
+        Older ingests gave every chunk its own random doc_id, so chunks are
+        grouped by file hash and their doc_id is rewritten to match.
+        """
+        built = 0
+        for name in self._collection_names():
+            if not name.startswith(DOC_COLLECTION):
+                continue
+            collection = self.client.get_collection(name=name)
+            by_doc, relabel, offset = {}, {}, 0
+            while True:
+                batch = collection.get(offset=offset, limit=batch_size, include=["embeddings", "metadatas"])
+                if not batch["ids"]:
+                    break
+                for chunk_id, vector, meta in zip(batch["ids"], batch["embeddings"], batch["metadatas"]):
+                    doc_id = meta.get("hash") or meta.get("doc_id") or chunk_id
+                    if meta.get("doc_id") != doc_id:
+                        meta = dict(meta, doc_id=doc_id)
+                        relabel[chunk_id] = meta
+                    by_doc.setdefault(doc_id, []).append(
+                        DocumentEmbedding(vector=list(vector), content="", id=chunk_id, metadata=meta)
+                    )
+                offset += len(batch["ids"])
+            ids = list(relabel)
+            for i in range(0, len(ids), batch_size):
+                chunk_ids = ids[i:i + batch_size]
+                collection.update(ids=chunk_ids, metadatas=[relabel[c] for c in chunk_ids])
+            summaries = [summarize_chunks(chunks) for chunks in by_doc.values()]
+            if summaries:
+                self.add_document_summaries(summaries)
+            built += len(summaries)
+            self._set_summaries_complete([name], True)
+        return built
+
+    def delete_conversation_context(self, ids: List[str], user_id: Optional[str] = None):
+        self.get_conv_collection(user_id).delete(ids=ids)
         logger.info(f"🗑️ Deleted {len(ids)} conversation contexts.")
 
+    def partition_legacy_docs(self, batch_size: int = 500) -> int:
+        """Sort the non-public rows that predate sharding out of the shared collections.
+
+        Chunks and summaries with a real owner move to that user's shard.
+        Ownerless ones, including everything the old loader ingested as
+        ``user_id_placeholder``, stay shared and are relabelled public so
+        user-scoped queries keep finding them.
+        """
+        moved = relabelled = 0
+        for base_name in (DOC_COLLECTION, SUMMARY_COLLECTION):
+            shared = self._shared(base_name)
+            offset = 0  # rows left in place that still match the filter
+            while True:
+                batch = shared.get(
+                    where={"visibility": {"$ne": PUBLIC_VISIBILITY}},
+                    offset=offset,
+                    limit=batch_size,
+                    include=["embeddings", "metadatas", "documents"]
+                )
+                if not batch["ids"]:
+                    break
+                owned, public = [], {}
+                for row_id, vector, meta, doc in zip(
+                    batch["ids"], batch["embeddings"], batch["metadatas"], batch["documents"]
+                ):
+                    if is_owned(meta):
+                        owned.append(DocumentEmbedding(vector=list(vector), content=doc, id=row_id, metadata=meta))
+                    else:
+                        public[row_id] = dict(meta, user_id="", visibility=PUBLIC_VISIBILITY)
+                if owned:
+                    if base_name == DOC_COLLECTION:
+                        # Fresh shards start out marked complete; their moved chunks may lack summaries
+                        targets = {self._route(DOC_COLLECTION, r.metadata).name for r in owned}
+                        self._set_summaries_complete(sorted(targets), False)
+                    self._add_grouped(base_name, owned, upsert=True)
+                    shared.delete(ids=[r.id for r in owned])
+                    moved += len(owned)
+                if public:
+                    shared.update(ids=list(public), metadatas=list(public.values()))
+                    relabelled += len(public)
+                offset += len(batch["ids"]) - len(owned) - len(public)
+        logger.info(f"📦 Moved {moved} private rows into per-user collections, marked {relabelled} ownerless rows public.")
+        return moved
+
+    def get_index_config(self, name: str) -> HNSWConfig:
+        """HNSW parameters a collection was actually built with."""
+        return HNSWConfig.from_metadata(self.client.get_collection(name=name).metadata)
+
+    def rebuild_collection(self, name: str, config: HNSWConfig, batch_size: int = 1000) -> int:
+        """Re-index ``name`` with new HNSW parameters.
+
+        The data is copied into a fresh collection built with ``config``,
+        the old collection is dropped and the new one takes over its name.
+        """
+        source = self.client.get_collection(name=name)
+        staging_name = f"{name}__rebuild"[:63]
+        try:
+            self.client.delete_collection(staging_name)
+        except Exception:
+            pass
+        staging = self.client.create_collection(name=staging_name, metadata=config.to_metadata())
+
+        copied = 0
+        while True:
+            batch = source.get(
+                offset=copied,
+                limit=batch_size,
+                include=["embeddings", "metadatas", "documents"]
+            )
+            if not batch["ids"]:
+                break
+            staging.add(
+                ids=batch["ids"],
+                embeddings=batch["embeddings"],
+                metadatas=batch["metadatas"],
+                documents=batch["documents"]
+            )
+            copied += len(batch["ids"])
+
+        self.client.delete_collection(name)
+        staging.modify(name=name)
+        rebuilt = self.client.get_collection(name=name)
+
+        if name == DOC_COLLECTION:
+            self.doc_collection = rebuilt
+        elif name == CONV_COLLECTION:
+            self.conv_collection = rebuilt
+        elif name == SUMMARY_COLLECTION:
+            self.summary_collection = rebuilt
+        elif name in self._tenant_collections:
+            self._tenant_collections[name] = rebuilt
+        logger.info(f"🔁 Rebuilt collection {name} with {config} ({copied} vectors).")
+        return copied
+
+    def _collection_names(self) -> List[str]:
+        # chromadb >= 0.6 returns names, older versions return Collection objects
+        return [getattr(c, "name", c) for c in self.client.list_collections()]
+
     def reset(self):
         try:
-            self.client.delete_collection("document_embeddings")
-            self.client.delete_collection("conversation_context")
+            for name in self._collection_names():
+                if name.startswith((DOC_COLLECTION, CONV_COLLECTION, SUMMARY_COLLECTION)):
+                    self.client.delete_collection(name)
             logger.info("🧹 All collections deleted successfully.")
         except Exception as e:
             logger.error(f"Error deleting collections: {e}")
-        self.doc_collection = self.client.get_or_create_collection(
-            name="document_embeddings",
-            metadata={"hnsw:space": "cosine"}
-        )
-        self.conv_collection = self.client.get_or_create_collection(
-            name="conversation_context",
-            metadata={"hnsw:space": "cosine"}
-        )
+        self._tenant_collections = {}
+        self._open_shared_collections()
         logger.info("✅ ChromaDB collections reset successfully.")
-
@@ -0,0 +1,175 @@
+"""
+HNSW parameter tuning harness for RAGBot.
+Location: app/rag_engine/chroma/hnsw_tuner.py
+
+Measures recall@k against exact (brute-force NumPy) cosine search and
+per-query latency percentiles for a grid of M / construction_ef / search_ef
+values, using the vectors already stored in our Chroma collection.
+
+    python -m app.rag_engine.chroma.hnsw_tuner bench --m 8 16 32 --search-ef 10 50 100
+    python -m app.rag_engine.chroma.hnsw_tuner apply --collection document_embeddings --m 32 --search-ef 64
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import chromadb
+import numpy as np
+
+from app.rag_engine.chroma.chroma_client import ChromaClient, DOC_COLLECTION
+from app.rag_engine.chroma.vector_schema import HNSWConfig
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def load_vectors(persist_directory: str, collection_name: str, limit: Optional[int] = None,
+                 page_size: int = 1000) -> np.ndarray:
+    """Read stored embeddings out of a persisted collection."""
+    client = chromadb.PersistentClient(path=persist_directory)
+    collection = client.get_collection(name=collection_name)
+    vectors = []
+    offset = 0
+    while limit is None or offset < limit:
+        size = page_size if limit is None else min(page_size, limit - offset)
+        batch = collection.get(offset=offset, limit=size, include=["embeddings"])
+        if not batch["ids"]:
+            break
+        vectors.extend(batch["embeddings"])
+        offset += len(batch["ids"])
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def synthetic_vectors(count: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def sample_queries(vectors: np.ndarray, count: int, noise: float = 0.05, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of corpus vectors, so queries look like real near-duplicates."""
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)]
+    scale = noise * np.linalg.norm(picks, axis=1, keepdims=True) / np.sqrt(vectors.shape[1])
+    return picks + rng.standard_normal(picks.shape).astype(np.float32) * scale
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Ground-truth cosine neighbours by brute force."""
+    corpus = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = q @ corpus.T
+    top = np.argpartition(-scores, kth=min(k, len(vectors) - 1), axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+
+def percentile_ms(samples: List[float], pct: float) -> float:
+    return round(float(np.percentile(samples, pct)) * 1000, 3)
+
+
+def evaluate_config(vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray, config: HNSWConfig,
+                    k: int, batch_size: int = 1000) -> Dict:
+    """Build an in-memory index with ``config`` and score it against ``truth``."""
+    client = chromadb.EphemeralClient()
+    name = f"hnsw_tune_{uuid.uuid4().hex[:12]}"
+    collection = client.create_collection(name=name, metadata=config.to_metadata())
+    try:
+        build_start = time.perf_counter()
+        for start in range(0, len(vectors), batch_size):
+            chunk = vectors[start:start + batch_size]
+            collection.add(
+                ids=[str(i) for i in range(start, start + len(chunk))],
+                embeddings=chunk.tolist()
+            )
+        build_seconds = time.perf_counter() - build_start
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            query_start = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+            latencies.append(time.perf_counter() - query_start)
+            found = {int(i) for i in result["ids"][0]}
+            hits += len(found.intersection(int(i) for i in expected))
+
+        return {
+            "M": config.M,
+            "construction_ef": config.construction_ef,
+            "search_ef": config.search_ef,
+            f"recall@{k}": round(hits / (len(queries) * k), 4),
+            "p50_ms": percentile_ms(latencies, 50),
+            "p99_ms": percentile_ms(latencies, 99),
+            "build_seconds": round(build_seconds, 3)
+        }
+    finally:
+        client.delete_collection(name)
+
+
+def run_grid(vectors: np.ndarray, queries: np.ndarray, k: int, m_values: List[int],
+             construction_efs: List[int], search_efs: List[int], space: str = "cosine") -> List[Dict]:
+    truth = exact_top_k(vectors, queries, k)
+    results = []
+    for m, cef, sef in itertools.product(m_values, construction_efs, search_efs):
+        config = HNSWConfig(space=space, M=m, construction_ef=cef, search_ef=sef)
+        result = evaluate_config(vectors, queries, truth, config, k)
+        logger.info(f"[HNSW] {result}")
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune Chroma HNSW parameters")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    bench = sub.add_parser("bench", help="Measure recall@k and latency for a parameter grid")
+    bench.add_argument("--dir", default="app/data/chroma", help="ChromaDB persist directory")
+    bench.add_argument("--collection", default=DOC_COLLECTION)
+    bench.add_argument("--limit", type=int, default=None, help="Use at most this many stored vectors")
+    bench.add_argument("--synthetic", type=int, default=0, help="Use N random vectors instead of the corpus")
+    bench.add_argument("--dim", type=int, default=768, help="Dimension of synthetic vectors")
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--k", type=int, default=10)
+    bench.add_argument("--m", type=int, nargs="+", default=[16])
+    bench.add_argument("--construction-ef", type=int, nargs="+", default=[100])
+    bench.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    bench.add_argument("--output", help="Write results as JSON to this file")
+
+    apply = sub.add_parser("apply", help="Rebuild a collection with new HNSW parameters")
+    apply.add_argument("--dir", default="app/data/chroma", help="ChromaDB persist directory")
+    apply.add_argument("--collection", default=DOC_COLLECTION)
+    apply.add_argument("--m", type=int, default=16)
+    apply.add_argument("--construction-ef", type=int, default=100)
+    apply.add_argument("--search-ef", type=int, default=10)
+
+    args = parser.parse_args()
+
+    if args.command == "apply":
+        client = ChromaClient(persist_directory=args.dir)
+        current = client.get_index_config(args.collection)
+        config = HNSWConfig(space=current.space, M=args.m,
+                            construction_ef=args.construction_ef, search_ef=args.search_ef)
+        client.rebuild_collection(args.collection, config)
+        return
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dim)
+    else:
+        vectors = load_vectors(args.dir, args.collection, limit=args.limit)
+    if len(vectors) <= args.k:
+        raise SystemExit(f"Need more than k={args.k} vectors, found {len(vectors)}")
+
+    queries = sample_queries(vectors, args.queries)
+    results = run_grid(vectors, queries, args.k, args.m, args.construction_ef, args.search_ef)
+    report = json.dumps({"vectors": len(vectors), "queries": len(queries), "k": args.k, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import chromadb
 from pathlib import Path
 import logging
+from app.rag_engine.chroma.vector_schema import HNSWConfig
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,11 +17,15 @@ def run_chroma_local(persist_directory: str = "app/data/chroma"):
     client = chromadb.PersistentClient(path=persist_directory)
     client.get_or_create_collection(
         name="document_embeddings",
-        metadata={"hnsw:space": "cosine"}
+        metadata=HNSWConfig.from_env("CHROMA_DOCS").to_metadata()
     )
     client.get_or_create_collection(
         name="conversation_context",
-        metadata={"hnsw:space": "cosine"}
+        metadata=HNSWConfig.from_env("CHROMA_CONV").to_metadata()
+    )
+    client.get_or_create_collection(
+        name="document_summaries",
+        metadata=HNSWConfig.from_env("CHROMA_SUMMARY").to_metadata()
     )
     logger.info(f"ChromaDB initialized at {persist_directory}")
 
@@ -28,5 +33,16 @@ if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--dir", default="app/data/chroma", help="ChromaDB persist directory")
+    parser.add_argument("--partition-legacy", action="store_true",
+                        help="Move owned private rows into per-user collections and mark ownerless ones public")
+    parser.add_argument("--build-summaries", action="store_true",
+                        help="Compute document summary vectors for chunks indexed without them")
     args = parser.parse_args()
     run_chroma_local(persist_directory=args.dir)
+    if args.partition_legacy or args.build_summaries:
+        from app.rag_engine.chroma.chroma_client import ChromaClient
+        client = ChromaClient(persist_directory=args.dir)
+        if args.partition_legacy:
+            client.partition_legacy_docs()
+        if args.build_summaries:
+            logger.info(f"Built {client.build_missing_summaries()} document summaries")
@@ -0,0 +1,307 @@
+"""
+Chroma snapshot and restore via S3 for RAGBot.
+Location: app/rag_engine/chroma/snapshot.py
+
+A snapshot is a manifest listing every file of the persist directory
+(chroma.sqlite3 and the per-collection HNSW segment directories) by SHA-256.
+File contents are stored once, content-addressed, under {prefix}blobs/, so a
+new snapshot uploads only the files that changed since any earlier one.
+
+- chroma.sqlite3 is captured with SQLite's online backup API, which gives a
+  consistent copy while the app keeps writing. It is gzipped, because it
+  compresses well and HNSW binaries do not.
+- Segment files are copied before the database, and a copy is retaken if a
+  file changes while it is read, so the database is never older than the
+  index files.
+- Restore downloads the missing blobs in parallel into a staging directory,
+  verifies every hash, and then swaps the directory into place. Files that
+  already match locally are reused.
+
+Restore while the app is stopped, or let a new node do it on first start
+with CHROMA_SNAPSHOT_BOOTSTRAP=true (see resources._create_chroma_client).
+
+    python -m app.rag_engine.chroma.snapshot create
+    python -m app.rag_engine.chroma.snapshot restore [--snapshot ID]
+    python -m app.rag_engine.chroma.snapshot list
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.rag_engine.aws.s3_client import transfer_config
+from app.rag_engine.aws.s3_utils import S3Utils
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "app/data/chroma")
+CHROMA_SNAPSHOT_PREFIX = os.getenv("CHROMA_SNAPSHOT_PREFIX", "chroma-snapshots/")
+CHROMA_SNAPSHOT_WORKERS = int(os.getenv("CHROMA_SNAPSHOT_WORKERS", 8))
+SQLITE_FILE = "chroma.sqlite3"
+HASH_CACHE_FILE = ".snapshot-hashes.json"  # inside the persist dir; never snapshotted
+HASH_CHUNK = 4 * 1024 * 1024
+COPY_RETRIES = 3
+
+
+def sha256_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ChromaSnapshot:
+    def __init__(self, persist_dir: str = CHROMA_PERSIST_DIR, prefix: str = CHROMA_SNAPSHOT_PREFIX,
+                 workers: int = CHROMA_SNAPSHOT_WORKERS, s3_utils: S3Utils = None):
+        self.persist_dir = persist_dir
+        self.prefix = prefix if prefix.endswith("/") else prefix + "/"
+        self.workers = workers
+        self.s3_utils = s3_utils or S3Utils()
+
+    @property
+    def _client(self):
+        return self.s3_utils.s3_client
+
+    @property
+    def _bucket(self):
+        return self.s3_utils.bucket
+
+    def _blob_key(self, digest: str, compressed: bool) -> str:
+        return f"{self.prefix}blobs/{digest}{'.gz' if compressed else ''}"
+
+    def _manifest_key(self, snapshot_id: str) -> str:
+        return f"{self.prefix}snapshots/{snapshot_id}.json"
+
+    # Capture
+
+    def _segment_files(self) -> List[str]:
+        files = []
+        for root, dirs, names in os.walk(self.persist_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in names:
+                rel = os.path.relpath(os.path.join(root, name), self.persist_dir).replace(os.sep, "/")
+                if rel.startswith(SQLITE_FILE) or name.startswith("."):
+                    continue  # the database (and its -wal/-shm) is captured separately
+                files.append(rel)
+        return sorted(files)
+
+    def _copy_stable(self, rel: str, dest: str):
+        """Copy a file, retrying if it changed while being read."""
+        src = os.path.join(self.persist_dir, rel)
+        for _ in range(COPY_RETRIES):
+            before = os.stat(src)
+            shutil.copyfile(src, dest)
+            after = os.stat(src)
+            if (before.st_size, before.st_mtime_ns) == (after.st_size, after.st_mtime_ns):
+                return
+            time.sleep(0.5)
+        raise RuntimeError(f"{rel} kept changing during the snapshot; retry when ingestion is idle")
+
+    def _backup_sqlite(self, dest: str):
+        source = sqlite3.connect(os.path.join(self.persist_dir, SQLITE_FILE))
+        target = sqlite3.connect(dest)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+    def _load_hash_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(os.path.join(self.persist_dir, HASH_CACHE_FILE), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_hash_cache(self, cache: Dict[str, Dict]):
+        with open(os.path.join(self.persist_dir, HASH_CACHE_FILE), "w") as f:
+            json.dump(cache, f)
+
+    def _existing_blobs(self) -> set:
+        return {obj["Key"] for obj in self.s3_utils.list_objects(f"{self.prefix}blobs/")}
+
+    def create(self) -> Dict:
+        if not os.path.exists(os.path.join(self.persist_dir, SQLITE_FILE)):
+            raise FileNotFoundError(f"No Chroma database in {self.persist_dir}")
+        start = time.perf_counter()
+        snapshot_id = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        hash_cache = self._load_hash_cache()
+        existing = self._existing_blobs()
+        entries, uploads = [], []
+
+        with tempfile.TemporaryDirectory(prefix="chroma_snapshot_") as staging:
+            # Segments first, database last: the database must not be older than the index files
+            for rel in self._segment_files():
+                stat = os.stat(os.path.join(self.persist_dir, rel))
+                cached = hash_cache.get(rel)
+                if cached and (cached["size"], cached["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns) \
+                        and self._blob_key(cached["sha256"], False) in existing:
+                    entries.append({"path": rel, "sha256": cached["sha256"], "size": stat.st_size, "compressed": False})
+                    continue
+                copy = os.path.join(staging, hashlib.sha1(rel.encode()).hexdigest())
+                self._copy_stable(rel, copy)
+                digest = sha256_file(copy)
+                hash_cache[rel] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+                entries.append({"path": rel, "sha256": digest, "size": stat.st_size, "compressed": False})
+                if self._blob_key(digest, False) not in existing:
+                    uploads.append((copy, self._blob_key(digest, False)))
+
+            db_copy = os.path.join(staging, SQLITE_FILE)
+            self._backup_sqlite(db_copy)
+            digest = sha256_file(db_copy)
+            entries.append({"path": SQLITE_FILE, "sha256": digest, "size": os.path.getsize(db_copy), "compressed": True})
+            if self._blob_key(digest, True) not in existing:
+                with open(db_copy, "rb") as src, gzip.open(db_copy + ".gz", "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, HASH_CHUNK)
+                uploads.append((db_copy + ".gz", self._blob_key(digest, True)))
+
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                list(pool.map(
+                    lambda item: self._client.upload_file(item[0], self._bucket, item[1], Config=transfer_config()),
+                    uploads
+                ))
+            uploaded_bytes = sum(os.path.getsize(path) for path, _ in uploads)
+
+        manifest = {
+            "snapshot_id": snapshot_id,
+            "created_at": datetime.utcnow().isoformat(),
+            "host": socket.gethostname(),
+            "files": entries
+        }
+        self._client.put_object(Bucket=self._bucket, Key=self._manifest_key(snapshot_id),
+                                Body=json.dumps(manifest, indent=2).encode(), ContentType="application/json")
+        # Written last, so LATEST only ever names a complete snapshot
+        self._client.put_object(Bucket=self._bucket, Key=f"{self.prefix}LATEST", Body=snapshot_id.encode())
+        self._save_hash_cache(hash_cache)
+
+        report = {
+            "snapshot_id": snapshot_id,
+            "files": len(entries),
+            "total_bytes": sum(e["size"] for e in entries),
+            "uploaded_blobs": len(uploads),
+            "uploaded_bytes": uploaded_bytes,
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+        logger.info(f"[SNAPSHOT] Created {report}")
+        return report
+
+    # Restore
+
+    def latest_id(self) -> Optional[str]:
+        try:
+            body = self._client.get_object(Bucket=self._bucket, Key=f"{self.prefix}LATEST")["Body"].read()
+        except self._client.exceptions.NoSuchKey:
+            return None
+        return body.decode().strip()
+
+    def list(self) -> List[str]:
+        keys = self.s3_utils.list_keys(f"{self.prefix}snapshots/")
+        return sorted(os.path.basename(key)[:-len(".json")] for key in keys if key.endswith(".json"))
+
+    def _fetch(self, entry: Dict, staging: str):
+        dest = os.path.join(staging, entry["path"])
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        local = os.path.join(self.persist_dir, entry["path"])
+        if os.path.exists(local) and os.path.getsize(local) == entry["size"] and sha256_file(local) == entry["sha256"]:
+            shutil.copyfile(local, dest)
+            return 0
+        key = self._blob_key(entry["sha256"], entry["compressed"])
+        download = dest + ".gz" if entry["compressed"] else dest
+        self._client.download_file(self._bucket, key, download, Config=transfer_config())
+        downloaded = os.path.getsize(download)
+        if entry["compressed"]:
+            with gzip.open(download, "rb") as src, open(dest, "wb") as dst:
+                shutil.copyfileobj(src, dst, HASH_CHUNK)
+            os.remove(download)
+        if sha256_file(dest) != entry["sha256"]:
+            raise ValueError(f"Checksum mismatch for {entry['path']} (blob {key})")
+        return downloaded
+
+    def restore(self, snapshot_id: str = None) -> Dict:
+        start = time.perf_counter()
+        snapshot_id = snapshot_id or self.latest_id()
+        if not snapshot_id:
+            raise FileNotFoundError(f"No snapshots under s3://{self._bucket}/{self.prefix}")
+        manifest = json.loads(
+            self._client.get_object(Bucket=self._bucket, Key=self._manifest_key(snapshot_id))["Body"].read()
+        )
+
+        parent = os.path.dirname(os.path.abspath(self.persist_dir))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".chroma_restore_", dir=parent)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                downloaded = list(pool.map(lambda entry: self._fetch(entry, staging), manifest["files"]))
+            # Swap in place: rename is atomic on one filesystem, and the old copy is kept until the new one is in
+            previous = None
+            if os.path.exists(self.persist_dir):
+                previous = self.persist_dir.rstrip("/") + f".old-{int(time.time())}"
+                os.rename(self.persist_dir, previous)
+            os.rename(staging, self.persist_dir)
+            if previous:
+                shutil.rmtree(previous, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        report = {
+            "snapshot_id": snapshot_id,
+            "files": len(manifest["files"]),
+            "downloaded_blobs": sum(1 for n in downloaded if n),
+            "downloaded_bytes": sum(downloaded),
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+        logger.info(f"[SNAPSHOT] Restored {report}")
+        return report
+
+
+def bootstrap(persist_dir: str = CHROMA_PERSIST_DIR) -> bool:
+    """Restore the latest snapshot into an empty persist directory. Returns True if one was restored."""
+    if os.path.exists(os.path.join(persist_dir, SQLITE_FILE)):
+        return False
+    snapshot = ChromaSnapshot(persist_dir=persist_dir)
+    if snapshot.latest_id() is None:
+        logger.info("[SNAPSHOT] No snapshot to bootstrap from; starting with an empty index")
+        return False
+    snapshot.restore()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot the Chroma persist directory to S3, or restore it")
+    parser.add_argument("--dir", default=CHROMA_PERSIST_DIR, help="ChromaDB persist directory")
+    parser.add_argument("--prefix", default=CHROMA_SNAPSHOT_PREFIX, help="S3 key prefix for snapshots")
+    parser.add_argument("--workers", type=int, default=CHROMA_SNAPSHOT_WORKERS)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("create", help="Upload changed files and write a new snapshot manifest")
+    restore = sub.add_parser("restore", help="Replace the persist directory with a snapshot (app stopped)")
+    restore.add_argument("--snapshot", help="Snapshot id (default: latest)")
+    sub.add_parser("list", help="List snapshot ids")
+    args = parser.parse_args()
+
+    snapshot = ChromaSnapshot(persist_dir=args.dir, prefix=args.prefix, workers=args.workers)
+    if args.command == "create":
+        print(json.dumps(snapshot.create(), indent=2))
+    elif args.command == "restore":
+        print(json.dumps(snapshot.restore(args.snapshot), indent=2))
+    elif args.command == "list":
+        latest = snapshot.latest_id()
+        for snapshot_id in snapshot.list():
+            print(f"{snapshot_id}{'  (latest)' if snapshot_id == latest else ''}")
+
+
+if __name__ == "__main__":
+    main()
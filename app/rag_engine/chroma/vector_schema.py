@@ -1,7 +1,53 @@
 from dataclasses import dataclass, field
 from typing import List, Optional
+import os
 import uuid
 
+
+@dataclass
+class HNSWConfig:
+    """Collection-level HNSW index parameters.
+
+    Chroma reads these from the collection metadata when the collection is
+    created. ``M`` and ``construction_ef`` are fixed for the life of the
+    index, so changing them requires ``ChromaClient.rebuild_collection``.
+    The defaults match Chroma's own.
+    """
+    space: str = "cosine"
+    M: int = 16
+    construction_ef: int = 100
+    search_ef: int = 10
+
+    def to_metadata(self) -> dict:
+        return {
+            "hnsw:space": self.space,
+            "hnsw:M": self.M,
+            "hnsw:construction_ef": self.construction_ef,
+            "hnsw:search_ef": self.search_ef
+        }
+
+    @classmethod
+    def from_metadata(cls, metadata: Optional[dict]) -> "HNSWConfig":
+        metadata = metadata or {}
+        default = cls()
+        return cls(
+            space=metadata.get("hnsw:space", default.space),
+            M=int(metadata.get("hnsw:M", default.M)),
+            construction_ef=int(metadata.get("hnsw:construction_ef", default.construction_ef)),
+            search_ef=int(metadata.get("hnsw:search_ef", default.search_ef))
+        )
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "HNSWConfig":
+        """Read ``{prefix}_HNSW_M``, ``{prefix}_HNSW_CONSTRUCTION_EF`` and ``{prefix}_HNSW_SEARCH_EF``."""
+        default = cls()
+        return cls(
+            space=os.getenv(f"{prefix}_HNSW_SPACE", default.space),
+            M=int(os.getenv(f"{prefix}_HNSW_M", default.M)),
+            construction_ef=int(os.getenv(f"{prefix}_HNSW_CONSTRUCTION_EF", default.construction_ef)),
+            search_ef=int(os.getenv(f"{prefix}_HNSW_SEARCH_EF", default.search_ef))
+        )
+
 @dataclass
 class DocumentEmbedding:
     vector: List[float]
@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, String, Text, DateTime, Integer, Float, Boolean,
-    ForeignKey, Index, ARRAY
+    ForeignKey, Index, ARRAY, UniqueConstraint
 )
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID, JSONB
 from sqlalchemy.sql import func
@@ -63,7 +63,11 @@ class Conversation(Base):
     linked_documents = Column(ARRAY(Text))
     user_bias_profile = Column(Text)
 
-    __table_args__ = (Index("ix_conversations_user_id", "user_id"),)
+    __table_args__ = (
+        Index("ix_conversations_user_id", "user_id"),
+        # Keyset pagination of a user's conversation list (updated_at DESC, id DESC)
+        Index("ix_conversations_user_deleted_updated", "user_id", "is_deleted", "updated_at", "id"),
+    )
 
 
 class Message(Base):
@@ -79,7 +83,10 @@ class Message(Base):
     feedback_score = Column(Integer)
     edit_history = Column(JSONB)
 
-    __table_args__ = (Index("ix_messages_conversation_id", "conversation_id"),)
+    __table_args__ = (
+        Index("ix_messages_conversation_id", "conversation_id"),
+        Index("ix_messages_conversation_timestamp", "conversation_id", "timestamp", "id"),
+    )
 
 
 class DocumentMetadata(Base):
@@ -98,7 +105,10 @@ class DocumentMetadata(Base):
     visibility = Column(String)
     owner_user_id = Column(PG_UUID(as_uuid=True), ForeignKey("users.id"))
 
-    __table_args__ = (Index("ix_documents_metadata_owner_user_id", "owner_user_id"),)
+    __table_args__ = (
+        Index("ix_documents_metadata_owner_user_id", "owner_user_id"),
+        Index("ix_documents_metadata_owner_id", "owner_user_id", "id"),
+    )
 
 
 class AuditLog(Base):
@@ -109,19 +119,32 @@ class AuditLog(Base):
     event_details = Column(JSONB)
     timestamp = Column(DateTime, server_default=func.now())
 
-    __table_args__ = (Index("ix_audit_logs_user_id", "user_id"),)
+    __table_args__ = (
+        Index("ix_audit_logs_user_id", "user_id"),
+        Index("ix_audit_logs_user_timestamp", "user_id", "timestamp", "id"),
+    )
 
 
 class UsageStat(Base):
+    """Per user-day rollup, incremented as turns, conversations and queries are written."""
     __tablename__ = "usage_stats"
     id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(PG_UUID(as_uuid=True), ForeignKey("users.id"))
-    date = Column(DateTime, server_default=func.current_date())
-    token_usage = Column(Integer)
-    message_count = Column(Integer)
-    cost = Column(Float)
-
-    __table_args__ = (Index("ix_usage_stats_user_id", "user_id"),)
+    date = Column(DateTime, server_default=func.current_date())  # midnight UTC of the day
+    token_usage = Column(Integer, default=0, server_default="0")
+    message_count = Column(Integer, default=0, server_default="0")
+    cost = Column(Float, default=0.0, server_default="0")
+    user_message_count = Column(Integer, default=0, server_default="0")
+    assistant_message_count = Column(Integer, default=0, server_default="0")
+    response_time_total = Column(Float, default=0.0, server_default="0")
+    response_time_count = Column(Integer, default=0, server_default="0")
+    conversation_count = Column(Integer, default=0, server_default="0")
+    query_count = Column(Integer, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_usage_stats_user_id", "user_id"),
+        UniqueConstraint("user_id", "date", name="uq_usage_stats_user_date"),
+    )
 
 
 class MessageFeedback(Base):
@@ -146,6 +169,7 @@ class QueryLog(Base):
     used_tags = Column(ARRAY(Text))
     source = Column(Text)
     latency_ms = Column(Integer)
+    stage_timings = Column(JSONB)  # {"embed": ms, "chroma.chunks": ms, "rag_chain": ms, ...}
     timestamp = Column(DateTime, server_default=func.now())
 
     __table_args__ = (Index("ix_query_logs_user_id", "user_id"),)
@@ -1,8 +1,12 @@
 import os
+from typing import Any, Dict
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+from app.utils.tracing import instrument_engine
+
 # Explicitly load environment variables
 load_dotenv()
 
@@ -21,12 +25,103 @@ if DATABASE_URL.startswith("sqlite"):
     os.makedirs("app/data", exist_ok=True)
     print("⚠️ WARNING: Falling back to SQLite!")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Pool sizing is per engine, and the sync and async engines each keep their own pool
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+}
+# Prepared statement cache per asyncpg connection; set to 0 behind pgbouncer in transaction mode
+STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+
+engine = create_engine(DATABASE_URL, pool_pre_ping=True, **POOL_SETTINGS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_engine(engine)
+
+_async_engine = None
+_async_sessionmaker = None
+
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def to_async_url(url: str):
+    """Swap the driver for its asyncio counterpart (asyncpg / aiosqlite).
+
+    libpq's ``sslmode`` query parameter is not understood by asyncpg, so it is
+    lifted out and passed as the ``ssl`` connect argument instead.
+    """
+    parsed = make_url(url)
+    connect_args: Dict[str, Any] = {}
+    if parsed.get_backend_name() == "postgresql":
+        query = dict(parsed.query)
+        sslmode = query.pop("sslmode", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+        connect_args["statement_cache_size"] = STATEMENT_CACHE_SIZE
+        parsed = parsed.set(drivername="postgresql+asyncpg", query=query)
+    elif parsed.get_backend_name() == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed, connect_args
+
+
+def get_async_engine():
+    """Process-wide async engine, created on first use so scripts never pay for it."""
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        url, connect_args = to_async_url(DATABASE_URL)
+        if url.get_backend_name() == "postgresql":
+            # SQLAlchemy keeps its own cache of asyncpg prepared statements on top of asyncpg's
+            url = url.update_query_dict({"prepared_statement_cache_size": str(STATEMENT_CACHE_SIZE)})
+        _async_engine = create_async_engine(url, pool_pre_ping=True, connect_args=connect_args, **POOL_SETTINGS)
+        instrument_engine(_async_engine)
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        # expire_on_commit=False: attribute access after commit must not trigger implicit (sync) IO
+        _async_sessionmaker = async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+    return _async_sessionmaker()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_sessionmaker = None
+
+
+def _pool_stats(pool) -> Dict[str, Any]:
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
+def get_pool_status() -> Dict[str, Any]:
+    """Connection pool usage for the sync engine and, once created, the async one."""
+    status = {
+        "settings": {**POOL_SETTINGS, "statement_cache_size": STATEMENT_CACHE_SIZE},
+        "sync": _pool_stats(engine.pool),
+    }
+    if _async_engine is not None:
+        status["async"] = _pool_stats(_async_engine.pool)
+    return status
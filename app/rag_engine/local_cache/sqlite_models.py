@@ -1,4 +1,4 @@
-from sqlalchemy_init import Column, String, Integer, Text, Boolean, JSON
+from sqlalchemy import Column, String, Integer, Text, Boolean, JSON
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
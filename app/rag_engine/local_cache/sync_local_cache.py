@@ -1,110 +1,285 @@
-from sqlalchemy.orm import Session
-from local_cache.sqlite_models import AuthCache, ConversationsCache, Settings, DocumentsMetadata, QueryLogsLocal
-from db.models import User, Conversation, DocumentMetadata, QueryLog
-from db.session import get_db
-from local_cache.sqlite_session import get_local_db
-import boto3
-import os
+"""
+Local cache -> PostgreSQL sync for RAGBot.
+Location: app/rag_engine/local_cache/sync_local_cache.py
+
+Drains every pending row of the local SQLite cache into the main database.
+Each table is read in primary-key order, batch_size rows at a time, and
+written with one bulk INSERT ... ON CONFLICT per batch. The local sync
+markers (last_sync, sync_status, upload_status, or deleting the row) are
+committed only after the remote commit succeeds. A crash in between only
+means the batch is upserted again on the next run, which is a no-op.
+
+Tables with no foreign keys between them sync concurrently, each on its own
+pair of sessions. Conversations wait for auth, because they reference the
+users it creates.
+
+    python -m app.rag_engine.local_cache.sync_local_cache --batch-size 500
+"""
+
+import argparse
 import json
-import time
 import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.rag_engine.db.models import Conversation, DocumentMetadata, QueryLog, User
+from app.rag_engine.db.session import SessionLocal as RemoteSession
+from app.rag_engine.local_cache.sqlite_models import AuthCache, ConversationsCache, DocumentsMetadata, QueryLogsLocal
+from app.rag_engine.local_cache.sqlite_session import SessionLocal as LocalSession
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def sync_cache_to_postgres(batch_size=100):
-    local_db = next(get_local_db())
-    remote_db = next(get_db())
-    synced_records = {"auth": 0, "conversations": 0, "documents": 0, "queries": 0}
-
-    # Sync AuthCache
-    auth_records = local_db.query(AuthCache).filter(AuthCache.last_sync.is_(None)).limit(batch_size).all()
-    for record in auth_records:
-        user = remote_db.query(User).filter_by(google_id=record.user_id).first()
-        if not user:
-            user = User(id=record.user_id, google_id=record.user_id)
-            remote_db.add(user)
-        record.last_sync = int(time.time())
-        synced_records["auth"] += 1
-    
-    # Sync ConversationsCache
-    conv_records = local_db.query(ConversationsCache).filter(ConversationsCache.sync_status == "pending").limit(batch_size).all()
-    for record in conv_records:
-        conv = remote_db.query(Conversation).filter_by(id=record.id).first()
-        if not conv:
-            conv = Conversation(
-                id=record.id,
-                user_id=record.user_id,
-                title=record.title,
-                created_at=record.created_at,
-                tags=record.tags,
-                chat_type=record.chat_type,
-                focus_doc_ids=record.focus_doc_ids
-            )
-            remote_db.add(conv)
-        record.sync_status = "synced"
-        synced_records["conversations"] += 1
-    
-    # Sync DocumentsMetadata
-    doc_records = local_db.query(DocumentsMetadata).filter(DocumentsMetadata.upload_status == "pending").limit(batch_size).all()
-    for record in doc_records:
-        doc = remote_db.query(DocumentMetadata).filter_by(id=record.id).first()
-        if not doc:
-            doc = DocumentMetadata(
-                id=record.id,
-                filename=record.filename,
-                upload_status=record.upload_status,
-                local_path=record.local_path,
-                mime_type=record.mime_type,
-                doc_type=record.doc_type,
-                tags=record.tags,
-                keywords=record.keywords,
-                associated_conversations=record.associated_conversations,
-                is_personalized=record.is_personalized,
-                visibility=record.visibility
-            )
-            remote_db.add(doc)
-        record.upload_status = "synced"
-        synced_records["documents"] += 1
-    
-    # Sync QueryLogsLocal
-    query_records = local_db.query(QueryLogsLocal).limit(batch_size).all()
-    for record in query_records:
-        query = remote_db.query(QueryLog).filter_by(id=record.id).first()
-        if not query:
-            query = QueryLog(
-                id=record.id,
-                question=record.question,
-                timestamp=record.timestamp
-            )
-            remote_db.add(query)
-        local_db.delete(record)
-        synced_records["queries"] += 1
-    
-    local_db.commit()
-    remote_db.commit()
-    logger.info(f"Sync completed: {synced_records}")
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", 500))
 
-def backup_to_s3():
-    s3_client = boto3.client("s3")
-    bucket = os.getenv("S3_BUCKET", "ragbot-conversations")
-    timestamp = int(time.time())
-    local_db = next(get_local_db())
-    
-    # Backup conversations
-    conv_records = local_db.query(ConversationsCache).all()
-    for record in conv_records:
-        key = f"users/{record.user_id}/conversations/{record.id}.json"
-        s3_client.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=json.dumps({
-                "id": record.id,
-                "user_id": record.user_id,
-                "title": record.title,
-                "created_at": record.created_at,
-                "tags": record.tags,
-                "chat_type": record.chat_type
-            })
+
+def _as_uuid(value) -> Optional[uuid.UUID]:
+    """Cache ids are strings; ids that are not UUIDs (e.g. Google subject ids) map to a stable uuid5."""
+    if value is None:
+        return None
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return uuid.uuid5(uuid.NAMESPACE_URL, f"ragbot:{value}")
+
+
+def _as_datetime(epoch) -> Optional[datetime]:
+    return datetime.utcfromtimestamp(epoch) if epoch is not None else None
+
+
+def _as_list(value) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return [str(v) for v in value]
+
+
+@dataclass
+class TableSync:
+    name: str
+    local_model: Any
+    pending: Callable[[], Any]             # filter clause selecting unsynced local rows
+    remote_model: Any
+    to_remote: Callable[[Any], Dict]       # local row -> remote column values
+    conflict_columns: Optional[List[str]]  # None: skip a row that violates any unique constraint
+    update_columns: List[str]              # columns refreshed on conflict; empty: leave the remote row alone
+    mark_synced: Callable[[List[Any]], Any]  # local primary keys -> statement recording the sync
+
+
+def _user_row(record):
+    return {"id": _as_uuid(record.user_id), "google_id": record.user_id}
+
+
+def _conversation_row(record):
+    return {
+        "id": _as_uuid(record.id),
+        "user_id": _as_uuid(record.user_id),
+        "title": record.title,
+        "created_at": _as_datetime(record.created_at),
+        "tags": _as_list(record.tags),
+        "chat_type": record.chat_type,
+        "focus_doc_ids": _as_list(record.focus_doc_ids)
+    }
+
+
+def _document_row(record):
+    return {
+        "id": record.id,
+        "filename": record.filename,
+        "upload_status": record.upload_status,
+        "local_path": record.local_path,
+        "mime_type": record.mime_type,
+        "doc_type": record.doc_type,
+        "tags": _as_list(record.tags),
+        "keywords": _as_list(record.keywords),
+        "associated_conversations": _as_list(record.associated_conversations),
+        "is_personalized": record.is_personalized,
+        "visibility": record.visibility
+    }
+
+
+def _query_row(record):
+    return {"id": _as_uuid(record.id), "question": record.question, "timestamp": _as_datetime(record.timestamp)}
+
+
+TABLES = {
+    "auth": TableSync(
+        name="auth",
+        local_model=AuthCache,
+        pending=lambda: AuthCache.last_sync.is_(None),
+        remote_model=User,
+        to_remote=_user_row,
+        conflict_columns=None,  # users are unique on id and google_id
+        update_columns=[],
+        mark_synced=lambda ids: update(AuthCache).where(AuthCache.user_id.in_(ids)).values(last_sync=int(time.time()))
+    ),
+    "conversations": TableSync(
+        name="conversations",
+        local_model=ConversationsCache,
+        pending=lambda: ConversationsCache.sync_status == "pending",
+        remote_model=Conversation,
+        to_remote=_conversation_row,
+        conflict_columns=["id"],
+        update_columns=["title", "tags", "chat_type", "focus_doc_ids"],
+        mark_synced=lambda ids: update(ConversationsCache).where(ConversationsCache.id.in_(ids)).values(sync_status="synced")
+    ),
+    "documents": TableSync(
+        name="documents",
+        local_model=DocumentsMetadata,
+        pending=lambda: DocumentsMetadata.upload_status == "pending",
+        remote_model=DocumentMetadata,
+        to_remote=_document_row,
+        conflict_columns=["id"],
+        update_columns=["filename", "local_path", "mime_type", "doc_type", "tags", "keywords",
+                        "associated_conversations", "is_personalized", "visibility"],
+        mark_synced=lambda ids: update(DocumentsMetadata).where(DocumentsMetadata.id.in_(ids)).values(upload_status="synced")
+    ),
+    "queries": TableSync(
+        name="queries",
+        local_model=QueryLogsLocal,
+        pending=lambda: QueryLogsLocal.id.isnot(None),  # every local row is pending
+        remote_model=QueryLog,
+        to_remote=_query_row,
+        conflict_columns=["id"],
+        update_columns=[],
+        mark_synced=lambda ids: delete(QueryLogsLocal).where(QueryLogsLocal.id.in_(ids))
+    ),
+}
+
+# Each group runs on its own thread; tables within a group run in order
+SYNC_GROUPS = [["auth", "conversations"], ["documents"], ["queries"]]
+
+
+def _upsert(spec: TableSync, dialect: str):
+    insert = sqlite_insert if dialect == "sqlite" else pg_insert
+    stmt = insert(spec.remote_model)
+    if spec.update_columns:
+        return stmt.on_conflict_do_update(
+            index_elements=spec.conflict_columns,
+            set_={column: stmt.excluded[column] for column in spec.update_columns}
         )
-        logger.info(f"Backed up conversation {record.id} to S3")
\ No newline at end of file
+    return stmt.on_conflict_do_nothing(index_elements=spec.conflict_columns)
+
+
+def sync_table(spec: TableSync, batch_size: int = SYNC_BATCH_SIZE) -> Dict[str, Any]:
+    """Drain one table's pending rows. Returns rows, batches, seconds, rows_per_second (and error, if any)."""
+    start = time.perf_counter()
+    report = {"rows": 0, "batches": 0}
+    local_db, remote_db = LocalSession(), RemoteSession()
+    pk = spec.local_model.__mapper__.primary_key[0]
+    try:
+        stmt = _upsert(spec, remote_db.get_bind().dialect.name)
+        last_key = None
+        while True:
+            query = select(spec.local_model).where(spec.pending()).order_by(pk).limit(batch_size)
+            if last_key is not None:
+                # Keyset: a row whose marker did not change is never re-read in this run
+                query = query.where(pk > last_key)
+            records = local_db.execute(query).scalars().all()
+            if not records:
+                break
+            ids = [getattr(record, pk.key) for record in records]
+            rows = [spec.to_remote(record) for record in records]
+
+            try:
+                remote_db.execute(stmt, rows)
+                remote_db.commit()
+            except Exception:
+                remote_db.rollback()
+                raise
+            # Only now that the rows are durable remotely
+            try:
+                local_db.execute(spec.mark_synced(ids))
+                local_db.commit()
+            except Exception:
+                local_db.rollback()
+                raise
+
+            report["rows"] += len(records)
+            report["batches"] += 1
+            last_key = ids[-1]
+    except Exception as e:
+        logger.error(f"Sync of {spec.name} stopped after {report['rows']} rows: {e}")
+        report["error"] = str(e)
+    finally:
+        local_db.close()
+        remote_db.close()
+
+    seconds = time.perf_counter() - start
+    report["seconds"] = round(seconds, 3)
+    report["rows_per_second"] = round(report["rows"] / seconds, 1) if seconds > 0 else 0.0
+    return report
+
+
+def sync_cache_to_postgres(batch_size: int = SYNC_BATCH_SIZE, tables: List[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Sync every pending row of the selected tables (default: all); returns a report per table."""
+    selected = set(tables or TABLES)
+    groups = [[name for name in group if name in selected] for group in SYNC_GROUPS]
+    groups = [group for group in groups if group]
+
+    def run_group(group: List[str]) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for name in group:
+            results[name] = sync_table(TABLES[name], batch_size)
+            if "error" in results[name]:
+                # Later tables in the group reference this one's rows
+                for skipped in group[group.index(name) + 1:]:
+                    results[skipped] = {"rows": 0, "batches": 0, "skipped": f"{name} failed"}
+                break
+        return results
+
+    start = time.perf_counter()
+    report = {}
+    with ThreadPoolExecutor(max_workers=len(groups) or 1) as pool:
+        for results in pool.map(run_group, groups):
+            report.update(results)
+    logger.info(f"Sync completed in {time.perf_counter() - start:.2f}s: {report}")
+    return report
+
+
+def backup_to_s3():
+    from app.rag_engine.aws.s3_utils import S3Utils
+    s3_utils = S3Utils()
+    local_db = LocalSession()
+    try:
+        # Backup conversations
+        conv_records = local_db.query(ConversationsCache).all()
+        for record in conv_records:
+            key = f"users/{record.user_id}/conversations/{record.id}.json"
+            s3_utils.s3_client.put_object(
+                Bucket=s3_utils.bucket,
+                Key=key,
+                Body=json.dumps({
+                    "id": record.id,
+                    "user_id": record.user_id,
+                    "title": record.title,
+                    "created_at": record.created_at,
+                    "tags": record.tags,
+                    "chat_type": record.chat_type
+                })
+            )
+            logger.info(f"Backed up conversation {record.id} to S3")
+    finally:
+        local_db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the local SQLite cache to the main database")
+    parser.add_argument("--batch-size", type=int, default=SYNC_BATCH_SIZE)
+    parser.add_argument("--tables", nargs="+", choices=list(TABLES), help="Default: all tables")
+    args = parser.parse_args()
+    print(json.dumps(sync_cache_to_postgres(args.batch_size, args.tables), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Shared heavy resources for RAGBot.
+Location: app/rag_engine/resources.py
+
+The embedding model (torch), the Chroma client and the LLM client are
+imported and built on first use and then shared by the whole process, so
+importing the API does not pay for them. ``warm_up`` loads them in the
+background at startup and ``readiness`` reports which ones are warm.
+
+Environment:
+    PRELOAD_RESOURCES  warm every component at startup (default true).
+    READY_REQUIRES     comma-separated components that must be warm before
+                       /api/v1/health/ready returns 200. Defaults to all of
+                       them with preloading on, and to none with
+                       PRELOAD_RESOURCES=false: then only traffic warms the
+                       components, and an instance that waited for them
+                       would never receive any.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "app/data/chroma")
+
+COMPONENTS = ("embedder", "chroma", "llm", "db")
+
+PRELOAD_RESOURCES = os.getenv("PRELOAD_RESOURCES", "true").lower() == "true"
+
+# Components that must be warm before /health/ready reports ready
+READY_REQUIRES = [
+    c.strip() for c in os.getenv("READY_REQUIRES", ",".join(COMPONENTS) if PRELOAD_RESOURCES else "").split(",")
+    if c.strip()
+]
+
+_resources: Dict[str, Any] = {}
+_locks = {name: threading.Lock() for name in COMPONENTS}
+_status: Dict[str, Dict[str, Any]] = {name: {"state": "cold"} for name in COMPONENTS}
+
+
+def _load(name: str, factory: Callable[[], Any]) -> Any:
+    resource = _resources.get(name)
+    if resource is not None:
+        return resource
+    with _locks[name]:
+        resource = _resources.get(name)
+        if resource is not None:
+            return resource
+        _status[name] = {"state": "loading"}
+        start = time.perf_counter()
+        try:
+            resource = factory()
+        except Exception as e:
+            _status[name] = {"state": "failed", "error": str(e)}
+            raise
+        _resources[name] = resource
+        _status[name] = {"state": "warm", "load_seconds": round(time.perf_counter() - start, 3)}
+        logger.info(f"{name} ready in {_status[name]['load_seconds']}s")
+        return resource
+
+
+def _create_embeddings_model():
+    from langchain_huggingface import HuggingFaceEmbeddings
+    model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+    # The first encode pays for lazy weight loading; do it here rather than on a user request
+    model.embed_query("warm up")
+    return model
+
+
+def _create_chroma_client():
+    from app.rag_engine.chroma.chroma_client import ChromaClient
+    if os.getenv("CHROMA_SNAPSHOT_BOOTSTRAP", "false").lower() == "true":
+        # A new node pulls the latest S3 snapshot instead of re-embedding the corpus
+        from app.rag_engine.chroma.snapshot import bootstrap
+        try:
+            bootstrap(CHROMA_PERSIST_DIR)
+        except Exception as e:
+            logger.error(f"Chroma snapshot bootstrap failed, starting from the local directory: {e}")
+    client = ChromaClient(persist_directory=CHROMA_PERSIST_DIR)
+    client.get_doc_collection().count()
+    return client
+
+
+def _create_llm():
+    from app.rag_engine.Query.llm_loader import get_llm as load_llm
+    return load_llm()
+
+
+def _connect_db():
+    from sqlalchemy import text
+    from app.rag_engine.db.session import engine
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return engine
+
+
+def get_embeddings_model():
+    return _load("embedder", _create_embeddings_model)
+
+
+def get_chroma_client():
+    return _load("chroma", _create_chroma_client)
+
+
+def get_llm():
+    return _load("llm", _create_llm)
+
+
+def get_db_engine():
+    return _load("db", _connect_db)
+
+
+_GETTERS = {
+    "embedder": get_embeddings_model,
+    "chroma": get_chroma_client,
+    "llm": get_llm,
+    "db": get_db_engine
+}
+
+
+async def warm_up(components: List[str] = None, retry_seconds: float = None):
+    """Load components concurrently in worker threads.
+
+    Failed components are retried every ``retry_seconds`` (env
+    PRELOAD_RETRY_SECONDS, default 15) until they load, so a database that
+    comes up after the API still flips readiness. Cancel the task to stop.
+    """
+    pending = list(components or COMPONENTS)
+    retry_seconds = retry_seconds if retry_seconds is not None else float(os.getenv("PRELOAD_RETRY_SECONDS", 15))
+    while pending:
+        outcomes = await asyncio.gather(
+            *(asyncio.to_thread(_GETTERS[name]) for name in pending),
+            return_exceptions=True
+        )
+        failed = []
+        for name, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"Preloading {name} failed: {outcome}")
+                failed.append(name)
+        pending = failed
+        if pending:
+            await asyncio.sleep(retry_seconds)
+
+
+def readiness() -> Dict[str, Any]:
+    components = {name: dict(status) for name, status in _status.items()}
+    return {
+        "ready": all(components[name]["state"] == "warm" for name in READY_REQUIRES),
+        "components": components
+    }
@@ -0,0 +1,204 @@
+"""
+Analytics Sink for RAGBot
+Location: app/services/analytics_sink.py
+
+Write-behind buffer for QueryLog and AuditLog rows. Request handlers enqueue
+rows and return; a background thread writes them in bulk (one multi-row
+INSERT per table per batch) every ANALYTICS_FLUSH_MS milliseconds or
+ANALYTICS_BATCH_SIZE rows, whichever comes first. The queue is bounded: when
+it is full new rows are dropped and counted rather than slowing requests.
+
+A batch that fails to write is retried ANALYTICS_FLUSH_ATTEMPTS times with
+exponential backoff. If it still fails, or hits an integrity error, its rows
+are written one per transaction so a single bad row only loses itself.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from ..rag_engine.db.models import AuditLog, QueryLog
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+ANALYTICS_FLUSH_ATTEMPTS = int(os.getenv("ANALYTICS_FLUSH_ATTEMPTS", 3))
+ANALYTICS_RETRY_BASE_SECONDS = float(os.getenv("ANALYTICS_RETRY_BASE_SECONDS", 0.5))
+
+
+class AnalyticsSink:
+    def __init__(self, max_queue: int = None, batch_size: int = None, flush_interval_ms: int = None,
+                 session_factory=None):
+        self.batch_size = batch_size or int(os.getenv("ANALYTICS_BATCH_SIZE", 500))
+        self.flush_interval = (flush_interval_ms or int(os.getenv("ANALYTICS_FLUSH_MS", 250))) / 1000
+        self._queue = queue.Queue(maxsize=max_queue or int(os.getenv("ANALYTICS_QUEUE_SIZE", 10000)))
+        self._session_factory = session_factory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = Counter()
+        self.written = Counter()
+        self.failed = Counter()
+        self.retried = 0
+        self.last_flush: Optional[datetime] = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="analytics-sink", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flush whatever is queued and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(f"Analytics sink did not drain within {timeout}s; {self._queue.qsize()} rows left")
+
+    def record(self, model, **fields) -> bool:
+        """Queue one row for ``model``. Returns False (and counts a drop) if the buffer is full."""
+        fields.setdefault("id", uuid4())
+        # Stamp the event now; the server default would record the flush time instead
+        fields.setdefault("timestamp", datetime.utcnow())
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait((model, fields))
+            return True
+        except queue.Full:
+            self.dropped[model.__tablename__] += 1
+            return False
+
+    def record_query(self, **fields) -> bool:
+        return self.record(QueryLog, **fields)
+
+    def record_audit(self, **fields) -> bool:
+        return self.record(AuditLog, **fields)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": dict(self.written),
+            "dropped": dict(self.dropped),
+            "failed": dict(self.failed),
+            "retried": self.retried,
+            "last_flush": self.last_flush.isoformat() if self.last_flush else None,
+            "running": self._thread is not None and self._thread.is_alive()
+        }
+
+    def _take_batch(self) -> List:
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+        # Drain on shutdown
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _new_session(self):
+        if self._session_factory is None:
+            from ..rag_engine.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _write(self, batch: List):
+        """Insert ``batch`` and its usage rollups in one transaction."""
+        from .user_service import increment_usage
+
+        by_model = defaultdict(list)
+        for model, fields in batch:
+            by_model[model].append(fields)
+
+        db = self._new_session()
+        try:
+            for model, rows in by_model.items():
+                db.execute(insert(model), rows)
+            # Keep the per-day query counters in step with the rows just written
+            queries_per_user = Counter(row.get("user_id") for row in by_model.get(QueryLog, []))
+            for user_id, count in queries_per_user.items():
+                if user_id is not None:
+                    increment_usage(db, user_id, query_count=count)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        for model, rows in by_model.items():
+            self.written[model.__tablename__] += len(rows)
+        self.last_flush = datetime.utcnow()
+
+    def _flush(self, batch: List):
+        for attempt in range(1, ANALYTICS_FLUSH_ATTEMPTS + 1):
+            try:
+                self._write(batch)
+                return
+            except IntegrityError as e:
+                # Retrying the same rows cannot help; find the offending ones
+                logger.warning(f"Analytics flush of {len(batch)} rows hit an integrity error: {e}")
+                break
+            except Exception as e:
+                if attempt == ANALYTICS_FLUSH_ATTEMPTS:
+                    logger.error(f"Analytics flush of {len(batch)} rows failed {attempt} times: {e}")
+                    break
+                self.retried += 1
+                delay = ANALYTICS_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+                logger.warning(f"Analytics flush of {len(batch)} rows failed, retrying in {delay:.1f}s: {e}")
+                time.sleep(delay * random.uniform(0.5, 1.0))
+        self._flush_rows(batch)
+
+    def _flush_rows(self, batch: List):
+        """Last resort: one transaction per row, so only the rows that cannot be written are lost."""
+        for i, (model, fields) in enumerate(batch):
+            try:
+                self._write([(model, fields)])
+            except OperationalError as e:
+                # The database itself is unavailable; every remaining row would fail the same way
+                for model, _ in batch[i:]:
+                    self.failed[model.__tablename__] += 1
+                logger.error(f"Analytics flush gave up on {len(batch) - i} rows: {e}")
+                return
+            except Exception as e:
+                self.failed[model.__tablename__] += 1
+                logger.error(f"Dropped {model.__tablename__} row {fields.get('id')}: {e}")
+
+
+analytics_sink = AnalyticsSink()
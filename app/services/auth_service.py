@@ -14,6 +14,8 @@ from typing import Optional, Dict, Any
 from uuid import UUID, uuid4
 from ..rag_engine.db.models import User
 from ..utils.logger import get_logger
+from .auth_store import auth_store
+from .token_validator import InvalidToken, token_validator
 
 logger = get_logger()
 
@@ -55,16 +57,7 @@ class AuthService:
             conversation_style={}
         )
       
-        # Use raw SQLite connection
-        import sqlite3
-        conn = sqlite3.connect("app/local/auth_cache.db")
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT OR REPLACE INTO auth_cache (user_id, password_hash) VALUES (?, ?)",
-            (str(user.id), hashed_password)
-        )
-        conn.commit()
-        conn.close()
+        auth_store.set_password_hash(str(user.id), hashed_password)
 
         self.db.add(user)
         self.db.commit()
@@ -76,21 +69,15 @@ class AuthService:
         if not user:
             return None
 
-        # Use raw SQLite connection
-        import sqlite3
-        conn = sqlite3.connect("app/local/auth_cache.db")
-        cursor = conn.execute("SELECT password_hash FROM auth_cache WHERE user_id = ?", (str(user.id),))
-        result = cursor.fetchone()
-        conn.close()
-        
-        if not result:
+        password_hash = auth_store.get_password_hash(str(user.id))
+        if not password_hash:
             return None
 
-        if self.verify_password(password, result[0]):
+        if self.verify_password(password, password_hash):
             return user
         return None
 
-    def create_access_token(self, user_id: str, email: str, remember_me: bool = False) -> Dict[str, Any]:
+    def create_access_token(self, user_id: str, email: str, remember_me: bool = False, name: str = None) -> Dict[str, Any]:
         """Create JWT access token"""
         if remember_me:
             expire = datetime.utcnow() + timedelta(days=self.refresh_token_expire_days)
@@ -104,19 +91,12 @@ class AuthService:
             "iat": datetime.utcnow(),
             "type": "access"
         }
+        if name:
+            # Lets request handlers show the name without a users query
+            to_encode["name"] = name
 
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
-
-        # Use raw SQLite connection
-        import sqlite3
-        conn = sqlite3.connect("app/local/auth_cache.db")
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT OR REPLACE INTO token_cache (token, user_id, expires_at, is_valid) VALUES (?, ?, ?, ?)",
-            (encoded_jwt, user_id, expire.isoformat(), True)
-        )
-        conn.commit()
-        conn.close()
+        token_validator.register(encoded_jwt, user_id, expire)
 
         return {
             "access_token": encoded_jwt,
@@ -126,75 +106,26 @@ class AuthService:
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Verify JWT token"""
         try:
-            # Use raw SQLite connection
-            import sqlite3
-            conn = sqlite3.connect("app/local/auth_cache.db")
-            cursor = conn.execute(
-                "SELECT user_id, expires_at, is_valid FROM token_cache WHERE token = ?",
-                (token,)
-            )
-            result = cursor.fetchone()
-            conn.close()
-            
-            if not result or not result[2]:
-                return None
-
-            expires_at = datetime.fromisoformat(result[1])
-            if expires_at < datetime.utcnow():
-                self.invalidate_token(token)
-                return None
-
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return {
-                "user_id": payload["user_id"],
-                "email": payload["email"],
-                "name": self.get_user_name(payload["user_id"])
-            }
-
-        except jwt.PyJWTError:
+            principal = token_validator.validate(token)
+        except InvalidToken:
             return None
+        if not principal.get("name"):
+            # Tokens issued before the name claim was added
+            principal = {**principal, "name": self.get_user_name(principal["user_id"])}
+        return principal
 
     def invalidate_token(self, token: str) -> bool:
         """Invalidate a token"""
-        try:
-            # Use raw SQLite connection
-            import sqlite3
-            conn = sqlite3.connect("app/local/auth_cache.db")
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE token_cache SET is_valid = FALSE WHERE token = ?",
-                (token,)
-            )
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            logger.error(f"Token invalidation failed: {str(e)}")
-            return False
+        return token_validator.revoke(token)
 
     def change_password(self, user_id: UUID, current_password: str, new_password: str) -> bool:
         """Change user password"""
         try:
-            # Use raw SQLite connection
-            import sqlite3
-            conn = sqlite3.connect("app/local/auth_cache.db")
-            cursor = conn.execute(
-                "SELECT password_hash FROM auth_cache WHERE user_id = ?",
-                (str(user_id),)
-            )
-            result = cursor.fetchone()
-            if not result or not self.verify_password(current_password, result[0]):
-                conn.close()
+            current_hash = auth_store.get_password_hash(str(user_id))
+            if not current_hash or not self.verify_password(current_password, current_hash):
                 return False
 
-            new_hash = self.hash_password(new_password)
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE auth_cache SET password_hash = ? WHERE user_id = ?",
-                (new_hash, str(user_id))
-            )
-            conn.commit()
-            conn.close()
+            auth_store.set_password_hash(str(user_id), self.hash_password(new_password))
             return True
         except Exception as e:
             logger.error(f"Password change failed: {str(e)}")
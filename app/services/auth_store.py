@@ -0,0 +1,230 @@
+"""
+Auth Store for RAGBot
+Location: app/services/auth_store.py
+
+Owns app/local/auth_cache.db: password hashes (auth_cache) and issued tokens
+(token_cache).
+
+- Reads use one connection per thread, opened once, in WAL mode, so readers
+  never wait behind a writer.
+- Writes go through a single writer thread that commits whatever has queued
+  up in one transaction (group commit). Callers still wait for their own
+  commit, so a token is durable before it is handed out.
+- A purge job deletes expired and revoked tokens every AUTH_PURGE_INTERVAL
+  seconds, in small chunks, so token_cache stays the size of the live
+  sessions. A deleted row reads as revoked, which is also what an expired
+  token is.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+AUTH_DB_PATH = os.getenv("AUTH_DB_PATH", "app/local/auth_cache.db")
+AUTH_PURGE_INTERVAL = float(os.getenv("AUTH_PURGE_INTERVAL", 3600))
+AUTH_WRITE_BATCH = int(os.getenv("AUTH_WRITE_BATCH", 64))
+PURGE_CHUNK = 1000
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS auth_cache (
+        user_id TEXT PRIMARY KEY,
+        password_hash TEXT NOT NULL
+    )""",
+    # token is the primary key, so token lookups are already indexed
+    """CREATE TABLE IF NOT EXISTS token_cache (
+        token TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        expires_at TEXT NOT NULL,
+        is_valid BOOLEAN NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_token_cache_user_id ON token_cache (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_token_cache_expires_at ON token_cache (expires_at)",
+)
+
+
+class _Write:
+    __slots__ = ("sql", "params", "done", "error", "rowcount")
+
+    def __init__(self, sql: str, params: Tuple):
+        self.sql = sql
+        self.params = params
+        self.rowcount = 0
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class AuthStore:
+    def __init__(self, path: str = AUTH_DB_PATH, purge_interval: float = AUTH_PURGE_INTERVAL,
+                 write_batch: int = AUTH_WRITE_BATCH):
+        self.path = path
+        self.purge_interval = purge_interval
+        self.write_batch = write_batch
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._writes: "queue.Queue[_Write]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._purger: Optional[threading.Thread] = None
+        self._stop_purge = threading.Event()
+
+    # Connections
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: durable across application crashes, fsync only at checkpoints
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection):
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if not self._schema_ready:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+                self._schema_ready = True
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._ensure_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    def _fetchone(self, sql: str, params: Tuple = ()) -> Optional[Tuple]:
+        return self.connection().execute(sql, params).fetchone()
+
+    # Group-committed writes
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="auth-store-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        conn = self._open()
+        self._ensure_schema(conn)
+        while True:
+            batch: List[_Write] = [self._writes.get()]
+            while len(batch) < self.write_batch:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for write in batch:
+                    try:
+                        write.rowcount = conn.execute(write.sql, write.params).rowcount
+                    except sqlite3.Error as e:
+                        write.error = e  # fails this statement only
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                for write in batch:
+                    write.error = write.error or e
+            for write in batch:
+                write.done.set()
+
+    def execute_write(self, sql: str, params: Tuple = (), timeout: float = 10.0) -> int:
+        """Run one write statement and return its row count once it is committed."""
+        self._ensure_writer()
+        write = _Write(sql, params)
+        self._writes.put(write)
+        if not write.done.wait(timeout):
+            raise TimeoutError("auth store write not committed in time")
+        if write.error is not None:
+            raise write.error
+        return write.rowcount
+
+    # Passwords
+
+    def set_password_hash(self, user_id: str, password_hash: str):
+        self.execute_write(
+            "INSERT OR REPLACE INTO auth_cache (user_id, password_hash) VALUES (?, ?)",
+            (user_id, password_hash)
+        )
+
+    def get_password_hash(self, user_id: str) -> Optional[str]:
+        row = self._fetchone("SELECT password_hash FROM auth_cache WHERE user_id = ?", (user_id,))
+        return row[0] if row else None
+
+    # Tokens
+
+    def store_token(self, token: str, user_id: str, expires_at: datetime):
+        self.execute_write(
+            "INSERT OR REPLACE INTO token_cache (token, user_id, expires_at, is_valid) VALUES (?, ?, ?, ?)",
+            (token, user_id, expires_at.isoformat(), True)
+        )
+
+    def is_token_valid(self, token: str) -> bool:
+        row = self._fetchone("SELECT is_valid FROM token_cache WHERE token = ?", (token,))
+        return bool(row and row[0])
+
+    def revoke_token(self, token: str):
+        self.execute_write("UPDATE token_cache SET is_valid = FALSE WHERE token = ?", (token,))
+
+    # Compaction
+
+    def purge(self, now: datetime = None) -> int:
+        """Delete expired and revoked tokens in chunks; returns rows removed."""
+        cutoff = (now or datetime.utcnow()).isoformat()
+        removed = 0
+        while True:
+            # Short chunked transactions so logins are never held up behind one long delete
+            deleted = self.execute_write(
+                "DELETE FROM token_cache WHERE rowid IN ("
+                "SELECT rowid FROM token_cache WHERE expires_at < ? OR is_valid = 0 LIMIT ?)",
+                (cutoff, PURGE_CHUNK)
+            )
+            removed += deleted
+            if deleted < PURGE_CHUNK:
+                return removed
+
+    def _purge_loop(self):
+        while not self._stop_purge.wait(self.purge_interval):
+            try:
+                removed = self.purge()
+                if removed:
+                    logger.info(f"Purged {removed} expired or revoked tokens")
+                    self.connection().execute("PRAGMA optimize")
+            except Exception as e:
+                logger.error(f"Token purge failed: {e}")
+
+    def start_purger(self):
+        if self._purger is not None and self._purger.is_alive():
+            return
+        self._stop_purge.clear()
+        self._purger = threading.Thread(target=self._purge_loop, name="auth-token-purge", daemon=True)
+        self._purger.start()
+
+    def stop_purger(self):
+        self._stop_purge.set()
+        self._purger = None
+
+    def stats(self) -> dict:
+        total, live = self._fetchone(
+            "SELECT COUNT(*), COALESCE(SUM(CASE WHEN is_valid AND expires_at >= ? THEN 1 ELSE 0 END), 0) "
+            "FROM token_cache",
+            (datetime.utcnow().isoformat(),)
+        )
+        return {"tokens": total, "live_tokens": live, "pending_writes": self._writes.qsize()}
+
+
+auth_store = AuthStore()
@@ -1,23 +1,30 @@
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from uuid import UUID, uuid4
+import asyncio
 import os
 import time
 import logging
 
-from langchain_huggingface import HuggingFaceEmbeddings
-from ..rag_engine.Ingest.document_loader import load_documents
-from ..rag_engine.chroma.chroma_client import ChromaClient
-from ..rag_engine.Query.vectorstore_loader import load_vectorstore
-from ..rag_engine.Query.llm_loader import get_llm
-from ..rag_engine.Query.rag_chain_builder import build_rag_chain as get_rag_chain
+from sqlalchemy import update
+
+from ..rag_engine import resources
 from ..websearch.tavily_tool import search_web
 from ..rag_engine.db.models import Conversation, Message, DocumentMetadata
-from ..rag_engine.aws.s3_uploader import S3Uploader
+from .user_service import increment_usage
 from ..utils.logger import get_logger
+from ..utils.metrics import EMBEDDING_BATCH_SIZE, LLM_IN_FLIGHT, LLM_TOKENS_PER_SECOND
+from ..utils.tracing import span
+from .conversation_archive import conversation_archive as default_archive
+from .s3_writer import s3_writer as default_s3_writer
+from .upload_progress import upload_progress
 
 logger = get_logger()
 
+# Per-leg time budgets for hybrid search, in seconds
+LOCAL_SEARCH_TIMEOUT = float(os.getenv("LOCAL_SEARCH_TIMEOUT", 5))
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", 8))
+
 
 class ResponseFormatter:
     @staticmethod
@@ -77,65 +84,129 @@ class ResponseFormatter:
 
 
 class ChatService:
-    def __init__(self, db, local_db=None):
+    def __init__(self, db, local_db=None, embeddings_model=None, chroma_client=None, llm=None, s3_writer=None, archive=None):
+        """Components can be injected (benchmarks, offline runs); anything omitted uses the
+        process-wide instance from ``resources``, loaded on first use."""
         self.db = db
         self.local_db = local_db
-        self.embeddings_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
-        self.chroma_client = ChromaClient(persist_directory="app/data/chroma")
-        self.s3_uploader = S3Uploader()
+        self._embeddings_model = embeddings_model
+        self._chroma_client = chroma_client
+        self.s3_writer = s3_writer or default_s3_writer
+        self.archive = archive or default_archive
+        self.llm = llm
+
+    @property
+    def embeddings_model(self):
+        if self._embeddings_model is None:
+            self._embeddings_model = resources.get_embeddings_model()
+        return self._embeddings_model
+
+    @property
+    def chroma_client(self):
+        if self._chroma_client is None:
+            self._chroma_client = resources.get_chroma_client()
+        return self._chroma_client
+
+    def _search_local(self, user_id: UUID, query: str, max_results: int) -> List[Dict[str, Any]]:
+        with span("embed"):
+            query_embedding = self.embeddings_model.embed_query(query)
+        EMBEDDING_BATCH_SIZE.labels("query").observe(1)
+        chunks = self.chroma_client.query_docs(query_embedding, n_results=max_results, user_id=str(user_id))
+
+        results = []
+        for doc, dist, meta in zip(chunks["documents"][0], chunks["distances"][0], chunks["metadatas"][0]):
+            similarity = 1 - (dist / 2)
+            if similarity > 0.5:  # Only include relevant results
+                results.append({
+                    "content": doc,
+                    "similarity": similarity,
+                    "metadata": meta,
+                    "source": meta.get("source", "Unknown"),
+                    "origin": "local",
+                    "score": similarity
+                })
+        return results
+
+    @staticmethod
+    def _search_web(query: str) -> Dict[str, Any]:
+        web_result = search_web(query, include_meta=True) or {}
+        results = [
+            {**r, "origin": "web", "score": float(r.get("score") or 0.0)}
+            for r in web_result.get("results", [])
+        ]
+        return {"results": results, "answer": web_result.get("answer", "")}
+
+    @staticmethod
+    def _clamp_scores(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Both legs already score on [0, 1]: local is 1 - cosine_distance / 2, Tavily's score is a [0, 1]
+        relevance. They are merged on those absolute values; this only guards against out-of-range input."""
+        for r in results:
+            r["score"] = min(max(r["score"], 0.0), 1.0)
+        return results
+
+    async def search_content(self, user_id: UUID, query: str, search_type: str = "local", max_results: int = 10,
+                             format_preference: str = "auto") -> Dict[str, Any]:
+        """Search content in documents based on query and search type.
+
+        Hybrid search runs the local and web legs concurrently, each under its
+        own timeout, and returns whatever finished as one ranking truncated to
+        ``max_results``. Legs that time out or fail are listed in ``partial``.
+        """
+        format_type = ResponseFormatter.detect_format_request(query) if format_preference == "auto" else format_preference
 
-    async def search_content(self, user_id: UUID, query: str, search_type: str = "local") -> Dict[str, Any]:
-        """Search content in documents based on query and search type"""
         try:
             if search_type == "local":
-                # Search in ChromaDB
-                query_embedding = self.embeddings_model.embed_query(query)
-                chunks = self.chroma_client.query_docs(query_embedding, n_results=10)
-                
-                results = []
-                for doc, dist, meta in zip(chunks["documents"][0], chunks["distances"][0], chunks["metadatas"][0]):
-                    similarity = 1 - (dist / 2)
-                    if similarity > 0.5:  # Only include relevant results
-                        results.append({
-                            "content": doc,
-                            "similarity": similarity,
-                            "metadata": meta,
-                            "source": meta.get("source", "Unknown")
-                        })
-                
+                results = await asyncio.to_thread(self._search_local, user_id, query, max_results)
                 return {
                     "results": results,
                     "total_found": len(results),
                     "search_type": "local"
                 }
-                
+
             elif search_type == "web":
-                # Use web search
-                web_result = search_web(query, include_meta=True)
+                web = await asyncio.to_thread(self._search_web, query)
                 return {
-                    "results": web_result.get("results", []),
-                    "total_found": len(web_result.get("results", [])),
+                    "results": web["results"][:max_results],
+                    "total_found": len(web["results"]),
                     "search_type": "web",
-                    "answer": web_result.get("answer", "")
+                    "answer": ResponseFormatter.format_response(web["answer"], format_type, query)
                 }
-                
+
             elif search_type == "hybrid":
-                # Combine local and web search
-                local_results = await self.search_content(user_id, query, "local")
-                web_results = await self.search_content(user_id, query, "web")
-                
+                # The legs run in worker threads; a timed-out leg is abandoned, not interrupted
+                local_outcome, web_outcome = await asyncio.gather(
+                    asyncio.wait_for(asyncio.to_thread(self._search_local, user_id, query, max_results), LOCAL_SEARCH_TIMEOUT),
+                    asyncio.wait_for(asyncio.to_thread(self._search_web, query), WEB_SEARCH_TIMEOUT),
+                    return_exceptions=True
+                )
+
+                partial = {}
+                if isinstance(local_outcome, BaseException):
+                    partial["local"] = "timeout" if isinstance(local_outcome, asyncio.TimeoutError) else str(local_outcome)
+                    logger.warning(f"Hybrid search local leg failed: {partial['local']}")
+                    local_outcome = []
+                if isinstance(web_outcome, BaseException):
+                    partial["web"] = "timeout" if isinstance(web_outcome, asyncio.TimeoutError) else str(web_outcome)
+                    logger.warning(f"Hybrid search web leg failed: {partial['web']}")
+                    web_outcome = {"results": [], "answer": ""}
+
+                merged = self._clamp_scores(local_outcome) + self._clamp_scores(web_outcome["results"])
+                merged.sort(key=lambda r: r["score"], reverse=True)
+
                 return {
-                    "results": local_results["results"] + web_results["results"],
-                    "total_found": local_results["total_found"] + web_results["total_found"],
+                    "results": merged[:max_results],
+                    "total_found": len(merged),
                     "search_type": "hybrid",
-                    "local_count": local_results["total_found"],
-                    "web_count": web_results["total_found"]
+                    "local_count": len(local_outcome),
+                    "web_count": len(web_outcome["results"]),
+                    "answer": ResponseFormatter.format_response(web_outcome["answer"], format_type, query),
+                    "partial": partial
                 }
-                
+
         except Exception as e:
             logger.error(f"Search error: {e}")
             raise Exception(f"Search failed: {str(e)}")
-            
+
         return {"results": [], "total_found": 0, "search_type": search_type}
 
     def create_conversation(self, user_id: UUID, title: str, chat_type: str = "general", tags: List[str] = None) -> Conversation:
@@ -150,49 +221,101 @@ class ChatService:
             message_count=0
         )
         self.db.add(conversation)
+        increment_usage(self.db, user_id, conversation_count=1)
         self.db.commit()
         return conversation
 
-    def save_message(self, conversation_id: UUID, role: str, content: str, sources: Dict = None, response_time: float = None) -> Message:
-        message = Message(
+    def record_turn(self, user_id: UUID, conversation_id: UUID, user_content: str, response_data: Dict[str, Any],
+                    received_at: datetime = None) -> Dict[str, Dict[str, Any]]:
+        """Persist one chat turn in a single transaction.
+
+        Both messages are inserted, and the conversation counter and the
+        user's daily usage rollup are bumped in SQL, so concurrent turns
+        cannot lose an increment. Returns snapshots
+        of the two messages, built before the commit, so callers never touch
+        expired ORM state and trigger a refresh query.
+        """
+        now = datetime.utcnow()
+        user_msg = Message(
             id=uuid4(),
             conversation_id=conversation_id,
-            role=role,
-            content=content,
-            timestamp=datetime.utcnow(),
-            sources=sources or {},
-            response_time=response_time
+            role="user",
+            content=user_content,
+            timestamp=received_at or now,
+            sources={}
         )
-        self.db.add(message)
-        self.db.commit()
+        assistant_msg = Message(
+            id=uuid4(),
+            conversation_id=conversation_id,
+            role="assistant",
+            content=response_data["content"],
+            timestamp=now,
+            sources=response_data["sources"],
+            response_time=response_data["response_time"]
+        )
+        snapshots = {
+            msg.role: {
+                "id": msg.id,
+                "role": msg.role,
+                "content": msg.content,
+                "timestamp": msg.timestamp,
+                "sources": msg.sources
+            }
+            for msg in (user_msg, assistant_msg)
+        }
 
         try:
-            self.s3_uploader.upload_message(
-                str(conversation_id.hex[:8]),
-                str(conversation_id),
-                str(message.id),
+            self.db.add_all([user_msg, assistant_msg])
+            self.db.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation_id)
+                .values(message_count=Conversation.message_count + 2, updated_at=now)
+            )
+            increment_usage(
+                self.db, user_id, day=now,
+                message_count=2,
+                user_message_count=1,
+                assistant_message_count=1,
+                response_time_total=response_data["response_time"],
+                response_time_count=1
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return snapshots
+
+    def archive_turn(self, user_id: UUID, conversation_id: UUID, snapshots: Dict[str, Dict[str, Any]]):
+        """Background task: append a turn to the conversation's S3 archive after the response is sent."""
+        try:
+            self.archive.append(str(user_id), str(conversation_id), [
                 {
-                    "role": role,
-                    "content": content,
-                    "timestamp": message.timestamp.isoformat(),
-                    "sources": sources or {}
+                    "id": str(snapshot["id"]),
+                    "role": snapshot["role"],
+                    "content": snapshot["content"],
+                    "timestamp": snapshot["timestamp"].isoformat(),
+                    "sources": snapshot["sources"]
                 }
-            )
+                for snapshot in snapshots.values()
+            ])
         except Exception as e:
-            logger.warning(f"S3 upload failed: {e}")
-
-        return message
+            logger.warning(f"S3 spool failed: {e}")
 
     async def process_message(self, user_id: UUID, conversation_id: UUID, message_content: str, format_preference: str = "auto") -> Dict[str, Any]:
         start_time = time.perf_counter()
         format_type = ResponseFormatter.detect_format_request(message_content) if format_preference == "auto" else format_preference
 
-        llm = get_llm()
-        chain = get_rag_chain(self.chroma_client, llm, self.embeddings_model)
+        from ..rag_engine.Query.rag_chain_builder import build_rag_chain as get_rag_chain
+
+        with span("setup"):
+            llm = self.llm or resources.get_llm()
+            chain = get_rag_chain(self.chroma_client, llm, self.embeddings_model, user_id=str(user_id))
 
         try:
-            query_embedding = self.embeddings_model.embed_query(message_content)
-            chunks = self.chroma_client.query_docs(query_embedding, n_results=4)
+            with span("embed"):
+                query_embedding = self.embeddings_model.embed_query(message_content)
+            EMBEDDING_BATCH_SIZE.labels("query").observe(1)
+            chunks = self.chroma_client.query_docs(query_embedding, n_results=4, user_id=str(user_id))
             relevant_docs = [(doc, 1 - (dist / 2), meta) for doc, dist, meta in zip(chunks["documents"][0], chunks["distances"][0], chunks["metadatas"][0]) if 1 - (dist / 2) > 0.7]
         except Exception as e:
             logger.error(f"Vectorstore query failed: {e}")
@@ -204,7 +327,18 @@ class ChatService:
 
         if relevant_docs:
             context = "\n".join(f"{doc} [source: {meta.get('source', 'Unknown')}]" for doc, _, meta in relevant_docs)
-            rag_answer = chain.invoke({"question": message_content})
+            # Retrieval inside the chain plus generation by the LLM
+            LLM_IN_FLIGHT.inc()
+            chain_start = time.perf_counter()
+            try:
+                with span("rag_chain"):
+                    rag_answer = chain.invoke({"question": message_content})
+            finally:
+                LLM_IN_FLIGHT.dec()
+            chain_seconds = time.perf_counter() - chain_start
+            if chain_seconds > 0:
+                # Whitespace tokens: the LangChain runnable does not surface Ollama's eval_count
+                LLM_TOKENS_PER_SECOND.observe(len(rag_answer.split()) / chain_seconds)
             indicators = ["no information", "not found", "unknown"]
             if any(ind in rag_answer.lower() for ind in indicators):
                 try:
@@ -243,40 +377,55 @@ class ChatService:
             "tags": []
         }
 
-    async def upload_document(self, user_id: UUID, filename: str, content: bytes, content_hash: str, tags: List[str] = None) -> DocumentMetadata:
-        temp_dir = "temp_uploads"
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_path = os.path.join(temp_dir, filename)
+    async def upload_document(self, user_id: UUID, filename: str, local_path: str, content_hash: str,
+                              tags: List[str] = None, upload_id: str = None) -> DocumentMetadata:
+        """Store and index a document the caller has already written to ``local_path``.
 
-        with open(temp_path, "wb") as f:
-            f.write(content)
+        ``local_path`` must be alone in its directory (the loader ingests the whole
+        directory). The S3 copy is spooled for the background writer, so the caller
+        may delete the file once this returns.
+        """
+        from ..rag_engine.aws.s3_uploader import document_key
+        listener = None
+        if upload_id:
+            # Before spooling: the writer may report "stored" before put_file returns
+            upload_progress.update(upload_id, status="ingesting", s3_status="queued")
+            listener = upload_progress.s3_listener(upload_id)
+        spooled = self.s3_writer.put_file(document_key(str(user_id), content_hash, filename), local_path, listener)
+        if upload_id and not spooled:
+            upload_progress.update(upload_id, s3_status="skipped")
 
-        try:
-            self.s3_uploader.upload_document(str(user_id), filename, temp_path)
-            doc_metadata = DocumentMetadata(
-                id=content_hash,
-                filename=filename,
-                upload_status="completed",
-                local_path=temp_path,
-                doc_type=os.path.splitext(filename)[1].lower(),
-                tags=tags or [],
-                owner_user_id=user_id,
-                is_personalized=True,
-                visibility="private"
-            )
-            self.db.add(doc_metadata)
-            self.db.commit()
-            load_documents(temp_dir, set())
-            return doc_metadata
-        finally:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+        doc_metadata = DocumentMetadata(
+            id=content_hash,
+            filename=filename,
+            content_hash=content_hash,
+            upload_status="completed",
+            local_path=local_path,
+            doc_type=os.path.splitext(filename)[1].lower(),
+            tags=tags or [],
+            owner_user_id=user_id,
+            is_personalized=True,
+            visibility="private"
+        )
+        self.db.add(doc_metadata)
+        self.db.commit()
+        # Chunking and embedding (and the first-use model load) run off the event loop
+        await asyncio.to_thread(self._ingest_directory, os.path.dirname(local_path), str(user_id))
+        if upload_id:
+            upload_progress.update(upload_id, status="indexed", document_id=content_hash)
+        return doc_metadata
+
+    @staticmethod
+    def _ingest_directory(directory: str, user_id: str):
+        # Imported here: the loader pulls in the embedding model at import time
+        from ..rag_engine.Ingest.document_loader import load_documents
+        load_documents(directory, set(), user_id=user_id)
 
     async def delete_document(self, document_id: str, user_id: UUID):
         document = self.db.query(DocumentMetadata).filter_by(id=document_id, owner_user_id=user_id).first()
         if document:
             try:
-                self.chroma_client.delete_document(document_id)
+                self.chroma_client.delete_document(document_id, user_id=str(user_id))
             except Exception as e:
                 logger.warning(f"Vectorstore delete failed: {e}")
             self.db.delete(document)
@@ -0,0 +1,293 @@
+"""
+Conversation Archive for RAGBot
+Location: app/services/conversation_archive.py
+
+S3 layout for conversation history, replacing one object per message:
+
+    users/{user}/archive/{conv}/segments/{time_ns}-{rand}.jsonl.gz   appended turns
+    users/{user}/archive/{conv}/packs/{time_ns}.jsonl.gz             compacted segments
+    users/{user}/archive/{conv}/index.json                           pack member ranges
+
+Each chat turn becomes one small gzip JSONL segment, spooled through the S3
+writer, so appends never read or rewrite existing objects. Every
+ARCHIVE_COMPACT_SEGMENTS appends, a compaction job concatenates the loose
+segments and any pack under ARCHIVE_PACK_TARGET_BYTES into one new pack.
+Concatenated gzip members are still a valid gzip stream, so nothing is
+recompressed. The index records each member's byte range, message count and
+time span, so a reader fetches a conversation with one ranged GET per pack
+(plus any segments not yet compacted) and can skip members older than
+``since``.
+
+Any worker may compact. The index is replaced with a conditional PUT
+(If-Match on the ETag it was read at, or If-None-Match for a new index), so
+of two concurrent compactions only one lands; the other discards its pack
+and starts over from the new index. What a compaction absorbed is deleted
+only after its index write succeeded. Readers drop duplicate message ids, so
+a member that is briefly both loose and packed is returned once.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from ..utils.logger import get_logger
+from .s3_writer import S3Writer, s3_writer
+
+logger = get_logger()
+
+ARCHIVE_COMPACT_SEGMENTS = int(os.getenv("ARCHIVE_COMPACT_SEGMENTS", 32))
+ARCHIVE_PACK_TARGET_BYTES = int(os.getenv("ARCHIVE_PACK_TARGET_BYTES", 4 * 2 ** 20))
+ARCHIVE_COMPACT_ATTEMPTS = int(os.getenv("ARCHIVE_COMPACT_ATTEMPTS", 5))
+# Another writer replaced the index (412), or wrote it at the same moment (409)
+CONFLICT_CODES = ("PreconditionFailed", "ConditionalRequestConflict", "412", "409")
+INDEX_VERSION = 1
+
+
+def archive_prefix(user_id: str, conv_id: str) -> str:
+    return f"users/{user_id}/archive/{conv_id}/"
+
+
+def _encode(messages: List[Dict[str, Any]]) -> bytes:
+    lines = "".join(json.dumps(m, separators=(",", ":"), default=str) + "\n" for m in messages)
+    return gzip.compress(lines.encode("utf-8"))
+
+
+def _decode(data: bytes) -> List[Dict[str, Any]]:
+    # gzip.decompress reads every member of a concatenated stream
+    return [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines() if line]
+
+
+def _member(messages: List[Dict[str, Any]], offset: int, length: int) -> Dict[str, Any]:
+    timestamps = [str(m.get("timestamp", "")) for m in messages]
+    return {
+        "offset": offset,
+        "length": length,
+        "count": len(messages),
+        "first_ts": min(timestamps, default=""),
+        "last_ts": max(timestamps, default="")
+    }
+
+
+def _coalesce(members: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """Merge adjacent byte ranges so contiguous members cost one GET."""
+    ranges: List[Tuple[int, int]] = []
+    for m in sorted(members, key=lambda m: m["offset"]):
+        start, end = m["offset"], m["offset"] + m["length"]
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+class ConversationArchive:
+    def __init__(self, writer: S3Writer = None, compact_every: int = ARCHIVE_COMPACT_SEGMENTS,
+                 pack_target_bytes: int = ARCHIVE_PACK_TARGET_BYTES):
+        self.writer = writer or s3_writer
+        self.compact_every = compact_every
+        self.pack_target_bytes = pack_target_bytes
+        self._appends: Dict[Tuple[str, str], int] = defaultdict(int)  # since last compaction, this process
+        self._locks: Dict[Tuple[str, str], threading.Lock] = defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+        self.writer.register_handler("archive_compact", self._compact_handler)
+
+    # Writing
+
+    def append(self, user_id: str, conv_id: str, messages: List[Dict[str, Any]]) -> bool:
+        """Spool one segment holding ``messages`` (a chat turn). Returns False if not spooled."""
+        if not messages:
+            return True
+        key = f"{archive_prefix(user_id, conv_id)}segments/{time.time_ns():020d}-{uuid4().hex[:8]}.jsonl.gz"
+        if not self.writer.enqueue("object", key, _encode(messages), "application/gzip"):
+            return False
+        with self._lock:
+            self._appends[(user_id, conv_id)] += 1
+            due = self._appends[(user_id, conv_id)] >= self.compact_every
+            if due:
+                self._appends[(user_id, conv_id)] = 0
+        if due:
+            # Queued behind the segments, so it usually finds them uploaded
+            self.writer.enqueue("archive_compact", archive_prefix(user_id, conv_id),
+                                json.dumps({"user_id": user_id, "conv_id": conv_id}).encode())
+        return True
+
+    def _compact_handler(self, client, bucket: str, row: Dict[str, Any]):
+        job = json.loads(row["body"])
+        self.compact(job["user_id"], job["conv_id"])
+
+    # S3 helpers
+
+    def _client(self):
+        return self.writer.get_client()
+
+    @staticmethod
+    def _load_index(client, bucket: str, prefix: str) -> Tuple[Dict[str, Any], Optional[str]]:
+        """The index and its ETag (None if there is no index yet)."""
+        try:
+            response = client.get_object(Bucket=bucket, Key=prefix + "index.json")
+        except client.exceptions.NoSuchKey:
+            return {"version": INDEX_VERSION, "packs": []}, None
+        return json.loads(response["Body"].read()), response["ETag"]
+
+    @staticmethod
+    def _put_index(client, bucket: str, prefix: str, index: Dict[str, Any], etag: Optional[str]) -> bool:
+        """Replace the index only if it is still at ``etag``. Returns False on a conflict."""
+        # Imported here: importing the API must not pull in botocore
+        from botocore.exceptions import ClientError
+        condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+        try:
+            client.put_object(Bucket=bucket, Key=prefix + "index.json", Body=json.dumps(index).encode(),
+                              ContentType="application/json", **condition)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in CONFLICT_CODES:
+                return False
+            raise
+        return True
+
+    @staticmethod
+    def _list_segments(client, bucket: str, prefix: str) -> List[str]:
+        keys = []
+        for page in client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix + "segments/"):
+            keys.extend(obj["Key"] for obj in page.get("Contents", []))
+        return sorted(keys)
+
+    @staticmethod
+    def _delete(client, bucket: str, keys: List[str]):
+        for i in range(0, len(keys), 1000):
+            client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": key} for key in keys[i:i + 1000]], "Quiet": True}
+            )
+
+    # Compaction
+
+    def compact(self, user_id: str, conv_id: str) -> Dict[str, Any]:
+        """Merge loose segments and undersized packs of one conversation into a new pack."""
+        with self._lock:
+            lock = self._locks[(user_id, conv_id)]
+        with lock:
+            client, bucket = self._client()
+            prefix = archive_prefix(user_id, conv_id)
+            for attempt in range(1, ARCHIVE_COMPACT_ATTEMPTS + 1):
+                result = self._compact_once(client, bucket, prefix)
+                if result is not None:
+                    logger.info(f"Compacted archive {conv_id}: {result}")
+                    return result
+                logger.info(f"Archive index for {conv_id} changed during compaction (attempt {attempt}); retrying")
+            logger.warning(f"Gave up compacting archive {conv_id} after {ARCHIVE_COMPACT_ATTEMPTS} conflicts")
+            return {"packed_segments": 0, "merged_packs": 0, "conflicts": ARCHIVE_COMPACT_ATTEMPTS}
+
+    def _compact_once(self, client, bucket: str, prefix: str) -> Optional[Dict[str, Any]]:
+        """One compaction against the index as read now; None if another worker got there first."""
+        index, etag = self._load_index(client, bucket, prefix)
+        segments = self._list_segments(client, bucket, prefix)
+        small = [p for p in index["packs"] if p["size"] < self.pack_target_bytes]
+        if len(segments) + len(small) < 2:
+            return {"packed_segments": 0, "merged_packs": 0}
+
+        body = bytearray()
+        members = []
+        try:
+            for pack in small:
+                data = client.get_object(Bucket=bucket, Key=pack["key"])["Body"].read()
+                members.extend({**m, "offset": m["offset"] + len(body)} for m in pack["members"])
+                body += data
+            for key in segments:
+                data = client.get_object(Bucket=bucket, Key=key)["Body"].read()
+                members.append(_member(_decode(data), len(body), len(data)))
+                body += data
+        except client.exceptions.NoSuchKey:
+            # A concurrent compaction committed and deleted what we listed
+            return None
+
+        pack_key = f"{prefix}packs/{time.time_ns():020d}-{uuid4().hex[:8]}.jsonl.gz"
+        client.put_object(Bucket=bucket, Key=pack_key, Body=bytes(body), ContentType="application/gzip")
+        small_keys = {p["key"] for p in small}
+        index["packs"] = [p for p in index["packs"] if p["key"] not in small_keys] + [
+            {"key": pack_key, "size": len(body), "members": members}
+        ]
+        index["version"] = INDEX_VERSION
+        index["updated_at"] = time.time()
+        if not self._put_index(client, bucket, prefix, index, etag):
+            # Our pack never entered the index; the objects it copied are still referenced
+            client.delete_object(Bucket=bucket, Key=pack_key)
+            return None
+
+        self._delete(client, bucket, segments + sorted(small_keys))
+        return {"packed_segments": len(segments), "merged_packs": len(small), "pack": pack_key,
+                "pack_bytes": len(body)}
+
+    # Reading
+
+    def iter_messages(self, user_id: str, conv_id: str, since: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield a conversation's archived messages in timestamp order.
+
+        ``since`` is an ISO timestamp; pack members that end before it are not fetched.
+        """
+        client, bucket = self._client()
+        prefix = archive_prefix(user_id, conv_id)
+        index, _ = self._load_index(client, bucket, prefix)
+
+        messages = []
+        for pack in index["packs"]:
+            wanted = [m for m in pack["members"] if since is None or m["last_ts"] >= since]
+            for start, end in _coalesce(wanted):
+                data = client.get_object(Bucket=bucket, Key=pack["key"], Range=f"bytes={start}-{end - 1}")["Body"].read()
+                messages.extend(_decode(data))
+        for key in self._list_segments(client, bucket, prefix):
+            messages.extend(_decode(client.get_object(Bucket=bucket, Key=key)["Body"].read()))
+
+        seen = set()
+        for message in sorted(messages, key=lambda m: str(m.get("timestamp", ""))):
+            if since is not None and str(message.get("timestamp", "")) < since:
+                continue
+            message_id = message.get("id")
+            if message_id is not None:
+                if message_id in seen:
+                    continue
+                seen.add(message_id)
+            yield message
+
+    def stats(self, user_id: str, conv_id: str) -> Dict[str, Any]:
+        client, bucket = self._client()
+        prefix = archive_prefix(user_id, conv_id)
+        index, _ = self._load_index(client, bucket, prefix)
+        return {
+            "packs": len(index["packs"]),
+            "pack_bytes": sum(p["size"] for p in index["packs"]),
+            "packed_messages": sum(m["count"] for p in index["packs"] for m in p["members"]),
+            "loose_segments": len(self._list_segments(client, bucket, prefix))
+        }
+
+
+conversation_archive = ConversationArchive()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Read or compact archived conversations in S3")
+    parser.add_argument("user_id")
+    parser.add_argument("conv_id")
+    sub = parser.add_subparsers(dest="command", required=True)
+    read = sub.add_parser("read", help="Print the conversation as JSON lines")
+    read.add_argument("--since", help="ISO timestamp")
+    sub.add_parser("compact", help="Compact the conversation now")
+    sub.add_parser("stats", help="Pack and segment counts")
+
+    args = parser.parse_args(argv)
+    if args.command == "read":
+        for message in conversation_archive.iter_messages(args.user_id, args.conv_id, args.since):
+            print(json.dumps(message, ensure_ascii=False))
+    elif args.command == "compact":
+        print(json.dumps(conversation_archive.compact(args.user_id, args.conv_id), indent=2))
+    elif args.command == "stats":
+        print(json.dumps(conversation_archive.stats(args.user_id, args.conv_id), indent=2))
+
+
+if __name__ == "__main__":
+    main()
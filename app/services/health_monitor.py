@@ -0,0 +1,183 @@
+"""
+Health Monitor for RAGBot
+Location: app/services/health_monitor.py
+
+Samples component health in the background every HEALTH_CHECK_INTERVAL
+seconds and keeps the latest result, so health endpoints answer from memory
+instead of opening connections (or sleeping on psutil) per probe. Checks run
+concurrently in worker threads, each bounded by HEALTH_CHECK_TIMEOUT, and
+report their measured latency.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+import psutil
+
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", 15))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", 5))
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+
+# Components that decide overall_status; the rest are informational
+CRITICAL_COMPONENTS = ("postgresql", "sqlite", "vectorstore", "s3")
+
+
+def _check_postgresql() -> Dict[str, Any]:
+    from sqlalchemy import text
+    from ..rag_engine.db.session import engine
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return {"connection": "active", "dialect": engine.dialect.name}
+
+
+def _check_sqlite() -> Dict[str, Any]:
+    from sqlalchemy import text
+    from ..rag_engine.local_cache.sqlite_session import engine
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return {"connection": "active"}
+
+
+def _check_vectorstore() -> Dict[str, Any]:
+    from ..rag_engine import resources
+    chroma_client = resources.get_chroma_client()
+    return {"connection": "active", "document_count": chroma_client.get_doc_collection().count()}
+
+
+def _check_llm() -> Dict[str, Any]:
+    import requests
+    response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=HEALTH_CHECK_TIMEOUT)
+    response.raise_for_status()
+    return {"connection": "active", "models": len(response.json().get("models", []))}
+
+
+def _check_web_search() -> Dict[str, Any]:
+    # Not probed: every Tavily request is billed
+    if not os.getenv("TAVILY_API_KEY"):
+        raise RuntimeError("TAVILY_API_KEY not set")
+    return {"configured": True}
+
+
+class HealthMonitor:
+    def __init__(self, interval: float = HEALTH_CHECK_INTERVAL, timeout: float = HEALTH_CHECK_TIMEOUT):
+        self.interval = interval
+        self.timeout = timeout
+        self._s3 = None  # (client, bucket), built once rather than per probe
+        self._task: Optional[asyncio.Task] = None
+        self.checks: Dict[str, Callable[[], Dict[str, Any]]] = {
+            "postgresql": _check_postgresql,
+            "sqlite": _check_sqlite,
+            "vectorstore": _check_vectorstore,
+            "s3": self._check_s3,
+            "llm": _check_llm,
+            "web_search": _check_web_search,
+        }
+        self._components: Dict[str, Dict[str, Any]] = {
+            name: {"status": "unknown", "last_check": None} for name in self.checks
+        }
+        self._system_info: Dict[str, Any] = {}
+        self.last_sample: Optional[float] = None
+        # cpu_percent(interval=None) reports usage since the previous call; prime it
+        psutil.cpu_percent(interval=None)
+
+    def _check_s3(self) -> Dict[str, Any]:
+        if os.getenv("DISABLE_S3", "false").lower() == "true":
+            return {"connection": "disabled"}
+        if self._s3 is None:
+            from ..rag_engine.aws.s3_config import S3Config
+            config = S3Config()
+            self._s3 = (config.get_client(), config.bucket)
+        client, bucket = self._s3
+        try:
+            client.head_bucket(Bucket=bucket)
+        except Exception:
+            self._s3 = None  # rebuild next time, e.g. after a credential rotation
+            raise
+        return {"connection": "active", "bucket": bucket}
+
+    async def _run_check(self, name: str, check: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(asyncio.to_thread(check), self.timeout)
+            result = {"status": "healthy", **details}
+        except asyncio.TimeoutError:
+            result = {"status": "unhealthy", "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {"status": "unhealthy", "error": str(e)}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        result["last_check"] = datetime.utcnow().isoformat()
+        if result["status"] != "healthy" and self._components[name]["status"] == "healthy":
+            logger.warning(f"{name} health check failed: {result.get('error')}")
+        return result
+
+    @staticmethod
+    def _sample_system() -> Dict[str, Any]:
+        try:
+            return {
+                "cpu_percent": psutil.cpu_percent(interval=None),
+                "memory_percent": psutil.virtual_memory().percent,
+                "disk_percent": psutil.disk_usage('/').percent,
+                "load_average": os.getloadavg() if hasattr(os, 'getloadavg') else None,
+                "process_count": len(psutil.pids()),
+                "process_rss_mb": round(psutil.Process().memory_info().rss / 2 ** 20, 1),
+                "boot_time": datetime.fromtimestamp(psutil.boot_time()).isoformat()
+            }
+        except Exception as e:
+            logger.error(f"System info collection failed: {str(e)}")
+            return {"error": str(e)}
+
+    async def sample(self):
+        names = list(self.checks)
+        results = await asyncio.gather(*(self._run_check(name, self.checks[name]) for name in names))
+        self._components = dict(zip(names, results))
+        self._system_info = await asyncio.to_thread(self._sample_system)
+        self.last_sample = time.time()
+
+    async def run(self):
+        while True:
+            try:
+                await self.sample()
+            except Exception as e:
+                logger.error(f"Health sampling failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        components = self._components
+        statuses = [components[name]["status"] for name in CRITICAL_COMPONENTS]
+        if self.last_sample is None:
+            overall = "unknown"
+        elif time.time() - self.last_sample > 3 * self.interval + self.timeout:
+            overall = "stale"  # the sampler stopped; don't report old results as current
+        elif all(status == "healthy" for status in statuses):
+            overall = "healthy"
+        else:
+            overall = "degraded"
+        return {
+            "overall_status": overall,
+            "components": components,
+            "system_info": self._system_info,
+            "sampled_at": datetime.utcfromtimestamp(self.last_sample).isoformat() if self.last_sample else None
+        }
+
+
+health_monitor = HealthMonitor()
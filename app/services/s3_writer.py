@@ -0,0 +1,385 @@
+"""
+S3 Writer for RAGBot
+Location: app/services/s3_writer.py
+
+Write-behind queue for S3 uploads. Callers spool an upload to a local SQLite
+file (S3_SPOOL_PATH) and return; background threads upload spooled entries
+over one shared client, S3_WRITER_CONCURRENCY at a time. A spooled upload
+survives a crash or restart and is retried with exponential backoff until it
+succeeds or has failed S3_WRITER_MAX_ATTEMPTS times; after that it is kept in
+the spool, marked dead, for inspection. The spool is bounded by
+S3_SPOOL_MAX_ROWS: beyond that new uploads are dropped and counted rather
+than filling the disk.
+
+Each entry has a kind that selects its handler: "object" puts the body
+stored in the row, "file" uploads a copy of a local file kept in
+S3_SPOOL_DIR, as a multipart transfer. More kinds can be added with
+register_handler(). A "file" upload can carry a listener that is told about
+bytes sent and the final outcome (see upload_progress).
+
+Several processes (e.g. uvicorn workers) may share one spool. A writer
+claims a row in SQLite before uploading it by setting a lease
+(lease_until, lease_owner) that only it can clear; rows leased by another
+writer are skipped until the lease ends. Leases of running uploads are
+renewed every S3_WRITER_LEASE / 3 seconds, so only the rows of a writer
+that died wait for theirs to expire.
+"""
+
+import json
+import os
+import random
+import shutil
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+from uuid import uuid4
+
+from ..utils.logger import get_logger
+
+logger = get_logger()
+
+S3_SPOOL_PATH = os.getenv("S3_SPOOL_PATH", "app/local/s3_spool.db")
+S3_SPOOL_DIR = os.getenv("S3_SPOOL_DIR", "app/local/s3_spool")
+S3_SPOOL_MAX_ROWS = int(os.getenv("S3_SPOOL_MAX_ROWS", 50000))
+S3_WRITER_CONCURRENCY = int(os.getenv("S3_WRITER_CONCURRENCY", 8))
+S3_WRITER_MAX_ATTEMPTS = int(os.getenv("S3_WRITER_MAX_ATTEMPTS", 10))
+S3_WRITER_BACKOFF = float(os.getenv("S3_WRITER_BACKOFF", 1.0))
+S3_WRITER_MAX_BACKOFF = float(os.getenv("S3_WRITER_MAX_BACKOFF", 300))
+S3_WRITER_LEASE = float(os.getenv("S3_WRITER_LEASE", 120))
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS s3_spool (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        body BLOB,
+        content_type TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt REAL NOT NULL,
+        last_error TEXT,
+        dead INTEGER NOT NULL DEFAULT 0,
+        lease_until REAL NOT NULL DEFAULT 0,
+        lease_owner TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_s3_spool_due ON s3_spool (dead, next_attempt)",
+)
+# Added after the first release; spools created before then get them on open
+LEASE_COLUMNS = (
+    ("lease_until", "REAL NOT NULL DEFAULT 0"),
+    ("lease_owner", "TEXT"),
+)
+
+# (client, bucket, row) -> None; raising schedules a retry
+Handler = Callable[[Any, str, Dict[str, Any]], None]
+
+
+def _put_object(client, bucket: str, row: Dict[str, Any]):
+    client.put_object(
+        Bucket=bucket,
+        Key=row["key"],
+        Body=row["body"],
+        ContentType=row["content_type"] or "application/octet-stream"
+    )
+
+
+class S3Writer:
+    def __init__(self, path: str = S3_SPOOL_PATH, spool_dir: str = S3_SPOOL_DIR,
+                 concurrency: int = S3_WRITER_CONCURRENCY, max_attempts: int = S3_WRITER_MAX_ATTEMPTS,
+                 max_rows: int = S3_SPOOL_MAX_ROWS, client_factory: Callable[[], tuple] = None,
+                 lease_seconds: float = S3_WRITER_LEASE):
+        self.path = path
+        self.spool_dir = spool_dir
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.max_rows = max_rows
+        self.lease_seconds = lease_seconds
+        self._token = uuid4().hex[:8]
+        self._leases_renewed = 0.0
+        self.disabled = os.getenv("DISABLE_S3", "false").lower() == "true"
+        self.handlers: Dict[str, Handler] = {"object": _put_object, "file": self._upload_file}
+        self._listeners: Dict[str, Any] = {}  # S3 key -> listener, this process only
+        self._client_factory = client_factory
+        self._client = None  # (client, bucket), shared by all upload threads
+        self._client_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._pending = 0  # live (not dead) rows in the spool, re-counted every dispatch
+        self._in_flight: Set[int] = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._drain_deadline = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.uploaded = Counter()
+        self.retried = Counter()
+        self.dropped = Counter()
+        self.dead = Counter()
+
+    @property
+    def owner(self) -> str:
+        """Lease owner id; includes the pid so forked workers never share one."""
+        return f"{os.getpid()}-{self._token}"
+
+    def register_handler(self, kind: str, handler: Handler):
+        self.handlers[kind] = handler
+
+    # Spool
+
+    def _connection(self) -> sqlite3.Connection:
+        # Callers hold _db_lock
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(s3_spool)")}
+            for name, definition in LEASE_COLUMNS:
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE s3_spool ADD COLUMN {name} {definition}")
+            self._pending = conn.execute("SELECT COUNT(*) FROM s3_spool WHERE dead = 0").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def enqueue(self, kind: str, key: str, body: bytes, content_type: str = None) -> bool:
+        """Spool one upload. Returns False if S3 is disabled or the spool is full."""
+        if kind not in self.handlers:
+            raise ValueError(f"No S3 writer handler for kind '{kind}'")
+        if self.disabled:
+            return False
+        with self._db_lock:
+            conn = self._connection()
+            if self._pending >= self.max_rows:
+                self.dropped[kind] += 1
+                logger.warning(f"S3 spool full ({self._pending} entries); dropped upload of {key}")
+                return False
+            conn.execute(
+                "INSERT INTO s3_spool (kind, key, body, content_type, next_attempt) VALUES (?, ?, ?, ?, ?)",
+                (kind, key, body, content_type, time.time())
+            )
+            self._pending += 1
+        if self._thread is None:
+            self.start()
+        self._wake.set()
+        return True
+
+    def put_json(self, key: str, data: Any) -> bool:
+        # Compact: nobody reads these by eye, and indenting roughly doubles message objects
+        body = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+        return self.enqueue("object", key, body, "application/json")
+
+    def put_file(self, key: str, local_path: str, listener=None) -> bool:
+        """Spool a copy of ``local_path``; the caller may delete its file right away.
+
+        ``listener`` (optional) gets on_bytes(n) as parts are sent, then on_stored() or on_failed(error).
+        """
+        if self.disabled:
+            return False
+        os.makedirs(self.spool_dir, exist_ok=True)
+        spooled = os.path.join(self.spool_dir, uuid4().hex)
+        try:
+            os.link(local_path, spooled)  # same filesystem: no copy needed
+        except OSError:
+            shutil.copyfile(local_path, spooled)
+        if listener is not None:
+            self._listeners[key] = listener
+        if not self.enqueue("file", key, os.path.abspath(spooled).encode()):
+            self._listeners.pop(key, None)
+            os.remove(spooled)
+            return False
+        return True
+
+    def _upload_file(self, client, bucket: str, row: Dict[str, Any]):
+        from ..rag_engine.aws.s3_client import transfer_config
+        path = row["body"].decode()
+        listener = self._listeners.get(row["key"])
+        # A missing file was already uploaded: it is only removed after success,
+        # so the process died before the row was deleted
+        if os.path.exists(path):
+            client.upload_file(path, bucket, row["key"], Config=transfer_config(),
+                               Callback=listener.on_bytes if listener is not None else None)
+            os.remove(path)
+        self._listeners.pop(row["key"], None)
+        if listener is not None:
+            listener.on_stored()
+
+    def _due(self, limit: int) -> List[Dict[str, Any]]:
+        """Claim up to ``limit`` due rows that no writer holds a lease on."""
+        now = time.time()
+        with self._db_lock:
+            conn = self._connection()
+            # Other processes insert and delete too; keep the bound honest
+            self._pending = conn.execute("SELECT COUNT(*) FROM s3_spool WHERE dead = 0").fetchone()[0]
+            if limit <= 0:
+                return []
+            cursor = conn.execute(
+                "SELECT id, kind, key, body, content_type, attempts FROM s3_spool "
+                "WHERE dead = 0 AND next_attempt <= ? AND lease_until < ? ORDER BY next_attempt LIMIT ?",
+                (now, now, limit)
+            )
+            columns = [c[0] for c in cursor.description]
+            rows = [dict(zip(columns, values)) for values in cursor.fetchall()]
+            claimed = []
+            for row in rows:
+                # Loses to a writer that claimed the row since the SELECT
+                taken = conn.execute(
+                    "UPDATE s3_spool SET lease_until = ?, lease_owner = ? "
+                    "WHERE id = ? AND dead = 0 AND lease_until < ?",
+                    (now + self.lease_seconds, self.owner, row["id"], now)
+                ).rowcount
+                if taken:
+                    claimed.append(row)
+        return claimed
+
+    def _renew_leases(self):
+        with self._lock:
+            ids = list(self._in_flight)
+        now = time.time()
+        if not ids or now - self._leases_renewed < self.lease_seconds / 3:
+            return
+        with self._db_lock:
+            self._connection().execute(
+                f"UPDATE s3_spool SET lease_until = ? WHERE lease_owner = ? AND id IN ({','.join('?' * len(ids))})",
+                (now + self.lease_seconds, self.owner, *ids)
+            )
+        self._leases_renewed = now
+
+    def _next_due_in(self) -> float:
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT MIN(MAX(next_attempt, lease_until)) FROM s3_spool WHERE dead = 0"
+            ).fetchone()
+        if row[0] is None:
+            return 60.0
+        return min(60.0, max(0.05, row[0] - time.time()))
+
+    # Uploads
+
+    def get_client(self):
+        """The shared (client, bucket) pair, built on first use."""
+        with self._client_lock:
+            if self._client is None:
+                if self._client_factory is not None:
+                    self._client = self._client_factory()
+                else:
+                    from ..rag_engine.aws.s3_utils import S3Utils
+                    utils = S3Utils()
+                    self._client = (utils.s3_client, utils.bucket)
+            return self._client
+
+    def _upload(self, row: Dict[str, Any]):
+        try:
+            client, bucket = self.get_client()
+            self.handlers[row["kind"]](client, bucket, row)
+        except Exception as e:
+            self._failed(row, e)
+        else:
+            with self._db_lock:
+                deleted = self._connection().execute(
+                    "DELETE FROM s3_spool WHERE id = ? AND lease_owner = ?", (row["id"], self.owner)
+                ).rowcount
+                self._pending -= deleted
+            self.uploaded[row["kind"]] += 1
+        finally:
+            with self._lock:
+                self._in_flight.discard(row["id"])
+            self._wake.set()
+
+    def _failed(self, row: Dict[str, Any], error: Exception):
+        attempts = row["attempts"] + 1
+        with self._db_lock:
+            conn = self._connection()
+            if attempts >= self.max_attempts:
+                self._pending -= conn.execute(
+                    "UPDATE s3_spool SET attempts = ?, last_error = ?, dead = 1, lease_until = 0, lease_owner = NULL "
+                    "WHERE id = ? AND lease_owner = ?",
+                    (attempts, str(error), row["id"], self.owner)
+                ).rowcount
+            else:
+                delay = min(S3_WRITER_MAX_BACKOFF, S3_WRITER_BACKOFF * 2 ** (attempts - 1))
+                conn.execute(
+                    "UPDATE s3_spool SET attempts = ?, last_error = ?, next_attempt = ?, lease_until = 0, "
+                    "lease_owner = NULL WHERE id = ? AND lease_owner = ?",
+                    (attempts, str(error), time.time() + delay * random.uniform(0.5, 1.0), row["id"], self.owner)
+                )
+        if attempts >= self.max_attempts:
+            listener = self._listeners.pop(row["key"], None)
+            if listener is not None and row["kind"] == "file":
+                listener.on_failed(error)
+            self.dead[row["kind"]] += 1
+            logger.error(f"S3 upload of {row['key']} failed {attempts} times, giving up: {error}")
+        else:
+            self.retried[row["kind"]] += 1
+            logger.warning(f"S3 upload of {row['key']} failed (attempt {attempts}), will retry: {error}")
+
+    def _run(self):
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="s3-writer")
+        try:
+            while True:
+                with self._lock:
+                    slots = self.concurrency - len(self._in_flight)
+                rows = self._due(slots)
+                self._renew_leases()
+                for row in rows:
+                    with self._lock:
+                        self._in_flight.add(row["id"])
+                    pool.submit(self._upload, row)
+                if self._stop.is_set():
+                    with self._lock:
+                        idle = not self._in_flight
+                    if (idle and not rows) or time.monotonic() > self._drain_deadline:
+                        break
+                    self._wake.wait(0.1)
+                else:
+                    self._wake.wait(self._next_due_in() if not rows else 0.1)
+                self._wake.clear()
+        except Exception as e:
+            logger.error(f"S3 writer stopped: {e}")
+        finally:
+            # Anything still uploading or waiting on backoff stays spooled for the next start
+            pool.shutdown(wait=False)
+
+    def start(self):
+        if self.disabled:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="s3-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Upload whatever is due, for up to ``timeout`` seconds, and stop."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._drain_deadline = time.monotonic() + timeout
+        self._stop.set()
+        self._wake.set()
+        thread.join(timeout + 1)
+        if self._pending:
+            logger.info(f"S3 writer stopped with {self._pending} uploads spooled for the next start")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._db_lock:
+            dead_rows = self._connection().execute("SELECT COUNT(*) FROM s3_spool WHERE dead = 1").fetchone()[0]
+        return {
+            "pending": self._pending,
+            "in_flight": len(self._in_flight),
+            "dead_in_spool": dead_rows,
+            "uploaded": dict(self.uploaded),
+            "retried": dict(self.retried),
+            "dropped": dict(self.dropped),
+            "dead": dict(self.dead),
+            "running": self._thread is not None and self._thread.is_alive(),
+            "disabled": self.disabled
+        }
+
+
+s3_writer = S3Writer()
@@ -0,0 +1,128 @@
+"""
+Token Validator for RAGBot
+Location: app/services/token_validator.py
+
+Validates a bearer token once per request. A token is accepted when its JWT
+signature and expiry check out and the auth store's token_cache table
+still marks it valid (logout revokes it there).
+
+Lookups go through a bounded in-memory TTL cache holding both outcomes.
+A cache hit skips the JWT decode and the SQLite query, so it costs a dict
+lookup. Revocations made by this process take effect at once. Revocations
+made by another worker process are picked up within AUTH_CACHE_TTL seconds.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import jwt
+from dotenv import load_dotenv
+from jwt import ExpiredSignatureError, InvalidTokenError
+
+from ..utils.logger import get_logger
+from ..utils.metrics import record_cache
+from .auth_store import AuthStore, auth_store
+
+load_dotenv()
+logger = get_logger()
+
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "fallback-secret-key")
+JWT_ALGORITHM = "HS256"
+
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 30))
+AUTH_NEGATIVE_TTL = float(os.getenv("AUTH_NEGATIVE_TTL", 30))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+
+
+class InvalidToken(Exception):
+    """Raised with the reason a token was rejected (shown as the 401 detail)."""
+
+
+class TokenValidator:
+    def __init__(self, store: AuthStore = None, secret: str = JWT_SECRET_KEY, ttl: float = AUTH_CACHE_TTL,
+                 negative_ttl: float = AUTH_NEGATIVE_TTL, max_entries: int = AUTH_CACHE_SIZE):
+        self.store = store or auth_store
+        self.secret = secret
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        # token -> (principal or None if revoked/unknown, cached_until)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_get(self, token: str):
+        with self._lock:
+            entry = self._cache.get(token)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._cache[token]
+                return None
+            self._cache.move_to_end(token)
+            return entry
+
+    def _cache_put(self, token: str, principal: Optional[Dict[str, Any]], ttl: float):
+        with self._lock:
+            self._cache[token] = (principal, time.monotonic() + ttl)
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def validate(self, token: str) -> Dict[str, Any]:
+        """Return the principal for ``token`` or raise InvalidToken."""
+        entry = self._cache_get(token)
+        record_cache("auth_token", entry is not None)
+        if entry is not None:
+            principal = entry[0]
+            if principal is None:
+                raise InvalidToken("Token has been invalidated")
+            if principal["exp"] <= time.time():
+                raise InvalidToken("Token expired")
+            return principal
+
+        try:
+            payload = jwt.decode(token, self.secret, algorithms=[JWT_ALGORITHM])
+        except ExpiredSignatureError:
+            raise InvalidToken("Token expired")
+        except InvalidTokenError:
+            # Not cached: forged tokens would only churn the cache
+            raise InvalidToken("Invalid token")
+
+        if not self.store.is_token_valid(token):
+            self._cache_put(token, None, self.negative_ttl)
+            raise InvalidToken("Token has been invalidated")
+
+        principal = {
+            "user_id": payload["user_id"],
+            "email": payload["email"],
+            "name": payload.get("name"),
+            "role": payload.get("role", "user"),
+            "exp": payload["exp"]
+        }
+        # Never cache past the token's own expiry
+        self._cache_put(token, principal, max(0.0, min(self.ttl, payload["exp"] - time.time())))
+        return principal
+
+    def register(self, token: str, user_id: str, expires_at: datetime):
+        self.store.store_token(token, user_id, expires_at)
+
+    def revoke(self, token: str) -> bool:
+        self._cache_put(token, None, self.negative_ttl)
+        try:
+            self.store.revoke_token(token)
+            return True
+        except Exception as e:
+            logger.error(f"Token invalidation failed: {str(e)}")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._cache)
+        return {"entries": entries, "max_entries": self.max_entries, "ttl": self.ttl, "negative_ttl": self.negative_ttl}
+
+
+token_validator = TokenValidator()
@@ -0,0 +1,100 @@
+"""
+Upload Progress for RAGBot
+Location: app/services/upload_progress.py
+
+In-memory status of document uploads, polled at GET /api/v1/chat/uploads/{upload_id}.
+An upload goes receiving -> ingesting -> indexed (or failed). Its copy to S3
+runs on the background S3 writer and is tracked separately: s3_status goes
+queued -> uploading -> stored (or failed, or skipped when S3 is disabled), and
+s3_bytes counts the bytes sent.
+
+Entries live in this process only and expire UPLOAD_PROGRESS_TTL seconds
+after their last update.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+UPLOAD_PROGRESS_TTL = float(os.getenv("UPLOAD_PROGRESS_TTL", 3600))
+
+
+class _S3Listener:
+    """Receives S3 writer callbacks for one upload."""
+
+    def __init__(self, progress: "UploadProgress", upload_id: str):
+        self.progress = progress
+        self.upload_id = upload_id
+
+    def on_bytes(self, n: int):
+        self.progress.add_bytes(self.upload_id, "s3_bytes", n, s3_status="uploading")
+
+    def on_stored(self):
+        self.progress.update(self.upload_id, s3_status="stored")
+
+    def on_failed(self, error: Exception):
+        self.progress.update(self.upload_id, s3_status="failed", s3_error=str(error))
+
+
+class UploadProgress:
+    def __init__(self, ttl: float = UPLOAD_PROGRESS_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        stale = [upload_id for upload_id, entry in self._entries.items() if now - entry["updated_at"] > self.ttl]
+        for upload_id in stale:
+            del self._entries[upload_id]
+
+    def begin(self, upload_id: str, user_id: str, filename: str, size: Optional[int] = None):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            self._entries[upload_id] = {
+                "upload_id": upload_id,
+                "user_id": user_id,
+                "filename": filename,
+                "size": size,
+                "status": "receiving",
+                "received_bytes": 0,
+                "s3_status": "pending",
+                "s3_bytes": 0,
+                "document_id": None,
+                "error": None,
+                "started_at": now,
+                "updated_at": now
+            }
+
+    def update(self, upload_id: str, **fields):
+        with self._lock:
+            entry = self._entries.get(upload_id)
+            if entry is not None:
+                entry.update(fields, updated_at=time.time())
+
+    def add_bytes(self, upload_id: str, field: str, n: int, **fields):
+        with self._lock:
+            entry = self._entries.get(upload_id)
+            if entry is not None:
+                entry[field] += n
+                if entry["size"]:
+                    # A retried S3 transfer reports its bytes again
+                    entry[field] = min(entry[field], entry["size"])
+                entry.update(fields, updated_at=time.time())
+
+    def s3_listener(self, upload_id: str) -> _S3Listener:
+        return _S3Listener(self, upload_id)
+
+    def get(self, upload_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """The upload's status, or None if unknown, expired or owned by someone else."""
+        with self._lock:
+            entry = self._entries.get(upload_id)
+            if entry is None or entry["user_id"] != user_id:
+                return None
+            status = {key: value for key, value in entry.items() if key != "user_id"}
+        status["elapsed_seconds"] = round(status["updated_at"] - status["started_at"], 3)
+        return status
+
+
+upload_progress = UploadProgress()
@@ -5,10 +5,10 @@ Location: app/services/user_service.py
 Handles user profile management, usage statistics, activity tracking, and preferences.
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time as dt_time
 from typing import Dict, List, Any, Optional
 from uuid import UUID
-from sqlalchemy import func, desc
+from sqlalchemy import case, func, desc
 from collections import Counter
 import re
 
@@ -20,6 +20,44 @@ from ..utils.logger import get_logger
 
 logger = get_logger()
 
+# Rollup columns that increment_usage accepts as keyword deltas
+USAGE_COUNTERS = (
+    "token_usage", "message_count", "cost", "user_message_count", "assistant_message_count",
+    "response_time_total", "response_time_count", "conversation_count", "query_count"
+)
+
+
+def usage_day(moment: datetime = None) -> datetime:
+    """Bucket key for UsageStat.date: midnight of the UTC day."""
+    return datetime.combine((moment or datetime.utcnow()).date(), dt_time.min)
+
+
+def increment_usage(db, user_id: UUID, day: datetime = None, **deltas):
+    """Add ``deltas`` to the user's rollup row for ``day`` with a single upsert.
+
+    Runs in the caller's transaction and does not commit, so it can ride along
+    with the write it accounts for.
+    """
+    unknown = set(deltas) - set(USAGE_COUNTERS)
+    if unknown:
+        raise ValueError(f"Unknown usage counters: {sorted(unknown)}")
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    values = {name: deltas.get(name, 0) for name in USAGE_COUNTERS}
+    stmt = insert(UsageStat).values(user_id=user_id, date=usage_day(day), **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UsageStat.user_id, UsageStat.date],
+        set_={
+            name: func.coalesce(getattr(UsageStat, name), 0) + getattr(stmt.excluded, name)
+            for name in deltas
+        }
+    )
+    db.execute(stmt)
+
+
 class UserService:
     def __init__(self, db):
         self.db = db
@@ -81,44 +119,52 @@ class UserService:
             return {}
 
     def get_usage_statistics(self, user_id: UUID) -> Dict[str, Any]:
+        """Today/week/month/total from the UsageStat rollups in one conditional-aggregation query."""
         try:
-            today = datetime.utcnow().date()
-            return {
-                "today": self._get_usage_stats_for_period(user_id, today, today),
-                "week": self._get_usage_stats_for_period(user_id, today - timedelta(days=7), today),
-                "month": self._get_usage_stats_for_period(user_id, today - timedelta(days=30), today),
-                "total": self._get_usage_stats_for_period(user_id, None, None)
+            today = usage_day()
+            periods = {
+                "today": today,
+                "week": today - timedelta(days=7),
+                "month": today - timedelta(days=30),
+                "total": None
+            }
+            metrics = {
+                "user_messages": UsageStat.user_message_count,
+                "assistant_messages": UsageStat.assistant_message_count,
+                "response_time_total": UsageStat.response_time_total,
+                "response_time_count": UsageStat.response_time_count,
+                "conversations": UsageStat.conversation_count,
+                "total_tokens": UsageStat.token_usage
             }
-        except Exception as e:
-            logger.error(f"Get usage statistics error: {str(e)}")
-            return {}
-
-    def _get_usage_stats_for_period(self, user_id: UUID, start_date, end_date) -> Dict[str, Any]:
-        try:
-            conv_query = self.db.query(Conversation).filter(Conversation.user_id == user_id, Conversation.is_deleted == False)
-            msg_query = self.db.query(Message).join(Conversation).filter(Conversation.user_id == user_id)
-
-            if start_date and end_date:
-                conv_query = conv_query.filter(func.date(Conversation.created_at).between(start_date, end_date))
-                msg_query = msg_query.filter(func.date(Message.timestamp).between(start_date, end_date))
 
-            user_msgs = msg_query.filter(Message.role == "user").count()
-            assistant_msgs = msg_query.filter(Message.role == "assistant").count()
-            avg_response = msg_query.filter(Message.role == "assistant", Message.response_time.isnot(None)).with_entities(func.avg(Message.response_time)).scalar() or 0.0
-            token_sum = msg_query.filter(Message.token_count.isnot(None)).with_entities(func.sum(Message.token_count)).scalar() or 0
+            columns = []
+            for period, since in periods.items():
+                for metric, column in metrics.items():
+                    value = func.coalesce(column, 0)
+                    if since is not None:
+                        value = case((UsageStat.date >= since, value), else_=0)
+                    columns.append(func.coalesce(func.sum(value), 0).label(f"{period}__{metric}"))
 
-            return {
-                "conversations": conv_query.count(),
-                "user_messages": user_msgs,
-                "assistant_messages": assistant_msgs,
-                "total_messages": user_msgs + assistant_msgs,
-                "avg_response_time": round(avg_response, 2),
-                "total_tokens": token_sum
-            }
+            row = self.db.query(*columns).filter(UsageStat.user_id == user_id).one()._mapping
+            return {period: self._usage_period(row, period) for period in periods}
         except Exception as e:
-            logger.error(f"Get period stats error: {str(e)}")
+            logger.error(f"Get usage statistics error: {str(e)}")
             return {}
 
+    @staticmethod
+    def _usage_period(row, period: str) -> Dict[str, Any]:
+        get = lambda metric: row[f"{period}__{metric}"]
+        user_msgs, assistant_msgs = int(get("user_messages")), int(get("assistant_messages"))
+        response_count = get("response_time_count")
+        return {
+            "conversations": int(get("conversations")),
+            "user_messages": user_msgs,
+            "assistant_messages": assistant_msgs,
+            "total_messages": user_msgs + assistant_msgs,
+            "avg_response_time": round(get("response_time_total") / response_count, 2) if response_count else 0.0,
+            "total_tokens": int(get("total_tokens"))
+        }
+
     def get_user_activity(self, user_id: UUID) -> Dict[str, Any]:
         try:
             stats = self._aggregate_user_stats(user_id)
@@ -171,23 +217,14 @@ class UserService:
         except Exception as e:
             logger.error(f"Update usage metrics error: {str(e)}")
 
-    def record_daily_usage(self, user_id: UUID, token_usage: int = 0, message_count: int = 0, cost: float = 0.0):
+    def record_daily_usage(self, user_id: UUID, token_usage: int = 0, message_count: int = 0, cost: float = 0.0,
+                           commit: bool = True):
         try:
-            today = datetime.utcnow().date()
-            usage_stat = self.db.query(UsageStat).filter(
-                UsageStat.user_id == user_id,
-                func.date(UsageStat.date) == today
-            ).first()
-
-            if not usage_stat:
-                usage_stat = UsageStat(user_id=user_id, date=datetime.utcnow(), token_usage=0, message_count=0, cost=0.0)
-                self.db.add(usage_stat)
-
-            usage_stat.token_usage += token_usage
-            usage_stat.message_count += message_count
-            usage_stat.cost += cost
-            self.db.commit()
+            increment_usage(self.db, user_id, token_usage=token_usage, message_count=message_count, cost=cost)
+            if commit:
+                self.db.commit()
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Record daily usage error: {str(e)}")
 
     def get_user_feedback_summary(self, user_id: UUID) -> Dict[str, Any]:
@@ -0,0 +1,317 @@
+# app/utils/eval_store.py
+"""
+Append-only store for RAG evaluation logs.
+
+Entries are JSON lines appended to ``current.jsonl``; appending never reads or
+rewrites earlier entries, so the cost per answer stays constant. The active
+segment is rotated when it exceeds EVAL_LOG_MAX_BYTES or is older than
+EVAL_LOG_MAX_AGE seconds, and rotated segments are gzipped on a background
+thread unless EVAL_LOG_COMPRESS=false, so the request that triggers a
+rotation only pays for a rename. Readers stream segments in order and never load the
+whole history. An exclusive file lock (where fcntl is available) serialises
+appends and rotation across worker processes.
+
+The old ``app/utils/eval_logs.json`` array is imported as the oldest segment
+by ``migrate-legacy``; the file itself is left in place.
+
+    python -m app.utils.eval_store migrate-legacy
+    python -m app.utils.eval_store stats
+    python -m app.utils.eval_store tail -n 20
+    python -m app.utils.eval_store query --source web --since 2025-07-01 --contains president
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+EVAL_LOG_DIR = os.getenv("EVAL_LOG_DIR", "app/utils/eval_logs")
+LEGACY_LOG_FILE = "app/utils/eval_logs.json"
+ACTIVE_SEGMENT = "current.jsonl"
+LEGACY_SEGMENT = "eval-00000000T000000000000-legacy.jsonl"
+
+
+class EvalStore:
+    def __init__(self, directory: str = EVAL_LOG_DIR, max_bytes: int = None, max_age: float = None,
+                 compress: bool = None):
+        self.directory = directory
+        self.max_bytes = max_bytes or int(os.getenv("EVAL_LOG_MAX_BYTES", 10 * 1024 * 1024))
+        self.max_age = max_age or float(os.getenv("EVAL_LOG_MAX_AGE", 24 * 3600))
+        self.compress = compress if compress is not None else os.getenv("EVAL_LOG_COMPRESS", "true").lower() == "true"
+        self.active_path = os.path.join(directory, ACTIVE_SEGMENT)
+        self._lock_path = os.path.join(directory, ".lock")
+        self._thread_lock = threading.Lock()
+        # (inode, first-entry epoch) of the active segment, so appends don't re-read it
+        self._active_started = (None, None)
+        self._compressor: Optional[ThreadPoolExecutor] = None
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Writing
+
+    def append(self, entry: Dict[str, Any]):
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._locked():
+            self._rotate_if_needed(len(line))
+            fd = os.open(self.active_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+    def _segment_started(self, stat) -> float:
+        inode, started = self._active_started
+        if inode != stat.st_ino or started is None:
+            started = stat.st_mtime
+            with open(self.active_path, "rb") as f:
+                first = f.readline()
+            try:
+                started = datetime.fromisoformat(json.loads(first)["timestamp"]).timestamp()
+            except (ValueError, KeyError, TypeError):
+                pass
+            self._active_started = (stat.st_ino, started)
+        return started
+
+    def _rotate_if_needed(self, incoming: int):
+        try:
+            stat = os.stat(self.active_path)
+        except FileNotFoundError:
+            return
+        if stat.st_size == 0:
+            return
+        too_big = stat.st_size + incoming > self.max_bytes
+        too_old = time.time() - self._segment_started(stat) > self.max_age
+        if too_big or too_old:
+            self._rotate()
+
+    def rotate(self):
+        with self._locked():
+            if os.path.exists(self.active_path) and os.path.getsize(self.active_path) > 0:
+                self._rotate()
+
+    def _rotate(self):
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        rotated = os.path.join(self.directory, f"eval-{stamp}-{os.getpid()}.jsonl")
+        os.replace(self.active_path, rotated)
+        self._active_started = (None, None)
+        if self.compress:
+            if self._compressor is None:
+                self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="eval-gzip")
+            self._compressor.submit(self._gzip_logged, rotated)
+
+    @staticmethod
+    def _gzip(path: str):
+        with open(path, "rb") as src, gzip.open(path + ".gz.tmp", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(path + ".gz.tmp", path + ".gz")
+        os.remove(path)
+
+    @classmethod
+    def _gzip_logged(cls, path: str):
+        try:
+            cls._gzip(path)
+        except Exception as e:
+            # The segment stays readable uncompressed; `compress` retries it
+            logger.warning(f"Failed to compress {path}: {e}")
+
+    def compress_pending(self) -> int:
+        """Gzip rotated segments left uncompressed (e.g. by a process that exited mid-compression)."""
+        pending = [p for p in self.segments() if p.endswith(".jsonl") and p != self.active_path]
+        for path in pending:
+            self._gzip(path)
+        return len(pending)
+
+    def flush(self):
+        """Wait for background compression to finish."""
+        if self._compressor is not None:
+            self._compressor.shutdown(wait=True)
+            self._compressor = None
+
+    def migrate_legacy(self, legacy_file: str = LEGACY_LOG_FILE) -> int:
+        """Import the old JSON-array log as the oldest segment. Returns the entries imported (0 if already done)."""
+        segment = os.path.join(self.directory, LEGACY_SEGMENT)
+        with self._locked():
+            if os.path.exists(segment) or os.path.exists(segment + ".gz"):
+                return 0
+            with open(legacy_file, encoding="utf-8") as f:
+                try:
+                    entries = json.load(f)
+                except json.JSONDecodeError:
+                    entries = []
+            with open(segment + ".tmp", "w", encoding="utf-8") as out:
+                for entry in entries:
+                    out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(segment + ".tmp", segment)
+            if self.compress:
+                self._gzip(segment)
+        return len(entries)
+
+    # Reading
+
+    def segments(self) -> List[str]:
+        """Segment paths, oldest first; the active segment is last."""
+        names = set(os.listdir(self.directory))
+        rotated = sorted(
+            name for name in names
+            if name.startswith("eval-") and (name.endswith(".jsonl") or name.endswith(".jsonl.gz"))
+            # Mid-compression both copies exist briefly; read the finished one
+            and not (name.endswith(".jsonl") and name + ".gz" in names)
+        )
+        paths = [os.path.join(self.directory, name) for name in rotated]
+        if os.path.exists(self.active_path):
+            paths.append(self.active_path)
+        return paths
+
+    @staticmethod
+    def _read_segment(path: str) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(path) and os.path.exists(path + ".gz"):
+            path += ".gz"  # compressed since it was listed
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn line from a crashed writer
+
+    def iter_entries(self, since: datetime = None, until: datetime = None, source: str = None,
+                     contains: str = None) -> Iterator[Dict[str, Any]]:
+        needle = contains.lower() if contains else None
+        for path in self.segments():
+            for entry in self._read_segment(path):
+                if since or until:
+                    try:
+                        ts = datetime.fromisoformat(entry.get("timestamp", ""))
+                    except ValueError:
+                        continue
+                    if (since and ts < since) or (until and ts > until):
+                        continue
+                if source and entry.get("source") != source:
+                    continue
+                if needle and needle not in (entry.get("question", "") + " " + entry.get("answer", "")).lower():
+                    continue
+                yield entry
+
+    def tail(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Last ``n`` entries, oldest first, reading only the newest segments needed."""
+        collected: deque = deque()
+        for path in reversed(self.segments()):
+            segment = deque(self._read_segment(path), maxlen=n - len(collected))
+            collected.extendleft(reversed(segment))
+            if len(collected) >= n:
+                break
+        return list(collected)
+
+    def count(self) -> int:
+        return sum(1 for path in self.segments() for _ in self._read_segment(path))
+
+    def stats(self) -> Dict[str, Any]:
+        segments = self.segments()
+        return {
+            "directory": self.directory,
+            "segments": len(segments),
+            "bytes_on_disk": sum(os.path.getsize(p) for p in segments),
+            "active_bytes": os.path.getsize(self.active_path) if os.path.exists(self.active_path) else 0,
+            "entries": self.count()
+        }
+
+
+_store: Optional[EvalStore] = None
+_store_lock = threading.Lock()
+
+
+def get_eval_store() -> EvalStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EvalStore()
+    return _store
+
+
+def _print_entry(entry: Dict[str, Any], as_json: bool):
+    if as_json:
+        print(json.dumps(entry, ensure_ascii=False))
+        return
+    print(f"[{entry.get('timestamp', '?')}] ({entry.get('source', '?')}) Q: {entry.get('question', '')}")
+    print(f"    A: {str(entry.get('answer', ''))[:300]}")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Inspect RAGBot evaluation logs")
+    parser.add_argument("--dir", default=EVAL_LOG_DIR, help="Eval log directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("stats", help="Segment and entry counts")
+    tail = sub.add_parser("tail", help="Show the most recent entries")
+    tail.add_argument("-n", type=int, default=10)
+    tail.add_argument("--json", action="store_true")
+    query = sub.add_parser("query", help="Stream entries matching filters")
+    query.add_argument("--since", type=datetime.fromisoformat)
+    query.add_argument("--until", type=datetime.fromisoformat)
+    query.add_argument("--source", help="local, web, hybrid, ...")
+    query.add_argument("--contains", help="Case-insensitive text in question or answer")
+    query.add_argument("--limit", type=int, default=0)
+    query.add_argument("--json", action="store_true")
+    sub.add_parser("rotate", help="Close the active segment now")
+    sub.add_parser("compress", help="Gzip rotated segments left uncompressed")
+    migrate = sub.add_parser("migrate-legacy", help="Import the old eval_logs.json array as the oldest segment")
+    migrate.add_argument("--file", default=LEGACY_LOG_FILE)
+
+    args = parser.parse_args(argv)
+    store = EvalStore(directory=args.dir)
+
+    if args.command == "stats":
+        print(json.dumps(store.stats(), indent=2))
+    elif args.command == "tail":
+        for entry in store.tail(args.n):
+            _print_entry(entry, args.json)
+    elif args.command == "query":
+        shown = 0
+        for entry in store.iter_entries(args.since, args.until, args.source, args.contains):
+            _print_entry(entry, args.json)
+            shown += 1
+            if args.limit and shown >= args.limit:
+                break
+    elif args.command == "rotate":
+        store.rotate()
+        store.flush()
+    elif args.command == "compress":
+        print(f"Compressed {store.compress_pending()} segments")
+    elif args.command == "migrate-legacy":
+        print(f"Imported {store.migrate_legacy(args.file)} entries from {args.file}")
+
+
+if __name__ == "__main__":
+    main()
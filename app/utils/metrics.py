@@ -0,0 +1,228 @@
+# app/utils/metrics.py
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+prometheus_client is not a dependency, and the subset needed here (counters,
+gauges, fixed-bucket histograms, scrape-time collectors) is small. Recording
+a sample costs a dict lookup for the label set and one uncontended lock
+acquire on that label set's own lock; there is no global lock on the hot
+path. Rendering happens only when /metrics is scraped.
+"""
+
+import abc
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from .tracing import register_exporter
+
+# Seconds; spans sub-millisecond vector lookups up to slow LLM generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 160, 320)
+
+_registry: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """A fresh value holder for one label combination."""
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield dict(zip(self.labelnames, key)), child
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, child in self._samples():
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(child.value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, child in self._samples():
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_labels = {**labels, "le": _format_value(bound) if math.isinf(bound) else repr(bound)}
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]):
+    """Add a scrape-time source of ``(name, kind, help, labels, value)`` samples,
+    for values that are cheaper to read when scraped than to track (pool usage, queue sizes)."""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def render_latest() -> str:
+    lines: List[str] = []
+    for metric in list(_registry):
+        lines.extend(metric.render())
+
+    declared = set()
+    for collector in list(_collectors):
+        try:
+            samples = list(collector())
+        except Exception as e:
+            lines.append(f"# collector {getattr(collector, '__name__', collector)} failed: {e}")
+            continue
+        for name, kind, documentation, labels, value in samples:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+HTTP_REQUESTS = Counter("ragbot_http_requests_total", "HTTP requests by route template and status",
+                        ("method", "route", "status"))
+HTTP_LATENCY = Histogram("ragbot_http_request_duration_seconds", "HTTP request latency by route template and status",
+                         ("method", "route", "status"))
+HTTP_IN_FLIGHT = Gauge("ragbot_http_requests_in_flight", "HTTP requests currently being served")
+
+# RAG pipeline
+STAGE_LATENCY = Histogram("ragbot_stage_duration_seconds", "Per-stage duration of traced operations",
+                          ("trace", "stage"))
+EMBEDDING_BATCH_SIZE = Histogram("ragbot_embedding_batch_size", "Texts embedded per model call", ("kind",),
+                                 buckets=SIZE_BUCKETS)
+CHROMA_QUERY_LATENCY = Histogram("ragbot_chroma_query_duration_seconds", "Chroma chunk query latency")
+LLM_IN_FLIGHT = Gauge("ragbot_llm_requests_in_flight", "LLM generations started and not yet finished (queued or running)")
+LLM_TOKENS_PER_SECOND = Histogram("ragbot_llm_output_tokens_per_second", "Approximate LLM output rate",
+                                  buckets=RATE_BUCKETS)
+
+# Caches: hit ratio = rate(result="hit") / rate(all)
+CACHE_LOOKUPS = Counter("ragbot_cache_lookups_total", "Cache lookups by cache and result", ("cache", "result"))
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def _observe_trace(name: str, timings: Dict[str, float]):
+    for stage, ms in timings.items():
+        STAGE_LATENCY.labels(name, stage).observe(ms / 1000)
+
+
+register_exporter(_observe_trace)
@@ -0,0 +1,172 @@
+# app/utils/tracing.py
+"""
+Per-stage latency tracing.
+
+A trace is opened around a unit of work (one chat turn) and held in a
+context variable, so code further down the stack, including worker threads
+started with asyncio.to_thread, can record spans without it being passed
+around. Spans with the same name accumulate, e.g. every SQL statement of a
+turn adds to "db". Outside a trace ``span`` does nothing but a context
+variable lookup.
+
+When a trace finishes, its stage durations are handed to every registered
+exporter. The built-in ``stage_stats`` exporter keeps a bounded sample per
+stage for percentile reporting.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+from .logger import get_logger
+
+logger = get_logger()
+
+SERVER_TIMING_ENABLED = os.getenv("TRACE_SERVER_TIMING", "false").lower() == "true"
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("ragbot_trace", default=None)
+_exporters: List[Callable[[str, Dict[str, float]], None]] = []
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = defaultdict(float)  # stage -> milliseconds
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, elapsed_ms: float):
+        with self._lock:
+            # Background work that outlives the request (e.g. S3 archiving) is not attributed to it
+            if not self.finished:
+                self.stages[stage] += elapsed_ms
+
+    def timings(self) -> Dict[str, float]:
+        with self._lock:
+            return {stage: round(ms, 2) for stage, ms in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """Render as a Server-Timing header value (shown in browser dev tools)."""
+        return ", ".join(f"{stage.replace('.', '_')};dur={ms}" for stage, ms in self.timings().items())
+
+
+@contextmanager
+def trace(name: str):
+    """Open a trace for the current context; exported when the block exits."""
+    current = Trace(name)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+        current.add("total", (time.perf_counter() - current.started) * 1000)
+        with current._lock:
+            current.finished = True
+        export(current)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def span(stage: str):
+    current = _current.get()
+    if current is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.add(stage, (time.perf_counter() - start) * 1000)
+
+
+def traced(stage: str):
+    """Decorator form of ``span`` for synchronous functions."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_engine(engine, stage: str = "db"):
+    """Time every SQL statement run on ``engine`` (sync or async) under ``stage``."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("trace_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("trace_query_start")
+        if not starts:
+            return
+        start = starts.pop()
+        current = _current.get()
+        if current is not None:
+            current.add(stage, (time.perf_counter() - start) * 1000)
+
+
+def register_exporter(exporter: Callable[[str, Dict[str, float]], None]):
+    """``exporter(trace_name, {stage: ms})`` is called for every finished trace."""
+    if exporter not in _exporters:
+        _exporters.append(exporter)
+
+
+def export(finished: Trace):
+    timings = finished.timings()
+    for exporter in list(_exporters):
+        try:
+            exporter(finished.name, timings)
+        except Exception as e:
+            logger.warning(f"Trace exporter {getattr(exporter, '__name__', exporter)} failed: {e}")
+
+
+class StageStats:
+    """Keeps the last ``window`` durations per (trace, stage) for percentile queries."""
+
+    def __init__(self, window: int = None):
+        self.window = window or int(os.getenv("TRACE_STATS_WINDOW", 1000))
+        self._samples: Dict[str, Dict[str, deque]] = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def __call__(self, name: str, timings: Dict[str, float]):
+        with self._lock:
+            stages = self._samples[name]
+            for stage, ms in timings.items():
+                stages.setdefault(stage, deque(maxlen=self.window)).append(ms)
+
+    @staticmethod
+    def _percentile(ordered: List[float], q: float) -> float:
+        index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+        return ordered[index]
+
+    def percentiles(self, quantiles=(0.5, 0.9, 0.99)) -> Dict[str, Dict[str, Dict[str, float]]]:
+        with self._lock:
+            snapshot = {name: {stage: sorted(samples) for stage, samples in stages.items()}
+                        for name, stages in self._samples.items()}
+        return {
+            name: {
+                stage: {"count": len(ordered),
+                        **{f"p{int(q * 100)}": self._percentile(ordered, q) for q in quantiles}}
+                for stage, ordered in stages.items()
+            }
+            for name, stages in snapshot.items()
+        }
+
+
+stage_stats = StageStats()
+register_exporter(stage_stats)
@@ -5,16 +5,20 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import logging
 
+from app.utils.tracing import traced
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@traced("web")
 def search_web(query, include_meta=False):
     api_key = os.getenv("TAVILY_API_KEY")
     if not api_key:
         logger.error("Tavily API key not found in .env")
         return None
 
-    url = "https://api.tavily.com/search"
+    # Overridable so benchmarks and offline runs can point at a stub server
+    url = os.getenv("TAVILY_API_URL", "https://api.tavily.com/search")
     headers = {"Authorization": f"Bearer {api_key}"}
     payload = {
         "query": query,
@@ -26,6 +30,7 @@ def search_web(query, include_meta=False):
     session = requests.Session()
     retries = Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
     session.mount("https://", HTTPAdapter(max_retries=retries))
+    session.mount("http://", HTTPAdapter(max_retries=retries))
 
     try:
         logger.info(f"[Tavily] Sending query: {query}")
@@ -0,0 +1,8 @@
+"""
+Offline benchmarks for RAGBot.
+Location: benchmarks/
+
+Everything here runs without network access or external services: the LLM
+and Tavily are replaced by deterministic stubs and Chroma lives in a
+temporary directory, so results are comparable across commits.
+"""
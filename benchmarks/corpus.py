@@ -0,0 +1,67 @@
+"""
+Benchmark corpora and query sets.
+Location: benchmarks/corpus.py
+"""
+
+import os
+import random
+from dataclasses import dataclass
+from typing import List
+
+
+@dataclass
+class Chunk:
+    source: str
+    text: str
+
+
+@dataclass
+class BenchQuery:
+    text: str
+    expected_source: str
+
+
+def chunk_words(text: str, size: int) -> List[str]:
+    words = text.split()
+    return [" ".join(words[i:i + size]) for i in range(0, len(words), size)]
+
+
+def load_corpus(data_dir: str = "data", chunk_size: int = 200) -> List[Chunk]:
+    """Chunk the plain-text files of ``data_dir``.
+
+    Only ``.txt`` files are read so the benchmark does not depend on the
+    PDF/DOCX loaders.
+    """
+    chunks = []
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.lower().endswith(".txt"):
+            continue
+        with open(os.path.join(data_dir, filename), encoding="utf-8", errors="ignore") as f:
+            text = f.read()
+        chunks.extend(Chunk(source=filename, text=piece) for piece in chunk_words(text, chunk_size) if piece)
+    return chunks
+
+
+def synthetic_corpus(n_docs: int, words_per_doc: int = 400, chunk_size: int = 200,
+                     vocab_size: int = 5000, seed: int = 0) -> List[Chunk]:
+    """Random documents over a fixed vocabulary; each document favours its own topic words."""
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocab_size)]
+    chunks = []
+    for doc in range(n_docs):
+        topic = rng.sample(vocab, 50)
+        words = [rng.choice(topic) if rng.random() < 0.6 else rng.choice(vocab) for _ in range(words_per_doc)]
+        source = f"synthetic_{doc:06d}.txt"
+        chunks.extend(Chunk(source=source, text=piece) for piece in chunk_words(" ".join(words), chunk_size))
+    return chunks
+
+
+def build_queries(chunks: List[Chunk], count: int, window: int = 12, seed: int = 1) -> List[BenchQuery]:
+    """Queries are word windows lifted from corpus chunks; the chunk's file is the expected hit."""
+    rng = random.Random(seed)
+    queries = []
+    for chunk in rng.sample(chunks, min(count, len(chunks))):
+        words = chunk.text.split()
+        start = rng.randrange(max(1, len(words) - window))
+        queries.append(BenchQuery(text=" ".join(words[start:start + window]), expected_source=chunk.source))
+    return queries
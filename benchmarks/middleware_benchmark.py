@@ -0,0 +1,178 @@
+"""
+Per-request overhead of the HTTP middleware stack.
+Location: benchmarks/middleware_benchmark.py
+
+Drives a minimal Starlette app directly through ASGI (no sockets, no HTTP
+client) with three stacks: no middleware, the previous BaseHTTPMiddleware
+auth + logging pair, and the current plain ASGI pair. Token validation is
+stubbed so only middleware mechanics are measured. Prints per-request
+latency for a plain and a streaming endpoint as JSON.
+
+    python -m benchmarks.middleware_benchmark --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.middleware.jwt_middleware import JWTAuthMiddleware
+from app.middleware.logging_middleware import RequestLoggingMiddleware
+from app.utils.logger import get_logger
+from benchmarks.report import git_revision, summarize
+
+PRINCIPAL = {"user_id": "00000000-0000-0000-0000-000000000001", "email": "bench@example.com",
+             "name": "Bench", "role": "user", "exp": 2 ** 31}
+logger = get_logger()
+
+
+class StubValidator:
+    def validate(self, token: str) -> Dict:
+        return PRINCIPAL
+
+
+class LegacyJWTAuthMiddleware(BaseHTTPMiddleware):
+    """Shape of the previous middleware: BaseHTTPMiddleware and a prefix scan."""
+
+    def __init__(self, app, validator):
+        super().__init__(app)
+        self.validator = validator
+
+    async def dispatch(self, request: Request, call_next):
+        excluded_paths = ["/api/v1/auth", "/docs", "/redoc", "/openapi.json", "/api/info", "/api/v1/health", "/metrics"]
+        path = request.url.path
+        if path == "/":
+            return await call_next(request)
+        for excluded_path in excluded_paths:
+            if path.startswith(excluded_path):
+                return await call_next(request)
+        auth_header = request.headers.get("Authorization")
+        if not auth_header or not auth_header.startswith("Bearer "):
+            return JSONResponse(status_code=401, content={"detail": "Missing or invalid token"})
+        principal = self.validator.validate(auth_header.split(" ")[1])
+        request.state.principal = principal
+        return await call_next(request)
+
+
+async def legacy_log_requests(request: Request, call_next):
+    start_time = time.time()
+    logger.info(f"Request: {request.method} {request.url}")
+    response = await call_next(request)
+    logger.info(f"Response: {response.status_code} - {time.time() - start_time:.3f}s")
+    return response
+
+
+async def ping(request: Request):
+    return PlainTextResponse("pong")
+
+
+async def stream(request: Request):
+    async def chunks():
+        for _ in range(16):
+            yield b"x" * 256
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+def build_app(stack: str) -> Starlette:
+    middleware: List[Middleware] = []
+    if stack == "base_http":
+        middleware = [
+            Middleware(BaseHTTPMiddleware, dispatch=legacy_log_requests),
+            Middleware(LegacyJWTAuthMiddleware, validator=StubValidator()),
+        ]
+    elif stack == "asgi":
+        middleware = [
+            Middleware(RequestLoggingMiddleware),
+            Middleware(JWTAuthMiddleware, validator=StubValidator()),
+        ]
+    routes = [Route("/api/v1/chat/ping", ping), Route("/api/v1/chat/stream", stream)]
+    return Starlette(routes=routes, middleware=middleware)
+
+
+def make_scope(path: str) -> Dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"authorization", b"Bearer bench-token")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+async def drive(app, path: str, requests: int, warmup: int) -> List[float]:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    samples = []
+    for i in range(warmup + requests):
+        scope = make_scope(path)
+        start = time.perf_counter()
+        await app(scope, receive, send)
+        if i >= warmup:
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run(args) -> Dict:
+    results = {}
+    for stack in ("none", "base_http", "asgi"):
+        app = build_app(stack)
+        results[stack] = {
+            name: summarize(asyncio.run(drive(app, path, args.requests, args.warmup)))
+            for name, path in (("plain", "/api/v1/chat/ping"), ("streaming", "/api/v1/chat/stream"))
+        }
+
+    overhead = {
+        stack: {
+            endpoint: round((results[stack][endpoint]["mean_ms"] - results["none"][endpoint]["mean_ms"]) * 1000, 2)
+            for endpoint in ("plain", "streaming")
+        }
+        for stack in ("base_http", "asgi")
+    }
+    return {
+        "revision": git_revision(),
+        "config": {"requests": args.requests, "warmup": args.warmup, "logging": args.with_logging},
+        "stacks": results,
+        "overhead_us_per_request": overhead
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Middleware overhead micro-benchmark")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--with-logging", action="store_true",
+                        help="Keep request log lines on (measures the logging I/O as well)")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if not args.with_logging:
+        logger.setLevel(logging.WARNING)
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
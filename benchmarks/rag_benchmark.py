@@ -0,0 +1,218 @@
+"""
+End-to-end RAG benchmark.
+Location: benchmarks/rag_benchmark.py
+
+Ingests the data/ corpus (or a synthetic one) into a temporary Chroma
+directory, replays a query set through ChatService.process_message with a
+stub LLM and a stub Tavily server, and prints per-stage latency, throughput
+and recall@k as JSON.
+
+    python -m benchmarks.rag_benchmark --output bench.json
+    python -m benchmarks.rag_benchmark --synthetic 2000 --queries 500 --embedder hf
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+from uuid import uuid4
+
+from langchain_core.runnables import RunnableLambda
+
+from app.rag_engine.chroma.chroma_client import ChromaClient, summarize_chunks
+from app.rag_engine.chroma.vector_schema import DocumentEmbedding
+from app.services.chat_service import ChatService
+from app.services.conversation_archive import ConversationArchive
+from benchmarks.corpus import build_queries, load_corpus, synthetic_corpus
+from benchmarks.report import git_revision, summarize
+from benchmarks.stubs import HashEmbeddings, NullSession, StubLLM, StubS3Writer, StubTavilyServer
+
+
+class StageTimer:
+    """Collects wall-clock samples per stage, summed per chat turn."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.turn = defaultdict(float)
+
+    def add(self, stage: str, seconds: float):
+        self.turn[stage] += seconds
+
+    def end_turn(self):
+        for stage, seconds in self.turn.items():
+            self.samples[stage].append(seconds)
+        self.turn = defaultdict(float)
+
+    def timed(self, stage: str, fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return wrapper
+
+
+class TimedEmbeddings:
+    def __init__(self, model, timer: StageTimer):
+        self.model = model
+        self.embed_query = timer.timed("embed", model.embed_query)
+        self.embed_documents = timer.timed("embed", model.embed_documents)
+
+
+class TimedChroma:
+    """Proxy that times query_docs and remembers what each turn retrieved."""
+
+    def __init__(self, client: ChromaClient, timer: StageTimer):
+        self._client = client
+        self._timer = timer
+        self.retrieved: List[Dict] = []
+
+    def query_docs(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = self._client.query_docs(*args, **kwargs)
+        self._timer.add("retrieve", time.perf_counter() - start)
+        self.retrieved.append(result)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def make_embedder(kind: str):
+    if kind == "hash":
+        return HashEmbeddings()
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
+
+
+def ingest(chroma_client: ChromaClient, embedder, chunks, batch_size: int = 256) -> float:
+    start = time.perf_counter()
+    by_source = defaultdict(list)
+    for i in range(0, len(chunks), batch_size):
+        batch = chunks[i:i + batch_size]
+        vectors = embedder.embed_documents([c.text for c in batch])
+        embedded = [
+            DocumentEmbedding(
+                vector=vector,
+                content=chunk.text,
+                metadata={
+                    "source": chunk.source,
+                    "filename": chunk.source,
+                    "doc_id": chunk.source,
+                    "visibility": "public",
+                    "user_id": "",
+                    # Chroma metadata must be scalar
+                    "tags": "",
+                    "keywords": "",
+                    "conversation_ids": ""
+                }
+            )
+            for chunk, vector in zip(batch, vectors)
+        ]
+        chroma_client.add_docs(embedded)
+        for item in embedded:
+            by_source[item.metadata["doc_id"]].append(item)
+    chroma_client.add_document_summaries([summarize_chunks(items) for items in by_source.values()])
+    return time.perf_counter() - start
+
+
+async def replay(chat_service: ChatService, chroma: TimedChroma, timer: StageTimer, queries, k: int):
+    user_id, conversation_id = uuid4(), uuid4()
+    hits, turn_latencies = 0, []
+    persist = timer.timed("persist", chat_service.record_turn)
+
+    start = time.perf_counter()
+    for query in queries:
+        turn_start = time.perf_counter()
+        chroma.retrieved = []
+        response = await chat_service.process_message(user_id, conversation_id, query.text)
+        persist(user_id, conversation_id, query.text, response)
+        turn_latencies.append(time.perf_counter() - turn_start)
+
+        if chroma.retrieved:
+            sources = [meta.get("source") for meta in chroma.retrieved[0]["metadatas"][0][:k]]
+            hits += query.expected_source in sources
+        timer.end_turn()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "turn": summarize(turn_latencies),
+        "throughput_qps": round(len(queries) / elapsed, 3),
+        f"recall@{k}": round(hits / len(queries), 4)
+    }
+
+
+def run(args) -> Dict:
+    if args.synthetic:
+        chunks = synthetic_corpus(args.synthetic, chunk_size=args.chunk_size, seed=args.seed)
+    else:
+        chunks = load_corpus(args.data_dir, chunk_size=args.chunk_size)
+    queries = build_queries(chunks, args.queries, seed=args.seed)
+
+    timer = StageTimer()
+    embedder = make_embedder(args.embedder)
+
+    with tempfile.TemporaryDirectory(prefix="ragbench_chroma_") as persist_dir, \
+            StubTavilyServer(latency_ms=args.web_latency_ms):
+        chroma_client = ChromaClient(persist_directory=persist_dir)
+        ingest_seconds = ingest(chroma_client, embedder, chunks)
+
+        chroma = TimedChroma(chroma_client, timer)
+        chat_service = ChatService(
+            db=NullSession(),
+            embeddings_model=TimedEmbeddings(embedder, timer),
+            chroma_client=chroma,
+            llm=RunnableLambda(timer.timed("generate", StubLLM(args.llm_latency_ms))),
+            s3_writer=StubS3Writer(),
+            archive=ConversationArchive(writer=StubS3Writer())
+        )
+        results = asyncio.run(replay(chat_service, chroma, timer, queries, args.k))
+
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {
+            "corpus": f"synthetic:{args.synthetic}" if args.synthetic else args.data_dir,
+            "chunks": len(chunks),
+            "queries": len(queries),
+            "embedder": args.embedder,
+            "llm_latency_ms": args.llm_latency_ms,
+            "web_latency_ms": args.web_latency_ms
+        },
+        "ingest_seconds": round(ingest_seconds, 3),
+        "stages": {stage: summarize(samples) for stage, samples in sorted(timer.samples.items())},
+        **results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RAG pipeline benchmark")
+    parser.add_argument("--data-dir", default="data", help="Directory of .txt files to ingest")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate N synthetic documents instead")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Words per chunk")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=4, help="Depth for recall@k (process_message retrieves 4)")
+    parser.add_argument("--embedder", choices=["hash", "hf"], default="hash",
+                        help="hash: offline feature-hashing embedder; hf: the production sentence-transformers model")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated LLM latency")
+    parser.add_argument("--web-latency-ms", type=float, default=0.0, help="Simulated Tavily latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DISABLE_S3", "true")
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
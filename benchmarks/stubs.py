@@ -0,0 +1,183 @@
+"""
+Deterministic stand-ins for the external pieces of the RAG pipeline.
+Location: benchmarks/stubs.py
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+from langchain_core.runnables import RunnableLambda
+
+
+class HashEmbeddings:
+    """Feature-hashing bag-of-words embedder with the HuggingFaceEmbeddings interface.
+
+    Cheap and deterministic, and texts that share words land close together,
+    so retrieval quality is still meaningful without downloading a model.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class StubLLM:
+    """Callable LLM that answers from the first line of its context.
+
+    When the prompt carries no usable context it answers with "no information",
+    which drives ChatService down its web-search fallback. Wrap it in a
+    RunnableLambda (see ``as_runnable``) to use it in a LangChain chain.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+
+    def __call__(self, prompt) -> str:
+        text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        context = text.split("Context:", 1)[-1].split("Question:", 1)[0].strip()
+        if not context or context.startswith("No relevant documents found"):
+            return "I have no information about that in the documents."
+        first_line = context.splitlines()[0]
+        return f"According to the documents, {first_line[:200]}"
+
+    def as_runnable(self):
+        return RunnableLambda(self)
+
+
+class StubS3Writer:
+    """Accepts uploads and drops them."""
+
+    def register_handler(self, kind, handler):
+        pass
+
+    def enqueue(self, kind, key, body, content_type=None):
+        return True
+
+    def put_json(self, key, data):
+        return True
+
+    def put_file(self, key, local_path):
+        return True
+
+
+class _NullBind:
+    class dialect:
+        name = "sqlite"
+
+
+class NullSession:
+    """Minimal SQLAlchemy session stand-in for runs without a database."""
+
+    def __init__(self):
+        self.added = 0
+        self.commits = 0
+
+    def add(self, obj):
+        self.added += 1
+
+    def add_all(self, objs):
+        self.added += len(objs)
+
+    def execute(self, statement):
+        return None
+
+    def get_bind(self):
+        return _NullBind
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _TavilyHandler(BaseHTTPRequestHandler):
+    latency_ms = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        query = payload.get("query", "")
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        slug = hashlib.sha1(query.encode("utf-8")).hexdigest()[:10]
+        body = json.dumps({
+            "query": query,
+            "answer": f"Web answer for: {query}",
+            "results": [
+                {
+                    "title": f"Result {i} for {query}",
+                    "url": f"https://example.com/{slug}/{i}",
+                    "content": f"Stub content {i} about {query}",
+                    "score": round(1.0 - i * 0.1, 2)
+                }
+                for i in range(payload.get("max_results", 3))
+            ]
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubTavilyServer:
+    """Local HTTP server speaking enough of the Tavily search API for search_web.
+
+    Used as a context manager; it points TAVILY_API_URL at itself while active.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        handler = type("TavilyHandler", (_TavilyHandler,), {"latency_ms": latency_ms})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._saved_env = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/search"
+
+    def __enter__(self):
+        self.thread.start()
+        for key, value in {"TAVILY_API_URL": self.url, "TAVILY_API_KEY": "stub-key"}.items():
+            self._saved_env[key] = os.environ.get(key)
+            os.environ[key] = value
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
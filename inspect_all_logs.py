@@ -1,9 +1,15 @@
 # inspect_all_logs.py
+#
+#   python inspect_all_logs.py                 -> eval log stats and latest entries
+#   python inspect_all_logs.py query --source web --contains president
+#   python inspect_all_logs.py messages        -> DB message inspection
 
+import sys
 from sqlalchemy.orm import Session
 from sqlalchemy_init import select, func, desc
 from app.rag_engine.db.models import Message
 from app.rag_engine.db.session import SessionLocal
+from app.utils import eval_store
 
 def inspect_messages():
     session: Session = SessionLocal()
@@ -37,4 +43,11 @@ def inspect_messages():
         session.close()
 
 if __name__ == "__main__":
-    inspect_messages()
+    args = sys.argv[1:]
+    if args[:1] == ["messages"]:
+        inspect_messages()
+    elif args:
+        eval_store.main(args)
+    else:
+        eval_store.main(["stats"])
+        eval_store.main(["tail", "-n", "5"])
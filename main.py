@@ -1,7 +1,6 @@
 #main.py
 import os
 import streamlit as st
-import json
 import time
 import hashlib
 from datetime import datetime
@@ -14,7 +13,8 @@ from app.rag_engine.chroma.chroma_client import ChromaClient
 from app.rag_engine.Query.vectorstore_loader import load_vectorstore
 from app.rag_engine.Query.llm_loader import get_llm
 from app.rag_engine.Query.rag_chain_builder import build_rag_chain as get_rag_chain
-from app.utils.logger import LOG_FILE, log_eval
+from app.utils.logger import log_eval
+from app.utils.eval_store import get_eval_store
 from app.websearch.tavily_tool import search_web
 from app.rag_engine.db.session import get_db
 from app.rag_engine.db.models import Message, Conversation
@@ -135,14 +135,12 @@ if st.sidebar.button("🔧 Debug DB Config"):
 # Debug: Show all logs and DB data
 if st.sidebar.button("📊 Show All Data"):
     st.sidebar.subheader("📝 JSON Logs")
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE) as f:
-            logs = json.load(f)
-        st.sidebar.write(f"Total logs: {len(logs)}")
-        for i, log in enumerate(logs[-5:]):  # Show last 5
-            st.sidebar.write(f"**{i+1}. Q**: {log['question'][:50]}...")
-            st.sidebar.write(f"**A**: {log['answer'][:50]}...")
-            st.sidebar.write(f"**Source**: {log['source']}")
+    eval_store = get_eval_store()
+    st.sidebar.write(f"Total logs: {eval_store.count()}")
+    for i, log in enumerate(eval_store.tail(5)):  # Show last 5
+        st.sidebar.write(f"**{i+1}. Q**: {log['question'][:50]}...")
+        st.sidebar.write(f"**A**: {log['answer'][:50]}...")
+        st.sidebar.write(f"**Source**: {log['source']}")
     
     st.sidebar.subheader("🗄️ Database Messages")
     try:
@@ -267,10 +265,10 @@ if uploaded_files:
 
 # Sidebar: Evaluation Logs
 st.sidebar.subheader("📜 Evaluation Logs")
-if os.path.exists(LOG_FILE) and st.sidebar.button("View Logs"):
+if st.sidebar.button("View Logs"):
     try:
-        with open(LOG_FILE) as f:
-            logs = json.load(f)
+        # Most recent entries only; use `python -m app.utils.eval_store query` for history
+        logs = get_eval_store().tail(int(os.getenv("EVAL_LOG_VIEW_LIMIT", 50)))
         with st.sidebar.expander("Logs", expanded=True):
             for log in logs:
                 st.write(f"**Q**: {log['question']}")
@@ -0,0 +1,58 @@
+# scripts/migrate_add_keyset_indexes.py
+"""
+Add the composite indexes used by keyset pagination to an existing database.
+
+New databases get them from Base.metadata.create_all. On Postgres they are
+built CONCURRENTLY so the tables stay writable; this needs autocommit, since
+CREATE INDEX CONCURRENTLY cannot run inside a transaction. Safe to re-run:
+an index left INVALID by an interrupted concurrent build is dropped and
+rebuilt.
+
+    python -m scripts.migrate_add_keyset_indexes
+"""
+
+from sqlalchemy import text
+from app.rag_engine.db.session import engine
+from app.rag_engine.db.models import AuditLog, Conversation, DocumentMetadata, Message
+
+KEYSET_INDEXES = {
+    Conversation.__table__: "ix_conversations_user_deleted_updated",
+    Message.__table__: "ix_messages_conversation_timestamp",
+    DocumentMetadata.__table__: "ix_documents_metadata_owner_id",
+    AuditLog.__table__: "ix_audit_logs_user_timestamp",
+}
+
+
+def index_ddl(table, index_name: str, concurrently: bool) -> str:
+    index = next(ix for ix in table.indexes if ix.name == index_name)
+    columns = ", ".join(f'"{col.name}"' for col in index.columns)
+    mode = "CONCURRENTLY " if concurrently else ""
+    return f'CREATE INDEX {mode}IF NOT EXISTS {index.name} ON {table.name} ({columns})'
+
+
+def drop_if_invalid(conn, index_name: str):
+    invalid = conn.execute(text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": index_name}).first()
+    if invalid:
+        print(f"⚠️ Dropping invalid index {index_name}")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+
+
+def main():
+    concurrently = engine.dialect.name == "postgresql"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table, index_name in KEYSET_INDEXES.items():
+            if concurrently:
+                drop_if_invalid(conn, index_name)
+            ddl = index_ddl(table, index_name, concurrently)
+            print(f"🔨 {ddl}")
+            conn.execute(text(ddl))
+            if concurrently:
+                conn.execute(text(f"ANALYZE {table.name}"))
+    print("✅ Keyset indexes in place")
+
+
+if __name__ == "__main__":
+    main()
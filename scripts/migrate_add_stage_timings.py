@@ -0,0 +1,28 @@
+# scripts/migrate_add_stage_timings.py
+"""
+Add query_logs.stage_timings, the per-stage latency breakdown of a chat turn.
+
+New databases get the column from create_all. Adding a nullable column
+without a default only touches the catalog, so this is instant on Postgres.
+Safe to re-run.
+
+    python -m scripts.migrate_add_stage_timings
+"""
+
+from sqlalchemy import inspect, text
+from app.rag_engine.db.session import engine
+
+
+def main():
+    columns = {col["name"] for col in inspect(engine).get_columns("query_logs")}
+    if "stage_timings" in columns:
+        print("✅ query_logs.stage_timings already present")
+        return
+    kind = "JSONB" if engine.dialect.name == "postgresql" else "JSON"
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE query_logs ADD COLUMN stage_timings {kind}"))
+    print("✅ Added query_logs.stage_timings")
+
+
+if __name__ == "__main__":
+    main()
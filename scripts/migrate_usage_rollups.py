@@ -0,0 +1,114 @@
+# scripts/migrate_usage_rollups.py
+"""
+Move usage_stats to per user-day rollups and backfill them from history.
+
+Adds the rollup counter columns, rebuilds one row per (user, UTC day) from
+messages, conversations and query_logs (keeping token_usage/cost recorded in
+the old rows), and adds the (user_id, date) unique constraint that the
+incremental upserts rely on. The rebuild runs in one transaction with the
+table locked against concurrent increments. Postgres only; fresh databases
+get the new schema from create_all. Safe to re-run.
+
+    python -m scripts.migrate_usage_rollups
+"""
+
+from sqlalchemy import text
+from app.rag_engine.db.session import engine
+
+NEW_COLUMNS = {
+    "user_message_count": "INTEGER",
+    "assistant_message_count": "INTEGER",
+    "response_time_total": "DOUBLE PRECISION",
+    "response_time_count": "INTEGER",
+    "conversation_count": "INTEGER",
+    "query_count": "INTEGER",
+}
+
+REBUILD = """
+CREATE TEMP TABLE usage_rebuild ON COMMIT DROP AS
+WITH legacy AS (
+    SELECT user_id, date_trunc('day', date) AS day,
+           SUM(COALESCE(token_usage, 0)) AS token_usage,
+           SUM(COALESCE(cost, 0)) AS cost
+    FROM usage_stats GROUP BY 1, 2
+), msgs AS (
+    SELECT c.user_id, date_trunc('day', m.timestamp) AS day,
+           COUNT(*) FILTER (WHERE m.role = 'user') AS user_messages,
+           COUNT(*) FILTER (WHERE m.role = 'assistant') AS assistant_messages,
+           COALESCE(SUM(m.response_time) FILTER (WHERE m.role = 'assistant'), 0) AS response_time_total,
+           COUNT(m.response_time) FILTER (WHERE m.role = 'assistant') AS response_time_count,
+           COALESCE(SUM(m.token_count), 0) AS tokens
+    FROM messages m JOIN conversations c ON c.id = m.conversation_id
+    GROUP BY 1, 2
+), convs AS (
+    SELECT user_id, date_trunc('day', created_at) AS day, COUNT(*) AS conversations
+    FROM conversations WHERE is_deleted IS NOT TRUE GROUP BY 1, 2
+), queries AS (
+    SELECT user_id, date_trunc('day', timestamp) AS day, COUNT(*) AS queries
+    FROM query_logs GROUP BY 1, 2
+), keys AS (
+    SELECT user_id, day FROM legacy
+    UNION SELECT user_id, day FROM msgs
+    UNION SELECT user_id, day FROM convs
+    UNION SELECT user_id, day FROM queries
+)
+SELECT k.user_id, k.day,
+       -- token_usage used to be tracked in either place, never both; don't double count
+       GREATEST(COALESCE(l.token_usage, 0), COALESCE(m.tokens, 0)) AS token_usage,
+       COALESCE(l.cost, 0) AS cost,
+       COALESCE(m.user_messages, 0) AS user_message_count,
+       COALESCE(m.assistant_messages, 0) AS assistant_message_count,
+       COALESCE(m.response_time_total, 0) AS response_time_total,
+       COALESCE(m.response_time_count, 0) AS response_time_count,
+       COALESCE(c.conversations, 0) AS conversation_count,
+       COALESCE(q.queries, 0) AS query_count
+FROM keys k
+LEFT JOIN legacy l ON l.user_id = k.user_id AND l.day = k.day
+LEFT JOIN msgs m ON m.user_id = k.user_id AND m.day = k.day
+LEFT JOIN convs c ON c.user_id = k.user_id AND c.day = k.day
+LEFT JOIN queries q ON q.user_id = k.user_id AND q.day = k.day
+WHERE k.user_id IS NOT NULL AND k.day IS NOT NULL
+"""
+
+REPLACE = """
+INSERT INTO usage_stats (
+    id, user_id, date, token_usage, message_count, cost,
+    user_message_count, assistant_message_count, response_time_total,
+    response_time_count, conversation_count, query_count
+)
+SELECT gen_random_uuid(), user_id, day, token_usage,
+       user_message_count + assistant_message_count, cost,
+       user_message_count, assistant_message_count, response_time_total,
+       response_time_count, conversation_count, query_count
+FROM usage_rebuild
+"""
+
+
+def main():
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("This migration targets Postgres; recreate the SQLite dev database instead.")
+
+    with engine.begin() as conn:
+        for name, kind in NEW_COLUMNS.items():
+            conn.execute(text(f"ALTER TABLE usage_stats ADD COLUMN IF NOT EXISTS {name} {kind} DEFAULT 0"))
+        for name in ("token_usage", "message_count", "cost"):
+            conn.execute(text(f"ALTER TABLE usage_stats ALTER COLUMN {name} SET DEFAULT 0"))
+
+        conn.execute(text("LOCK TABLE usage_stats IN EXCLUSIVE MODE"))
+        conn.execute(text(REBUILD))
+        conn.execute(text("DELETE FROM usage_stats"))
+        rows = conn.execute(text(REPLACE)).rowcount
+        print(f"🔁 Rebuilt {rows} user-day rollups")
+
+        has_constraint = conn.execute(text(
+            "SELECT 1 FROM pg_constraint WHERE conname = 'uq_usage_stats_user_date'"
+        )).first()
+        if not has_constraint:
+            conn.execute(text(
+                "ALTER TABLE usage_stats ADD CONSTRAINT uq_usage_stats_user_date UNIQUE (user_id, date)"
+            ))
+    print("✅ usage_stats rollups ready")
+
+
+if __name__ == "__main__":
+    main()